@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # pg_trgm и полнотекстовый поиск
     'movies',
     'rest_framework',
     'rest_framework_simplejwt',
@@ -89,6 +90,33 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# default - общий для всех процессов кэш: версия каталога (movies.catalog), фасеты,
+# id результатов поиска. Должен быть общим, иначе смена версии в одном воркере или
+# в команде импорта не видна остальным (проверка movies.W001). Таблица DatabaseCache
+# создается командой createcachetable; в продакшене лучше Redis:
+#     'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#     'LOCATION': 'redis://127.0.0.1:6379',
+# local - быстрый кэш процесса (L1)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'movies_cache',
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'movies-local',
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+}
+
+# Как часто процесс перечитывает версию каталога из общего кэша (секунды).
+# Между проверками используется запомненная версия: изменения других процессов
+# видны с такой задержкой, зато подсказки и индексы в памяти не ходят в кэш на каждый запрос
+CATALOG_VERSION_CHECK_INTERVAL = 2
+
 AUTH_USER_MODEL = 'authorization.User'
 
 REST_FRAMEWORK = {
@@ -149,6 +177,13 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Обученные модели рекомендаций (.npy, открываются через mmap)
+RECOMMENDATIONS_DIR = BASE_DIR / 'var' / 'recommendations'
+
+# Пересчет готовых рекомендаций пользователя после его действий: фоновым потоком
+# процесса (True) или сразу после коммита транзакции (False)
+RECOMMENDATIONS_REFRESH_ASYNC = True
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -20,7 +20,7 @@ class TagInline(admin.TabularInline):
 class MovieAdmin(admin.ModelAdmin):
     list_display = ('title', 'release_date', 'rating', 'director')
     list_filter = ('release_date', 'tags', 'rating')
-    search_fields = ('title', 'description')
+    search_fields = ('title', 'description', 'imdb_id')
     filter_horizontal = ('actors', 'tags', 'liked_by')
     readonly_fields = ('created_at', 'updated_at')
 
@@ -32,14 +32,14 @@ class MovieAdmin(admin.ModelAdmin):
 
 @admin.register(Director)
 class DirectorAdmin(admin.ModelAdmin):
-    list_display = ('name',)
-    search_fields = ('name',)
+    list_display = ('name', 'imdb_id')
+    search_fields = ('name', 'imdb_id')
 
 
 @admin.register(Actor)
 class ActorAdmin(admin.ModelAdmin):
-    list_display = ('name',)
-    search_fields = ('name',)
+    list_display = ('name', 'imdb_id')
+    search_fields = ('name', 'imdb_id')
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -0,0 +1,221 @@
+"""
+Неявная обратная связь: ALS (Hu, Koren, Volinsky, 2008) на NumPy.
+Матрица взаимодействий - movies.interactions; вес w превращается в уверенность
+c = 1 + alpha * w, предпочтение p = 1 для каждой ненулевой пары.
+Шаг по пользователям при фиксированных факторах фильмов Y:
+    (Y^T Y + Y_u^T (C_u - I) Y_u + lambda I) x_u = Y_u^T C_u p_u,
+шаг по фильмам - симметрично. Системы решаются не точно, а несколькими шагами
+сопряженных градиентов от факторов прошлой итерации (ALS-CG, Takacs et al., 2011),
+сразу для пачки строк: произведения по ненулевым и с матрицей Грама (BLAS).
+Пачки строк можно раздать процессам (--workers): разреженные матрицы и факторы
+процессы читают через mmap.
+
+Модель 'als' - версия в movies.model_store (факторы и id строк в .npy).
+Веб-процессы открывают файлы через np.load(mmap_mode='r'): страницы общие
+для всех воркеров, старт мгновенный.
+Рекомендации пользователю - одно произведение item_factors @ x_u и np.argpartition.
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from movies import model_store
+
+DEFAULT_FACTORS = 64
+DEFAULT_ITERATIONS = 15
+DEFAULT_REGULARIZATION = 0.1
+DEFAULT_ALPHA = 40.0
+
+DEFAULT_CG_STEPS = 3
+
+# Сколько ненулевых элементов в одной пачке строк: пачка держит несколько массивов nnz x factors
+BATCH_NNZ = 262144
+
+MODEL_NAME = 'als'
+
+
+def batches(indptr, start, end, batch_nnz=BATCH_NNZ):
+    """Границы пачек строк [start, end) не больше batch_nnz ненулевых (но хотя бы одна строка)"""
+    while start < end:
+        stop = int(np.searchsorted(indptr, indptr[start] + batch_nnz, side='right')) - 1
+        stop = min(max(stop, start + 1), end)
+        yield start, stop
+        start = stop
+
+
+def solve_rows(indptr, cols, confidence, fixed, current, regularization, start, end, cg_steps=DEFAULT_CG_STEPS):
+    """
+    Факторы строк [start, end) при фиксированных факторах другой стороны.
+    Несколько шагов сопряженных градиентов от текущих факторов сразу для всех строк пачки:
+    A x = (F^T F + lambda I) x + F_u^T ((c - 1) * (F_u x)) - только матрично-векторные
+    произведения по ненулевым, без матриц factors x factors на каждую строку.
+    """
+    gram = fixed.T @ fixed + regularization * np.eye(fixed.shape[1], dtype=np.float32)
+    result = np.array(current[start:end], dtype=np.float32)
+    for lo_row, hi_row in batches(indptr, start, end):
+        lo, hi = indptr[lo_row], indptr[hi_row]
+        y = fixed[cols[lo:hi]]
+        c = confidence[lo:hi]
+        rows = np.repeat(np.arange(hi_row - lo_row), np.diff(indptr[lo_row:hi_row + 1]))
+        # У каждой строки матрицы взаимодействий есть хотя бы один элемент - сегменты reduceat не пустые
+        segments = indptr[lo_row:hi_row] - lo
+
+        def product(x):
+            projected = np.einsum('nf,nf->n', y, x[rows]) * (c - 1)
+            return x @ gram + np.add.reduceat(y * projected[:, None], segments, axis=0)
+
+        x = result[lo_row - start:hi_row - start]
+        residual = np.add.reduceat(y * c[:, None], segments, axis=0) - product(x)
+        direction = residual.copy()
+        norm = np.einsum('nf,nf->n', residual, residual)
+        for _ in range(cg_steps):
+            step = product(direction)
+            curvature = np.einsum('nf,nf->n', direction, step)
+            alpha = np.divide(norm, curvature, out=np.zeros_like(norm), where=curvature > 0)
+            x += alpha[:, None] * direction
+            residual -= alpha[:, None] * step
+            new_norm = np.einsum('nf,nf->n', residual, residual)
+            if new_norm.max(initial=0) < 1e-20:
+                break
+            beta = np.divide(new_norm, norm, out=np.zeros_like(norm), where=norm > 0)
+            direction = residual + beta[:, None] * direction
+            norm = new_norm
+    return result
+
+
+def solve_task(workdir, side, regularization, cg_steps, start, end):
+    """То же в процессе пула: все массивы читаются из workdir через mmap"""
+    def load(name):
+        return np.load(os.path.join(workdir, f'{name}.npy'), mmap_mode='r')
+
+    return start, solve_rows(
+        load(f'{side}_indptr'), load(f'{side}_cols'), load(f'{side}_confidence'),
+        np.asarray(load('fixed')), load('current'), regularization, start, end, cg_steps
+    )
+
+
+class Trainer:
+    """Обучение ALS; workers > 1 - пачки строк считаются в ProcessPoolExecutor"""
+
+    def __init__(self, factors=DEFAULT_FACTORS, iterations=DEFAULT_ITERATIONS,
+                 regularization=DEFAULT_REGULARIZATION, alpha=DEFAULT_ALPHA, workers=1,
+                 cg_steps=DEFAULT_CG_STEPS, seed=42):
+        self.factors = factors
+        self.iterations = iterations
+        self.regularization = regularization
+        self.alpha = alpha
+        self.workers = workers
+        self.cg_steps = cg_steps
+        self.seed = seed
+
+    def fit(self, interactions, log=None):
+        """(user_factors, item_factors) float32; log(номер итерации, секунды) после каждой итерации"""
+        n_users, n_movies = interactions.shape
+        rng = np.random.default_rng(self.seed)
+        user_factors = (rng.standard_normal((n_users, self.factors)) * 0.01).astype(np.float32)
+        item_factors = (rng.standard_normal((n_movies, self.factors)) * 0.01).astype(np.float32)
+        sides = {}
+        for side, (indptr, cols, values) in (('users', interactions.by_user()), ('movies', interactions.by_movie())):
+            sides[side] = (indptr, cols, (1 + self.alpha * values).astype(np.float32))
+
+        with tempfile.TemporaryDirectory(prefix='als-') as workdir:
+            pool = None
+            if self.workers > 1:
+                for side, arrays in sides.items():
+                    for name, array in zip(('indptr', 'cols', 'confidence'), arrays):
+                        np.save(os.path.join(workdir, f'{side}_{name}.npy'), array)
+                pool = ProcessPoolExecutor(self.workers)
+            try:
+                for iteration in range(1, self.iterations + 1):
+                    started = time.perf_counter()
+                    user_factors = self.half_step(pool, workdir, 'users', sides['users'], item_factors, user_factors)
+                    item_factors = self.half_step(pool, workdir, 'movies', sides['movies'], user_factors, item_factors)
+                    if log:
+                        log(iteration, time.perf_counter() - started)
+            finally:
+                if pool:
+                    pool.shutdown()
+        return user_factors, item_factors
+
+    def half_step(self, pool, workdir, side, arrays, fixed, current):
+        indptr, cols, confidence = arrays
+        rows = len(indptr) - 1
+        if pool is None:
+            return solve_rows(indptr, cols, confidence, fixed, current, self.regularization, 0, rows, self.cg_steps)
+        np.save(os.path.join(workdir, 'fixed.npy'), fixed)
+        np.save(os.path.join(workdir, 'current.npy'), current)
+        # Примерно поровну ненулевых на задачу, по 4 задачи на процесс
+        bounds = np.searchsorted(indptr, np.linspace(0, indptr[-1], self.workers * 4 + 1)[1:-1])
+        bounds = np.unique(np.concatenate([[0], bounds, [rows]]))
+        result = np.empty((rows, fixed.shape[1]), dtype=np.float32)
+        futures = [
+            pool.submit(solve_task, workdir, side, self.regularization, self.cg_steps, int(start), int(end))
+            for start, end in zip(bounds[:-1], bounds[1:]) if end > start
+        ]
+        for future in futures:
+            start, factors = future.result()
+            result[start:start + len(factors)] = factors
+        return result
+
+
+def save_model(interactions, user_factors, item_factors, meta, directory=None):
+    """Опубликовать новую версию модели 'als' (movies.model_store)"""
+    return model_store.publish(MODEL_NAME, {
+        'user_ids': interactions.user_ids,
+        'movie_ids': interactions.movie_ids,
+        'user_factors': user_factors,
+        'item_factors': item_factors,
+    }, meta, directory)
+
+
+class FactorModel:
+    """Обученная модель, открытая через mmap только для чтения"""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.version = meta['version']
+        arrays = model_store.load_arrays(path, ('user_ids', 'movie_ids', 'user_factors', 'item_factors'))
+        self.user_ids = arrays['user_ids']
+        self.movie_ids = arrays['movie_ids']
+        self.user_factors = arrays['user_factors']
+        self.item_factors = arrays['item_factors']
+
+    def __contains__(self, user_id):
+        return self.user_row(user_id) is not None
+
+    def user_row(self, user_id):
+        row = int(np.searchsorted(self.user_ids, user_id))
+        return row if row < len(self.user_ids) and self.user_ids[row] == user_id else None
+
+    def recommend(self, user_id, exclude=(), limit=20, index=None):
+        """
+        Список (movie_id, оценка) лучших limit фильмов, кроме exclude; [] для неизвестного пользователя.
+        index - ANN-индекс по item_factors этой же версии (movies.ann): вместо произведения
+        со всем каталогом просматриваются только ближайшие списки.
+        """
+        row = self.user_row(user_id)
+        if row is None:
+            return []
+        if index is not None:
+            return index.search(self.user_factors[row], limit, exclude)
+        scores = self.item_factors @ self.user_factors[row]
+        exclude = np.asarray(list(exclude), dtype=np.int64)
+        if len(exclude):
+            scores[np.isin(self.movie_ids, exclude)] = -np.inf
+        limit = min(limit, len(scores))
+        if not limit:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(self.movie_ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+_current = model_store.Current(MODEL_NAME, FactorModel)
+
+
+def factor_model(directory=None):
+    """Текущая модель процесса (None, если еще не обучена); перечитывается после нового обучения"""
+    return _current.get(directory)
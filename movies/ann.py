@@ -0,0 +1,236 @@
+"""
+Приближенный поиск ближайших соседей (IVF) по векторам фильмов.
+Векторы разбиваются k-means на nlist списков; запрос сравнивается с центроидами,
+и точное скалярное произведение считается только для векторов nprobe ближайших
+списков - доля каталога порядка nprobe / nlist вместо полного перебора.
+
+Источники векторов:
+- content: теги, режиссер и актеры фильма (one-hot с весами idf), сжатые
+  разреженной случайной проекцией в dim измерений и нормированные - косинус;
+- als: факторы фильмов из текущей модели ALS (movies.als) - скалярное произведение
+  с вектором пользователя для рекомендаций.
+
+Индекс каждого источника - модель 'ann-<источник>' в movies.model_store: векторы
+упорядочены по спискам и открываются через mmap. Строится командой build_ann_index.
+"""
+import numpy as np
+
+from movies import model_store
+from movies.als import factor_model
+from movies.models import Movie
+
+CONTENT = 'content'
+ALS = 'als'
+SOURCES = (CONTENT, ALS)
+
+DEFAULT_DIM = 128
+DEFAULT_NPROBE = 8
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 50000
+CHUNK = 8192
+
+# Вес признака в content-векторе (умножается на idf)
+FEATURE_WEIGHTS = {'tag': 1.0, 'director': 0.7, 'actor': 0.5}
+# Ненулевых координат проекции на один признак
+PROJECTION_NNZ = 4
+
+
+def mix(keys):
+    """splitmix64: хэш массива uint64"""
+    with np.errstate(over='ignore'):
+        keys = (keys + np.uint64(0x9E3779B97F4A7C15)).astype(np.uint64)
+        keys = (keys ^ (keys >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        keys = (keys ^ (keys >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return keys ^ (keys >> np.uint64(31))
+
+
+def project(rows, features, weights, n_rows, dim):
+    """
+    Разреженная случайная проекция (Achlioptas): признак -> PROJECTION_NNZ координат +-1,
+    строка = взвешенная сумма своих признаков. Матрица проекции не хранится - координаты
+    и знаки берутся из хэша признака. Возвращает нормированные строки float32.
+    """
+    vectors = np.zeros(n_rows * dim, dtype=np.float64)
+    for j in range(PROJECTION_NNZ):
+        hashed = mix(features.astype(np.uint64) * np.uint64(PROJECTION_NNZ) + np.uint64(j))
+        coords = (hashed % np.uint64(dim)).astype(np.int64)
+        signs = np.where(hashed >> np.uint64(63), 1.0, -1.0)
+        vectors += np.bincount(rows * dim + coords, weights=weights * signs, minlength=n_rows * dim)
+    vectors = vectors.reshape(n_rows, dim)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+
+def content_vectors(dim=DEFAULT_DIM):
+    """(id фильмов, векторы) по тегам, режиссеру и актерам"""
+    movie_ids = np.fromiter(Movie.objects.order_by('pk').values_list('pk', flat=True).iterator(), dtype=np.int64)
+    kinds = list(FEATURE_WEIGHTS)
+    parts = [
+        (Movie.tags.through.objects.values_list('movie_id', 'tag_id'), 'tag'),
+        (Movie.objects.filter(director__isnull=False).values_list('pk', 'director_id'), 'director'),
+        (Movie.actors.through.objects.values_list('movie_id', 'actor_id'), 'actor'),
+    ]
+    rows, features, weights = [], [], []
+    for queryset, kind in parts:
+        pairs = np.array(list(queryset.iterator()), dtype=np.int64).reshape(-1, 2)
+        rows.append(np.searchsorted(movie_ids, pairs[:, 0]))
+        # Признак - (вид, id) одним числом: вид - остаток от деления на число видов
+        features.append(pairs[:, 1] * len(kinds) + kinds.index(kind))
+        weights.append(np.full(len(pairs), FEATURE_WEIGHTS[kind]))
+    rows, features, weights = np.concatenate(rows), np.concatenate(features), np.concatenate(weights)
+    _, inverse, frequency = np.unique(features, return_inverse=True, return_counts=True)
+    weights = weights * (np.log((len(movie_ids) + 1) / (frequency[inverse] + 1)) + 1)
+    return movie_ids, project(rows, features, weights, len(movie_ids), dim)
+
+
+def als_vectors():
+    """(id фильмов, факторы, версия) текущей модели ALS или None"""
+    model = factor_model()
+    if model is None:
+        return None
+    return np.asarray(model.movie_ids), np.asarray(model.item_factors), model.version
+
+
+def nearest_lists(vectors, centroids):
+    """Номер ближайшего (по скалярному произведению) центроида для каждого вектора, пачками"""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), CHUNK):
+        assignment[start:start + CHUNK] = np.argmax(vectors[start:start + CHUNK] @ centroids.T, axis=1)
+    return assignment
+
+
+def kmeans(vectors, nlist, iterations=KMEANS_ITERATIONS, sample=KMEANS_SAMPLE, seed=42):
+    """Сферический k-means по выборке: центроиды единичной длины"""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample:
+        vectors = vectors[rng.choice(len(vectors), sample, replace=False)]
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignment = nearest_lists(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = np.bincount(assignment, minlength=nlist) == 0
+        # Пустой список получает случайную точку выборки
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.where(norms > 0, norms, 1)
+    return centroids
+
+
+def build(movie_ids, vectors, nlist=None, seed=42):
+    """Массивы индекса: векторы и id по спискам, границы списков, центроиды"""
+    nlist = max(1, min(nlist or int(np.sqrt(len(vectors))), len(vectors)))
+    centroids = kmeans(vectors, nlist, seed=seed)
+    assignment = nearest_lists(vectors, centroids)
+    order = np.argsort(assignment, kind='stable')
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    np.cumsum(np.bincount(assignment, minlength=nlist), out=offsets[1:])
+    ids = movie_ids[order]
+    by_id = np.argsort(ids, kind='stable')
+    return {
+        'centroids': centroids.astype(np.float32),
+        'offsets': offsets,
+        'ids': ids,
+        'vectors': vectors[order].astype(np.float32),
+        'sorted_ids': ids[by_id],
+        'sorted_rows': by_id,
+    }
+
+
+class IvfIndex:
+    """Индекс IVF; массивы - обычные или открытые через mmap (model_store)"""
+
+    def __init__(self, arrays, meta=None):
+        self.meta = meta or {}
+        self.centroids = arrays['centroids']
+        self.offsets = arrays['offsets']
+        self.ids = arrays['ids']
+        self.vectors = arrays['vectors']
+        self.sorted_ids = arrays['sorted_ids']
+        self.sorted_rows = arrays['sorted_rows']
+        self.nprobe = self.meta.get('nprobe', DEFAULT_NPROBE)
+
+    @classmethod
+    def open(cls, path, meta):
+        names = ('centroids', 'offsets', 'ids', 'vectors', 'sorted_ids', 'sorted_rows')
+        return cls(model_store.load_arrays(path, names), meta)
+
+    def vector(self, movie_id):
+        """Вектор фильма или None, если его нет в индексе"""
+        position = int(np.searchsorted(self.sorted_ids, movie_id))
+        if position < len(self.sorted_ids) and self.sorted_ids[position] == movie_id:
+            return np.asarray(self.vectors[self.sorted_rows[position]])
+        return None
+
+    def search(self, query, limit=20, exclude=(), nprobe=None):
+        """Список (movie_id, скалярное произведение) лучших limit среди nprobe ближайших списков"""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        # Списки - непрерывные куски массивов: из mmap читаются только они
+        ranges = [(self.offsets[i], self.offsets[i + 1]) for i in lists if self.offsets[i + 1] > self.offsets[i]]
+        if not ranges:
+            return []
+        scores = np.concatenate([self.vectors[lo:hi] @ query for lo, hi in ranges])
+        ids = np.concatenate([self.ids[lo:hi] for lo, hi in ranges])
+        exclude = np.asarray(list(exclude), dtype=np.int64)
+        if len(exclude):
+            scores[np.isin(ids, exclude)] = -np.inf
+        limit = min(limit, len(scores))
+        if not limit:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def similar(self, movie_id, limit=20, nprobe=None):
+        """Похожие на фильм (сам фильм исключен, сходство больше нуля); [] если его нет в индексе"""
+        vector = self.vector(movie_id)
+        if vector is None:
+            return []
+        return [(key, score) for key, score in self.search(vector, limit, [movie_id], nprobe) if score > 0]
+
+
+def brute_force(movie_ids, vectors, query, limit, exclude=()):
+    """Точный ответ для сравнения: скалярное произведение со всеми векторами"""
+    scores = vectors @ query
+    scores[np.isin(movie_ids, np.asarray(list(exclude), dtype=np.int64))] = -np.inf
+    # Каталог может быть меньше limit (как в IvfIndex.search и TagMatrix.recommend)
+    limit = min(limit, len(scores))
+    if not limit:
+        return []
+    top = np.argpartition(-scores, limit - 1)[:limit]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return [(int(movie_ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+def recall_at_k(index, movie_ids, vectors, queries, k=10, nprobe=None):
+    """
+    Доля точных k ближайших, найденных индексом, по запросам-фильмам (индексы строк).
+    В каталоге меньше k + 1 фильмов точных соседей меньше k - доля считается от них.
+    """
+    found = total = 0
+    for row in queries:
+        exact = {movie_id for movie_id, _ in brute_force(movie_ids, vectors, vectors[row], k, [movie_ids[row]])}
+        approximate = {movie_id for movie_id, _ in index.search(vectors[row], k, [movie_ids[row]], nprobe)}
+        found += len(exact & approximate)
+        total += len(exact)
+    return found / total if total else 0.0
+
+
+def model_name(source):
+    return f'ann-{source}'
+
+
+def publish(source, arrays, meta, directory=None):
+    """Опубликовать массивы build() индексом источника source"""
+    meta = {**meta, 'source': source, 'nlist': len(arrays['centroids']), 'movies': len(arrays['ids']),
+            'dim': arrays['vectors'].shape[1]}
+    return model_store.publish(model_name(source), arrays, meta, directory)
+
+
+_current = {source: model_store.Current(model_name(source), IvfIndex.open) for source in SOURCES}
+
+
+def ann_index(source=CONTENT, directory=None):
+    """Текущий индекс источника source в процессе (None, если не построен)"""
+    return _current[source].get(directory)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MoviesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'movies'
+
+    def ready(self):
+        # Подключаем обработчики сигналов (обновление поискового индекса)
+        from movies import signals  # noqa: F401
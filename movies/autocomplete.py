@@ -0,0 +1,183 @@
+"""
+Подсказки при вводе (/api/autocomplete/?q=) без обращения к базе.
+Для каждой модели в памяти процесса держится отсортированный список ключей:
+нормализованное имя (нижний регистр, без диакритики) начиная с каждого слова,
+поэтому "godf" находит "The Godfather". Поиск - bisect по списку.
+Фильмы ранжируются по рейтингу, люди и теги - по числу фильмов.
+Индекс строится при первом запросе и дальше обновляется из сигналов;
+после изменений в других процессах перестраивается по версии каталога.
+"""
+import heapq
+from bisect import bisect_left, insort
+
+from django.db.models import Count
+
+from movies.catalog import CatalogIndex
+from movies.models import Actor, Director, Movie, Tag
+from movies.text import fold
+
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 20
+
+# Если под префикс попало больше ключей, идем по списку "лучшие первыми", а не по диапазону
+WIDE_RANGE = 5000
+
+# Раздел ответа -> модель, поле с именем и способ подсчета популярности
+KINDS = {
+    'movies': (Movie, 'title', None),
+    'actors': (Actor, 'name', 'movies'),
+    'directors': (Director, 'name', 'movies'),
+    'tags': (Tag, 'name', 'movie'),
+}
+
+
+def prefix_keys(name):
+    """Ключи для поиска с начала любого слова: 'the godfather', 'godfather'"""
+    words = fold(name).split()
+    return sorted({' '.join(words[i:]) for i in range(len(words))})
+
+
+class PrefixIndex:
+    """Отсортированные пары (ключ, id) и список id по убыванию популярности"""
+
+    def __init__(self):
+        self.entries = []  # (ключ, -score, имя, id), отсортировано
+        self.ranking = []  # (-score, имя, id), отсортировано
+        self.items = {}  # id -> (имя, score, ключи)
+
+    def add(self, key, name, score):
+        self.discard(key)
+        keys = prefix_keys(name)
+        self.items[key] = (name, score, keys)
+        for prefix_key in keys:
+            insort(self.entries, (prefix_key, -score, name, key))
+        insort(self.ranking, (-score, name, key))
+
+    def discard(self, key):
+        if key not in self.items:
+            return
+        name, score, keys = self.items.pop(key)
+        for prefix_key in keys:
+            del self.entries[bisect_left(self.entries, (prefix_key, -score, name, key))]
+        del self.ranking[bisect_left(self.ranking, (-score, name, key))]
+
+    def rename(self, key, name):
+        score = self.items[key][1] if key in self.items else 0
+        self.add(key, name, score)
+
+    def bump(self, key, delta):
+        if key in self.items:
+            name, score, _ = self.items[key]
+            self.add(key, name, score + delta)
+
+    @classmethod
+    def build(cls, rows):
+        """Начальное построение из (id, имя, score) одной сортировкой вместо insort"""
+        index = cls()
+        for key, name, score in rows:
+            keys = prefix_keys(name)
+            index.items[key] = (name, score, keys)
+            index.entries.extend((prefix_key, -score, name, key) for prefix_key in keys)
+            index.ranking.append((-score, name, key))
+        index.entries.sort()
+        index.ranking.sort()
+        return index
+
+    def search(self, prefix, limit=DEFAULT_LIMIT):
+        """Список (id, имя, score) для ключей, начинающихся с prefix, лучшие первыми"""
+        if not prefix:
+            return []
+        lo = bisect_left(self.entries, (prefix,))
+        hi = bisect_left(self.entries, (prefix + '\uffff',), lo)
+        if hi - lo <= WIDE_RANGE:
+            # Один фильм может попасть в диапазон несколькими ключами ("the the") - берем с запасом
+            result, seen = [], set()
+            for neg_score, name, key in heapq.nsmallest(2 * limit, (entry[1:] for entry in self.entries[lo:hi])):
+                if key not in seen:
+                    seen.add(key)
+                    result.append((key, name, -neg_score))
+            return result[:limit]
+
+        # Короткий префикс подходит многим - первые limit совпадений среди самых популярных
+        result = []
+        for neg_score, name, key in self.ranking:
+            if any(prefix_key.startswith(prefix) for prefix_key in self.items[key][2]):
+                result.append((key, name, -neg_score))
+                if len(result) == limit:
+                    break
+        return result
+
+
+class Autocomplete(CatalogIndex):
+    """Индексы всех разделов процесса; строятся лениво, меняются под блокировкой"""
+
+    def __init__(self):
+        super().__init__()
+        self.indexes = None
+
+    def load(self):
+        with self.lock:
+            self.ensure()
+            return self.indexes
+
+    def build(self):
+        indexes = {}
+        for kind, (model, field, related) in KINDS.items():
+            if related:
+                rows = model.objects.annotate(score=Count(related)).values_list('pk', field, 'score')
+            else:
+                rows = model.objects.values_list('pk', field, 'rating')
+            indexes[kind] = PrefixIndex.build(rows.iterator())
+        self.indexes = indexes
+
+    def search(self, query, limit=DEFAULT_LIMIT, kinds=None):
+        """Словарь раздел -> список {id, name, score}"""
+        indexes = self.load()
+        prefix = fold(query)
+        return {
+            kind: [{'id': key, 'name': name, 'score': score} for key, name, score in indexes[kind].search(prefix, limit)]
+            for kind in (kinds or KINDS)
+        }
+
+    def change(self, kind, method, *args):
+        """Правка уже построенного индекса (если индекса еще нет, он построится из базы)"""
+        with self.lock:
+            if self.indexes is not None:
+                getattr(self.indexes[kind], method)(*args)
+
+    def invalidate(self):
+        with self.lock:
+            super().invalidate()
+            self.indexes = None
+
+
+autocomplete = Autocomplete()
+
+
+def kind_of(model):
+    for kind, (kind_model, _, _) in KINDS.items():
+        if kind_model is model:
+            return kind
+    return None
+
+
+def instance_saved(instance, created):
+    kind = kind_of(type(instance))
+    if kind == 'movies':
+        autocomplete.change(kind, 'add', instance.pk, instance.title, instance.rating)
+        if created and instance.director_id:
+            autocomplete.change('directors', 'bump', instance.director_id, 1)
+    elif kind:
+        autocomplete.change(kind, 'rename', instance.pk, instance.name)
+
+
+def instance_deleted(instance):
+    kind = kind_of(type(instance))
+    if kind:
+        autocomplete.change(kind, 'discard', instance.pk)
+
+
+def relations_changed(kind, ids, delta):
+    """Фильму добавили или убрали актеров/теги - меняется их популярность"""
+    for key in ids:
+        autocomplete.change(kind, 'bump', key, delta)
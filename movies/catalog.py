@@ -0,0 +1,178 @@
+"""
+Версия каталога фильмов для кэшей производных данных (фасеты и т.п.).
+Ключ кэша включает текущую версию; любое изменение фильмов, людей или тегов
+меняет ее (см. movies.signals), и старые записи просто перестают читаться.
+
+Версия хранится в общем кэше (CACHES['default']): ее меняют и веб-воркеры,
+и команды импорта в отдельных процессах. Кэш процесса (LocMemCache) для этого
+не годится - проверка movies.W001. Процесс перечитывает версию из кэша не чаще
+раза в settings.CATALOG_VERSION_CHECK_INTERVAL секунд.
+"""
+import hashlib
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'movies:catalog_version'
+
+# Кэши, которые у каждого процесса свои
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def new_version():
+    return secrets.token_hex(8)
+
+
+class CheckedVersion:
+    """Версия каталога, прочитанная процессом, и время проверки"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked = 0.0
+
+    def get(self):
+        now = time.monotonic()
+        interval = getattr(settings, 'CATALOG_VERSION_CHECK_INTERVAL', 2)
+        with self.lock:
+            if self.version is not None and now - self.checked < interval:
+                return self.version
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, new_version(), timeout=None)
+            version = cache.get(VERSION_KEY)
+        self.set(version, now)
+        return version
+
+    def set(self, version, checked=None):
+        with self.lock:
+            self.version = version
+            self.checked = time.monotonic() if checked is None else checked
+
+
+checked_version = CheckedVersion()
+
+
+def catalog_version():
+    return checked_version.get()
+
+
+def bump_catalog_version():
+    """
+    Новая версия после коммита текущей транзакции: до коммита другие процессы
+    построили бы под новой версией данные без этого изменения.
+    Версия - случайная строка, а не счетчик: incr в DatabaseCache не атомарен,
+    и два одновременных увеличения могли бы дать одно и то же число.
+    """
+    transaction.on_commit(local_bumps.write)
+
+
+class LocalBumps:
+    """
+    Версии, записанные этим процессом: прежняя версия -> новая.
+    Свое изменение индексы процесса уже получили из сигналов, поэтому такую
+    смену версии они принимают без перестройки (CatalogIndex.ensure).
+    Между чтением прежней версии и записью новой чужая запись может потеряться
+    для этого процесса - окно в один запрос к кэшу; ее подберет следующая чужая смена.
+    """
+
+    MAX_SIZE = 1000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next = OrderedDict()
+
+    def write(self):
+        previous = cache.get(VERSION_KEY)
+        version = new_version()
+        cache.set(VERSION_KEY, version, timeout=None)
+        # Свою смену процесс видит сразу, не дожидаясь следующей проверки
+        checked_version.set(version)
+        with self.lock:
+            self.next[previous] = version
+            while len(self.next) > self.MAX_SIZE:
+                self.next.popitem(last=False)
+        return version
+
+    def leads(self, start, target):
+        """Можно ли дойти от start до target только по своим записям"""
+        with self.lock:
+            version, seen = start, set()
+            while version != target and version in self.next and version not in seen:
+                seen.add(version)
+                version = self.next[version]
+            return version == target
+
+
+local_bumps = LocalBumps()
+
+
+class CatalogIndex:
+    """
+    Данные каталога в памяти процесса (битовые карты тегов, подсказки, триграммы,
+    матрица тегов). Построенные данные помнят версию каталога, под которой строились;
+    если версию сменил другой процесс (воркер или команда импорта), ensure() строит
+    их заново. Изменения своего процесса сигналы вносят на месте, и его собственные
+    смены версии (local_bumps) принимаются без перестройки.
+
+    Подклассы реализуют build() - вызывается под self.lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = None
+
+    def ensure(self):
+        with self.lock:
+            # Версия читается до построения: изменение во время построения даст еще один пересчет, а не потерю
+            version = catalog_version()
+            if self.version == version:
+                return
+            if self.version is None or not local_bumps.leads(self.version, version):
+                self.build()
+            self.version = version
+
+    def build(self):
+        raise NotImplementedError
+
+    def invalidate(self):
+        with self.lock:
+            self.version = None
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_BACKENDS:
+        return [checks.Warning(
+            f"CACHES['default'] ({backend}) не общий для процессов",
+            hint='Версия каталога и кэши фасетов и результатов не будут сбрасываться в других '
+                 'воркерах и после команд импорта. Используйте DatabaseCache или RedisCache.',
+            id='movies.W001',
+        )]
+    return []
+
+
+def query_hash(params, ignored=()):
+    """
+    Канонический хэш параметров запроса (QueryDict): порядок параметров и значений,
+    регистр и лишние пробелы не важны, пустые значения и параметры ignored отбрасываются.
+    """
+    canonical = []
+    for key in sorted(params):
+        if key in ignored:
+            continue
+        values = sorted({' '.join(value.split()).casefold() for value in params.getlist(key)} - {''})
+        if values:
+            canonical.append((key, values))
+    return hashlib.sha1(json.dumps(canonical, ensure_ascii=False).encode()).hexdigest()
@@ -0,0 +1,75 @@
+"""
+Фасеты для списка фильмов: "Драма (1 234) / 1990-е (567)".
+Все счетчики (теги, десятилетия, режиссеры, рейтинг) считаются одним запросом:
+четыре GROUP BY по отфильтрованному набору, склеенные через UNION ALL.
+Результат кэшируется по хэшу параметров фильтра и версии каталога.
+"""
+from django.core.cache import cache
+from django.db.models import CharField, Count, F, IntegerField, Value
+from django.db.models.functions import Cast, ExtractYear, Floor, Least
+
+from movies.catalog import catalog_version, query_hash
+from movies.models import Movie
+
+CACHE_TIMEOUT = 60 * 10
+TOP_DIRECTORS = 20
+
+# Параметры запроса, которые не влияют на набор фильмов
+IGNORED_PARAMS = ('page', 'page_size', 'expand', 'format')
+
+
+def facet_rows(queryset):
+    """(facet, key, label, count) для всех фасетов одним запросом"""
+    movies = Movie.objects.filter(pk__in=queryset.order_by().values('pk')).order_by()
+    empty = Value('', output_field=CharField())
+
+    def grouped(name, key, label, **filters):
+        return movies.filter(**filters).values(
+            facet=Value(name, output_field=CharField()),
+            key=Cast(key, IntegerField()),
+            label=label,
+        ).annotate(count=Count('pk')).order_by()
+
+    tags = grouped('tags', F('tags__id'), F('tags__name'), tags__isnull=False)
+    decades = grouped('decades', Floor(ExtractYear('release_date') / Value(10.0)) * 10, empty)
+    directors = grouped('directors', F('director_id'), F('director__name'), director__isnull=False)
+    ratings = grouped('ratings', Least(Floor('rating'), Value(9.0)), empty)
+    return tags.union(decades, directors, ratings, all=True).values_list('facet', 'key', 'label', 'count')
+
+
+def compute_facets(queryset):
+    facets = {'tags': [], 'decades': [], 'directors': [], 'ratings': []}
+    for facet, key, label, count in facet_rows(queryset):
+        facets[facet].append((key, label, count))
+
+    return {
+        'tags': [
+            {'id': key, 'name': label, 'count': count}
+            for key, label, count in sorted(facets['tags'], key=lambda row: (-row[2], row[1]))
+        ],
+        'decades': [
+            {'decade': key, 'label': f'{key}s', 'count': count}
+            for key, _, count in sorted(facets['decades'])
+        ],
+        'directors': [
+            {'id': key, 'name': label, 'count': count}
+            for key, label, count in sorted(facets['directors'], key=lambda row: (-row[2], row[1]))[:TOP_DIRECTORS]
+        ],
+        'ratings': [
+            {'from': key, 'to': key + 1, 'count': count}
+            for key, _, count in sorted(facets['ratings'])
+        ],
+    }
+
+
+def cached_facets(params, get_queryset):
+    """
+    Фасеты по параметрам запроса params (ключ кэша).
+    get_queryset строит отфильтрованный queryset и вызывается только при промахе кэша.
+    """
+    key = f'movies:facets:{catalog_version()}:{query_hash(params, IGNORED_PARAMS)}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(get_queryset())
+        cache.set(key, facets, CACHE_TIMEOUT)
+    return facets
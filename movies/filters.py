@@ -1,36 +1,115 @@
+from datetime import date
+
 import django_filters
-from django.db.models import Q
+from rest_framework.filters import SearchFilter
 from .models import Movie, Actor, Tag
+from .people import director_condition, movies_with_actors
+from .search import search_movies
+from .tag_index import MODE_ALL, MODE_ANY, tag_index
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Полнотекстовый поиск (?search=) по названию, описанию, режиссеру, актерам и тегам.
+    Результаты отсортированы по релевантности, см. movies.search.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return search_movies(queryset, request.query_params.get(self.search_param, ''))
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    """Список чисел через запятую: ?actor_id=1,2"""
+
 
 class MovieFilter(django_filters.FilterSet):
+    # Фильтры по тегам считаются вместе через битовые карты, см. filter_queryset
+    tag_filters = ('tag', 'tags', 'tags_mode', 'exclude_tag')
+
     title = django_filters.CharFilter(lookup_expr='icontains', help_text="Фильтр по названию")
-    actor = django_filters.CharFilter(method='filter_by_actor', help_text="Фильтр по актерам")
-    tag = django_filters.CharFilter(method='filter_by_tag', help_text="Фильтр по тегам")
-    year = django_filters.NumberFilter(field_name='release_date__year', help_text="Год выпуска")
-    exclude_tag = django_filters.CharFilter(method='exclude_by_tag', help_text="Исключить тег")
+    actor = django_filters.CharFilter(method='filter_by_actor', help_text="Фильтр по актерам (начала слов имени через запятую)")
+    actor_id = NumberInFilter(method='filter_by_actor_id', help_text="Фильтр по id актеров через запятую")
+    director = django_filters.CharFilter(method='filter_by_director', help_text="Фильтр по режиссерам (начала слов имени через запятую)")
+    director_id = NumberInFilter(method='filter_by_director_id', help_text="Фильтр по id режиссеров через запятую")
+    tag = django_filters.CharFilter(help_text="Фильтр по тегам (любой из перечисленных через запятую)")
+    tags = django_filters.CharFilter(help_text="Теги через запятую, режим задает tags_mode")
+    tags_mode = django_filters.ChoiceFilter(
+        choices=[(MODE_ANY, 'Любой из тегов'), (MODE_ALL, 'Все теги')],
+        empty_label=None,
+        help_text="any - любой из тегов (по умолчанию), all - все теги"
+    )
+    # Годы и десятилетия переводятся в диапазон дат release_date, а не EXTRACT(YEAR ...),
+    # чтобы работал индекс по release_date
+    year = django_filters.NumberFilter(
+        method='filter_by_year', min_value=1, max_value=9999, help_text="Год выпуска"
+    )
+    year_min = django_filters.NumberFilter(
+        method='filter_by_year_min', min_value=1, max_value=9999, help_text="Вышел не раньше этого года"
+    )
+    year_max = django_filters.NumberFilter(
+        method='filter_by_year_max', min_value=1, max_value=9999, help_text="Вышел не позже этого года"
+    )
+    decade = django_filters.NumberFilter(
+        method='filter_by_decade', min_value=1, max_value=9990, help_text="Десятилетие, например 1990"
+    )
+    # ?rating_min=&rating_max= и ?released_after=&released_before= (BETWEEN, если заданы обе границы)
+    rating = django_filters.RangeFilter(field_name='rating', help_text="Диапазон рейтинга")
+    released = django_filters.DateFromToRangeFilter(field_name='release_date', help_text="Диапазон дат премьеры")
+    exclude_tag = django_filters.CharFilter(help_text="Исключить теги (через запятую)")
     exclude_actor = django_filters.CharFilter(method='exclude_by_actor', help_text="Исключить актера")
 
-    def exclude_by_tag(self, queryset, name, value):
-        """Исключает фильмы с указанным тегом (регистронезависимо)"""
-        return queryset.exclude(tags__name__iexact=value.strip())
+    def filter_queryset(self, queryset):
+        for name, value in self.form.cleaned_data.items():
+            if name not in self.tag_filters:
+                queryset = self.filters[name].filter(queryset, value)
+        return self.filter_by_tags(queryset, self.form.cleaned_data)
+
+    def filter_by_tags(self, queryset, data):
+        """
+        tag/tags - включить (tags_mode=all - все теги, any - любой), exclude_tag - исключить.
+        Имена без учета регистра; множество фильмов считается по битовым картам без JOIN и DISTINCT.
+        """
+        include = self.split(data.get('tag')) + self.split(data.get('tags'))
+        exclude = self.split(data.get('exclude_tag'))
+        return tag_index.filter(queryset, include, data.get('tags_mode') or MODE_ANY, exclude)
+
+    def filter_by_year(self, queryset, name, value):
+        return queryset.filter(release_date__range=(date(int(value), 1, 1), date(int(value), 12, 31)))
+
+    def filter_by_year_min(self, queryset, name, value):
+        return queryset.filter(release_date__gte=date(int(value), 1, 1))
+
+    def filter_by_year_max(self, queryset, name, value):
+        return queryset.filter(release_date__lte=date(int(value), 12, 31))
+
+    def filter_by_decade(self, queryset, name, value):
+        start = int(value) // 10 * 10
+        return queryset.filter(release_date__range=(date(max(start, 1), 1, 1), date(start + 9, 12, 31)))
+
+    @staticmethod
+    def split(value):
+        return [term.strip() for term in (value or '').split(',') if term.strip()]
+
+    # Имена людей сравниваются с начала слова без учета регистра и диакритики
+    # по ключам поиска, найденные id кэшируются (см. movies.people); фильмы отбираются по индексу actor_id
 
     def exclude_by_actor(self, queryset, name, value):
-        """Исключает фильмы с указанным актером (по частичному совпадению)"""
-        return queryset.exclude(actors__name__icontains=value.strip())
+        """Исключает фильмы с указанным актером (по началу слов имени)"""
+        return queryset.exclude(pk__in=movies_with_actors(names=[value]))
 
     def filter_by_actor(self, queryset, name, value):
-        """Фильтрация по актеру (по частичному совпадению)"""
-        terms = [term.strip() for term in value.split(',')]
-        q_objects = Q()
-        for term in terms:
-            q_objects |= Q(actors__name__icontains=term)
-        return queryset.filter(q_objects).distinct()
-
-    def filter_by_tag(self, queryset, name, value):
-        """Фильтрация по тегу (точное совпадение, можно через запятую)"""
-        terms = [term.strip() for term in value.split(',')]
-        return queryset.filter(tags__name__in=terms).distinct()
+        """Фильтрация по актеру (по началу слов имени, можно через запятую)"""
+        return queryset.filter(pk__in=movies_with_actors(names=self.split(value)))
+
+    def filter_by_actor_id(self, queryset, name, value):
+        return queryset.filter(pk__in=movies_with_actors(ids=value))
+
+    def filter_by_director(self, queryset, name, value):
+        return queryset.filter(director_condition(names=self.split(value)))
+
+    def filter_by_director_id(self, queryset, name, value):
+        return queryset.filter(director_condition(ids=value))
 
     class Meta:
         model = Movie
-        fields = []
\ No newline at end of file
+        fields = []
@@ -0,0 +1,240 @@
+"""
+Поиск с опечатками по триграммам ("Godfater" -> "The Godfather").
+PostgreSQL: расширение pg_trgm, word_similarity (оператор <%) и GIN-индексы
+gin_trgm_ops на названиях фильмов и именах актеров и режиссеров.
+Остальные базы (SQLite при разработке): TrigramIndex в памяти процесса.
+
+Оценка - word similarity: насколько запрос похож на часть строки, а не на строку
+целиком, иначе "Shawshenk" не находит "The Shawshank Redemption".
+"""
+import heapq
+import re
+from array import array
+from collections import Counter
+from itertools import chain
+from operator import itemgetter
+
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+from django.db import connection, transaction
+from django.db.models import Case, FloatField, Value, When
+
+from movies.catalog import CatalogIndex
+from movies.models import Actor, Director, Movie
+
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Модель -> поле, по которому ищем с опечатками
+INDEXED_FIELDS = {Movie: 'title', Actor: 'name', Director: 'name'}
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+
+def trigrams(text):
+    """Множество триграмм как в pg_trgm: слова в нижнем регистре, дополненные двумя пробелами слева и одним справа"""
+    result = set()
+    for word in WORD_RE.findall(text.lower()):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(a, b):
+    """Сходство двух множеств триграмм: общие / все (как similarity() в pg_trgm)"""
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def word_similarity(query, text):
+    """Доля триграмм запроса, найденных в тексте (верхняя оценка word_similarity() из pg_trgm)"""
+    if not query:
+        return 0.0
+    return len(query & text) / len(query)
+
+
+class TrigramIndex:
+    """
+    Инвертированный индекс триграмма -> id в памяти процесса.
+    Поиск считает общие триграммы по спискам только из триграмм запроса,
+    а не сравнивает запрос с каждой строкой каталога.
+    Поиск индекс не меняет; после смены текста (stale) нужен rebuilt().
+    """
+
+    def __init__(self):
+        self.postings = {}  # триграмма -> array id
+        self.sizes = {}  # id -> число триграмм в тексте
+        self.texts = {}
+        self.stale = False
+
+    def add(self, key, text):
+        text = text or ''
+        if key in self.texts:
+            if self.texts[key] == text:
+                return
+            # Старые триграммы остались в списках - перестроим индекс перед следующим поиском
+            self.stale = True
+        self.texts[key] = text
+        grams = trigrams(text)
+        self.sizes[key] = len(grams)
+        if not self.stale:
+            for gram in grams:
+                self.postings.setdefault(gram, array('q')).append(key)
+
+    def discard(self, key):
+        # Из списков id не удаляем: при поиске учитываются только ключи из sizes
+        self.texts.pop(key, None)
+        self.sizes.pop(key, None)
+
+    def rebuilt(self):
+        """Новый индекс по тем же текстам; старый остается целым для уже идущих поисков"""
+        index = TrigramIndex()
+        for key, text in list(self.texts.items()):
+            index.add(key, text)
+        return index
+
+    def search(self, text, threshold=DEFAULT_THRESHOLD, limit=DEFAULT_LIMIT):
+        """
+        Список пар (id, word similarity) не ниже threshold, лучшие первыми.
+        При равной оценке выше строки, похожие на запрос целиком.
+        """
+        query = trigrams(text)
+        if not query:
+            return []
+        shared = Counter(chain.from_iterable(self.postings.get(gram, ()) for gram in query))
+        scored = []
+        for key, count in shared.items():
+            size = self.sizes.get(key)
+            if size is None:
+                continue
+            score = count / len(query)
+            if score >= threshold:
+                scored.append((key, score, count / (len(query) + size - count)))
+        best = heapq.nlargest(limit, scored, key=itemgetter(1, 2))
+        return [(key, score) for key, score, _ in best]
+
+
+class FuzzyIndexes(CatalogIndex):
+    """
+    Индексы процесса для баз без pg_trgm: строятся при первом поиске, меняются под блокировкой
+    и сбрасываются при смене версии каталога.
+    Поиск идет без блокировки по полученному объекту индекса, поэтому перестроенный
+    индекс не правится на месте, а подменяется целиком.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.indexes = {}
+
+    def build(self):
+        # Индексы моделей строятся по одному при первом поиске
+        self.indexes = {}
+
+    def get(self, model):
+        with self.lock:
+            self.ensure()
+            index = self.indexes.get(model)
+            if index is None:
+                index = TrigramIndex()
+                for key, text in model.objects.values_list('pk', INDEXED_FIELDS[model]).iterator():
+                    index.add(key, text)
+                self.indexes[model] = index
+            return index
+
+    def change(self, model, method, *args):
+        """Правка уже построенного индекса (если индекса еще нет, он построится из базы)"""
+        with self.lock:
+            index = self.indexes.get(model)
+            if index is None:
+                return
+            getattr(index, method)(*args)
+            if index.stale:
+                self.indexes[model] = index.rebuilt()
+
+    def invalidate(self):
+        with self.lock:
+            super().invalidate()
+            self.indexes = {}
+
+
+fuzzy_indexes = FuzzyIndexes()
+
+
+def index_for(model):
+    return fuzzy_indexes.get(model)
+
+
+def update_instance(instance):
+    """Вызывается из сигналов: поправить уже построенный индекс процесса"""
+    model = type(instance)
+    fuzzy_indexes.change(model, 'add', instance.pk, getattr(instance, INDEXED_FIELDS[model]))
+
+
+def remove_instance(instance):
+    fuzzy_indexes.change(type(instance), 'discard', instance.pk)
+
+
+def invalidate():
+    """После пакетной загрузки (bulk-операции не вызывают сигналы) индексы строятся заново"""
+    fuzzy_indexes.invalidate()
+
+
+def match_ids(model, text, threshold=DEFAULT_THRESHOLD, limit=DEFAULT_LIMIT):
+    """Пары (id, word similarity) для строк model, похожих на text"""
+    field = INDEXED_FIELDS[model]
+    if connection.vendor != 'postgresql':
+        return index_for(model).search(text, threshold, limit)
+    # Оператор <% берет порог из настройки - только так используется GIN-индекс.
+    # is_local: настройка живет до конца транзакции и не достается следующим
+    # запросам на том же соединении из пула
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", [str(threshold)])
+        return list(
+            model.objects.filter(**{f'{field}__trigram_word_similar': text})
+            .annotate(
+                word_similarity=TrigramWordSimilarity(text, field),
+                similarity=TrigramSimilarity(field, text)
+            )
+            .order_by('-word_similarity', '-similarity')
+            .values_list('pk', 'word_similarity')[:limit]
+        )
+
+
+def fuzzy_search(queryset, text, threshold=DEFAULT_THRESHOLD, limit=DEFAULT_LIMIT):
+    """
+    Фильмы, у которых название, режиссер или один из актеров похожи на text.
+    Результат - QuerySet не длиннее limit с аннотацией similarity, лучшие первыми.
+    """
+    text = text.strip()
+    if not text:
+        return queryset.none()
+
+    scores = {}
+
+    def bump(movie_id, score):
+        if score > scores.get(movie_id, 0.0):
+            scores[movie_id] = score
+
+    for movie_id, score in match_ids(Movie, text, threshold, limit):
+        bump(movie_id, score)
+    directors = dict(match_ids(Director, text, threshold, limit))
+    if directors:
+        for movie_id, director_id in Movie.objects.filter(
+                director_id__in=directors).values_list('pk', 'director_id'):
+            bump(movie_id, directors[director_id])
+    actors = dict(match_ids(Actor, text, threshold, limit))
+    if actors:
+        for movie_id, actor_id in Movie.actors.through.objects.filter(
+                actor_id__in=actors).values_list('movie_id', 'actor_id'):
+            bump(movie_id, actors[actor_id])
+
+    best = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+    if not best:
+        return queryset.none()
+    ranked = Case(*[When(pk=pk, then=Value(score)) for pk, score in best], output_field=FloatField())
+    return queryset.filter(pk__in=[pk for pk, _ in best]).annotate(
+        similarity=ranked
+    ).order_by('-similarity', '-rating', 'title')
@@ -0,0 +1,4 @@
+"""
+Вспомогательные модули для загрузки данных с IMDb.
+Используются командами из movies/management/commands.
+"""
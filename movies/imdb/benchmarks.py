@@ -0,0 +1,402 @@
+"""
+Воспроизводимые замеры разбора и сохранения данных IMDb и поиска по каталогу.
+Используются командой bench_imdb; каждый замер - обычная функция без аргументов,
+и те же замеры разбора и сохранения запускаются под pytest-benchmark
+(movies/tests/test_benchmarks.py).
+"""
+import json
+import random
+import resource
+import time
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from movies import ann
+from movies.autocomplete import PrefixIndex
+from movies.fuzzy import TrigramIndex, trigrams, word_similarity
+from movies.imdb import fast_parsers, parsers
+from movies.imdb.persistence import BulkMovieWriter, QueryCounter
+from movies.filters import MovieFilter
+from movies.models import Actor, Movie, Tag
+from movies.people import index_names
+from movies.recommendations import recommend_for, tag_matrix
+from movies.tag_index import MODE_ALL, tag_index
+from movies.text import fold
+
+CHART_ITEM = (
+    '<li class="ipc-metadata-list-summary-item">'
+    '<a class="ipc-title-link-wrapper" href="/title/tt{id:07d}/?ref_=chttp_t_{rank}">'
+    '<h3 class="ipc-title__text">{rank}. Movie {rank}</h3></a>'
+    '<span class="cli-title-metadata-item">{year}</span>'
+    '<span class="ipc-rating-star">{rating} (1.2M)</span>'
+    '</li>'
+)
+
+
+def synthetic_chart(size):
+    """Страница топа на size фильмов: и HTML-список, и __NEXT_DATA__, как у IMDb"""
+    items, edges = [], []
+    for rank in range(1, size + 1):
+        year, rating = 1950 + rank % 70, round(7 + (rank % 30) / 10, 1)
+        items.append(CHART_ITEM.format(id=rank, rank=rank, year=year, rating=rating))
+        edges.append({'currentRank': rank, 'node': {
+            'id': f'tt{rank:07d}',
+            'titleText': {'text': f'Movie {rank}'},
+            'releaseYear': {'year': year},
+            'ratingsSummary': {'aggregateRating': rating},
+        }})
+    next_data = {'props': {'pageProps': {'pageData': {'chartTitles': {'edges': edges}}}}}
+    return (
+        '<html><head><script id="__NEXT_DATA__" type="application/json">'
+        f'{json.dumps(next_data)}</script></head>'
+        f'<body><ul>{"".join(items)}</ul></body></html>'
+    )
+
+
+def synthetic_records(count, offset=0):
+    """count пар (movie_data, details) в формате парсера, с пересекающимися актерами и жанрами"""
+    records = []
+    for i in range(offset, offset + count):
+        records.append((
+            {
+                'title': f'Benchmark movie {i}',
+                'year': 1950 + i % 70,
+                'rating': round(5 + (i % 50) / 10, 1),
+                'url': f'https://www.imdb.com/title/tt9{i:07d}/',
+                'imdb_id': f'tt9{i:07d}',
+            },
+            {
+                'description': f'Description {i}',
+                'genres': [f'bench-genre-{(i + k) % 20}' for k in range(3)],
+                'director': f'Bench Director {i % 300}',
+                'director_id': f'nm9{i % 300:07d}',
+                'actors': [f'Bench Actor {(i * 7 + k) % 5000}' for k in range(5)],
+                'actor_ids': [f'nm8{(i * 7 + k) % 5000:07d}' for k in range(5)],
+                'poster_url': '',
+            },
+        ))
+    return records
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss в КБ
+
+
+class Case:
+    """
+    Один замер: name, функция и сколько операций она выполняет за вызов.
+    setup - необязательная фабрика контекста, внутри которого идет замер (например, тестовые данные).
+    metrics - необязательная функция, возвращающая словарь дополнительных показателей
+    (например, recall@k), которые добавляются в результат.
+    """
+
+    def __init__(self, name, func, ops=1, setup=None, metrics=None):
+        self.name = name
+        self.func = func
+        self.ops = ops
+        self.setup = setup
+        self.metrics = metrics
+
+    def run(self, repeat):
+        with self.setup() if self.setup else nullcontext():
+            self.func()  # прогрев
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    self.func()
+                elapsed = time.perf_counter() - started
+            metrics = self.metrics() if self.metrics else {}
+        return {
+            'name': self.name,
+            'ops_per_sec': self.ops * repeat / elapsed if elapsed else 0.0,
+            'seconds_per_call': elapsed / repeat,
+            'queries_per_call': counter.count / repeat,
+            'peak_rss_mb': peak_rss_mb(),
+            **metrics,
+        }
+
+
+def parse_cases(backup_html, chart_sizes):
+    cases = [
+        Case('parse_backup_soup', lambda: parsers.extract_top_movies(backup_html, 250)),
+        Case('parse_backup_fast', lambda: fast_parsers.extract_top_movies(backup_html, 250)),
+    ]
+    for size in chart_sizes:
+        html = synthetic_chart(size)
+        cases += [
+            Case(f'parse_chart_{size}_soup', lambda h=html, n=size: parsers.extract_top_movies(h, n), size),
+            Case(f'parse_chart_{size}_fast', lambda h=html, n=size: fast_parsers.extract_top_movies(h, n), size),
+        ]
+    return cases
+
+
+def persist_case(count, batch_size):
+    """
+    Сохранение count записей пачками. Все пишется в транзакции, которая откатывается,
+    поэтому замер можно запускать на рабочей базе и повторять с одинаковым результатом.
+    """
+    records = synthetic_records(count)
+
+    def run():
+        with transaction.atomic():
+            writer = BulkMovieWriter()
+            for start in range(0, count, batch_size):
+                writer.write_batch(records[start:start + batch_size])
+            transaction.set_rollback(True)
+
+    return Case(f'persist_{count}_batch_{batch_size}', run, count)
+
+
+SYLLABLES = (
+    'ka', 'ro', 'man', 'dar', 'li', 'ven', 'sto', 'rin', 'gal', 'mo', 'the', 'ne',
+    'sha', 'tor', 'bel', 'qui', 'fen', 'ard', 'lo', 'mi', 'zan', 'pe', 'cor', 'us',
+)
+
+
+def synthetic_titles(count, seed=42):
+    """count названий из псевдослов; среди них настоящие, чтобы было что искать с опечатками"""
+    rng = random.Random(seed)
+    words = sorted({''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(20000)})
+    titles = [
+        ' '.join(rng.choice(words).capitalize() for _ in range(rng.randint(1, 4)))
+        for _ in range(count)
+    ]
+    for i, title in enumerate(('The Godfather', 'The Shawshank Redemption', 'Pulp Fiction')):
+        titles[(i + 1) * count // 4] = title
+    return titles
+
+
+def fuzzy_cases(size, query='Godfater'):
+    """
+    Поиск с опечаткой по каталогу из size названий: подстрочный поиск (как icontains,
+    опечатку не находит), сравнение с каждым названием и индекс триграмм.
+    """
+    titles = synthetic_titles(size)
+    index = TrigramIndex()
+    for key, title in enumerate(titles):
+        index.add(key, title)
+    needle, grams = query.lower(), trigrams(query)
+
+    def scan_icontains():
+        return [key for key, title in enumerate(titles) if needle in title.lower()]
+
+    def scan_similarity():
+        return sorted(
+            ((key, word_similarity(grams, trigrams(title))) for key, title in enumerate(titles)),
+            key=lambda pair: pair[1], reverse=True
+        )[:20]
+
+    return [
+        Case(f'fuzzy_{size}_scan_icontains', scan_icontains),
+        Case(f'fuzzy_{size}_scan_similarity', scan_similarity),
+        Case(f'fuzzy_{size}_trigram_index', lambda: index.search(query)),
+    ]
+
+
+def autocomplete_case(size, queries=2000):
+    """Подсказки при вводе: префиксы длиной 1-8 символов от случайных названий каталога"""
+    titles = synthetic_titles(size)
+    rng = random.Random(7)
+    index = PrefixIndex.build((key, title, rng.uniform(1, 10)) for key, title in enumerate(titles))
+    prefixes = [fold(title)[:length] for title in rng.sample(titles, queries // 5) for length in (1, 2, 3, 5, 8)]
+
+    def run():
+        for prefix in prefixes:
+            index.search(prefix)
+
+    return Case(f'autocomplete_{size}_prefix', run, len(prefixes))
+
+
+@contextmanager
+def seeded_catalog(count, batch_size=1000):
+    """count синтетических фильмов в транзакции, которая откатывается после замера"""
+    with transaction.atomic():
+        writer = BulkMovieWriter()
+        records = synthetic_records(count)
+        for start in range(0, count, batch_size):
+            writer.write_batch(records[start:start + batch_size])
+        yield
+        transaction.set_rollback(True)
+    tag_index.invalidate()
+
+
+def tag_filter_cases(count):
+    """
+    Фильтр по тегам как страница API (count + первые 10 фильмов):
+    JOIN movie_tags с DISTINCT (прежний MovieFilter) против битовых карт тегов.
+    """
+    include, exclude = ['bench-genre-1', 'bench-genre-2'], ['bench-genre-3']
+
+    def page(queryset):
+        return queryset.count(), list(queryset.values_list('pk', flat=True)[:10])
+
+    def join_any():
+        return page(Movie.objects.filter(tags__name__in=include).exclude(tags__name__in=exclude).distinct())
+
+    def join_all():
+        queryset = Movie.objects.all()
+        for name in include:
+            queryset = queryset.filter(tags__name=name)
+        return page(queryset.exclude(tags__name__in=exclude).distinct())
+
+    def bitmap_any():
+        return page(tag_index.filter(Movie.objects.all(), include, exclude=exclude))
+
+    def bitmap_all():
+        return page(tag_index.filter(Movie.objects.all(), include, MODE_ALL, exclude))
+
+    return [
+        Case(f'tags_{count}_{name}', func, setup=lambda: seeded_catalog(count))
+        for name, func in (('join_any', join_any), ('bitmap_any', bitmap_any),
+                           ('join_all', join_all), ('bitmap_all', bitmap_all))
+    ]
+
+
+@contextmanager
+def seeded_actors(count, movies=2000, batch_size=10000):
+    """Каталог из movies фильмов и еще count актеров без фильмов - в откатываемой транзакции"""
+    with seeded_catalog(movies):
+        for start in range(0, count, batch_size):
+            created = Actor.objects.bulk_create([
+                Actor(name=f'Extra Actor {i}', search_name=f'extra actor {i}')
+                for i in range(start, min(start + batch_size, count))
+            ])
+            index_names(Actor, [actor.pk for actor in created])
+        yield
+
+
+def actor_filter_cases(count, term='Bench Actor 1234'):
+    """
+    Фильтр ?actor= как страница API на count актерах: прежний icontains через JOIN + DISTINCT,
+    разрешение имени в id без кэша и с кэшем, фильтр ?actor_id=.
+    """
+    def page(queryset):
+        return queryset.count(), list(queryset.values_list('pk', flat=True)[:10])
+
+    def icontains():
+        return page(Movie.objects.filter(actors__name__icontains=term).distinct())
+
+    def resolved_cold():
+        cache.clear()
+        return page(MovieFilter({'actor': term}, queryset=Movie.objects.all()).qs)
+
+    def resolved_warm():
+        return page(MovieFilter({'actor': term}, queryset=Movie.objects.all()).qs)
+
+    def by_id():
+        actor_id = Actor.objects.filter(name=term).values_list('pk', flat=True).first() or 0
+        return page(MovieFilter({'actor_id': str(actor_id)}, queryset=Movie.objects.all()).qs)
+
+    return [
+        Case(f'actors_{count}_{name}', func, setup=lambda: seeded_actors(count))
+        for name, func in (('icontains', icontains), ('resolved_cold', resolved_cold),
+                           ('resolved_warm', resolved_warm), ('actor_id', by_id))
+    ]
+
+
+@contextmanager
+def seeded_recommendations(count, state):
+    """
+    Каталог из count фильмов и пользователь с двумя предпочитаемыми тегами и 20 фильмами
+    в избранном; state['user'] - этот пользователь. Матрица тегов строится заново.
+    """
+    with seeded_catalog(count):
+        user = get_user_model().objects.create_user(username='bench-recommendations', password='bench')
+        user.preferred_tags.set(Tag.objects.filter(name__in=['bench-genre-1', 'bench-genre-2']))
+        user.favorite_movies.set(Movie.objects.order_by('pk').values_list('pk', flat=True)[:20])
+        tag_matrix.invalidate()
+        state['user'] = user
+        yield
+    tag_matrix.invalidate()
+
+
+def recommendation_cases(count, limit=20):
+    """
+    Рекомендации по тегам на каталоге из count фильмов: оценка каждого фильма
+    циклом Python по его тегам против одного умножения в TagMatrix, и целиком
+    recommend_for (профиль и исключения из базы).
+    """
+    state = {}
+
+    def python_loop():
+        user = state['user']
+        if 'movie_tags' not in state:
+            movie_tags = {}
+            for movie_id, tag_id in Movie.tags.through.objects.values_list('movie_id', 'tag_id'):
+                movie_tags.setdefault(movie_id, set()).add(tag_id)
+            state['movie_tags'] = movie_tags
+        preferred = set(user.preferred_tags.values_list('pk', flat=True))
+        seen = set(user.favorite_movies.values_list('pk', flat=True))
+        scored = [
+            (len(tags & preferred) / len(tags), movie_id)
+            for movie_id, tags in state['movie_tags'].items() if movie_id not in seen
+        ]
+        return sorted(scored, reverse=True)[:limit]
+
+    def matrix():
+        return recommend_for(state['user'], limit)
+
+    return [
+        Case(f'recommend_{count}_{name}', func, setup=lambda: seeded_recommendations(count, state))
+        for name, func in (('python_loop', python_loop), ('tag_matrix', matrix))
+    ]
+
+
+def clustered_vectors(count, dim, clusters=1000, seed=42):
+    """count единичных векторов вокруг clusters случайных центров - похоже на эмбеддинги каталога"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def ann_cases(count, dim=64, k=10, queries=200, nprobes=(4, 16, 64)):
+    """
+    Похожие фильмы на каталоге из count векторов: полный перебор против IVF (movies.ann)
+    с разным nprobe; для IVF в результат добавляется recall@k против перебора.
+    """
+    movie_ids = np.arange(1, count + 1, dtype=np.int64)
+    vectors = clustered_vectors(count, dim)
+    index = ann.IvfIndex(ann.build(movie_ids, vectors))
+    rows = np.random.default_rng(7).choice(count, queries, replace=False)
+
+    def brute():
+        for row in rows:
+            ann.brute_force(movie_ids, vectors, vectors[row], k, [movie_ids[row]])
+
+    def ivf(nprobe):
+        for row in rows:
+            index.search(vectors[row], k, [movie_ids[row]], nprobe)
+
+    cases = [Case(f'ann_{count}_brute_force', brute, queries)]
+    for nprobe in nprobes:
+        cases.append(Case(
+            f'ann_{count}_ivf_nprobe_{nprobe}', lambda n=nprobe: ivf(n), queries,
+            metrics=lambda n=nprobe: {f'recall_at_{k}': ann.recall_at_k(index, movie_ids, vectors, rows, k, n)}
+        ))
+    return cases
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Сравнивает ops/sec с прошлым прогоном. Регрессия - падение больше чем на threshold (доля).
+    Возвращает список строк с описанием регрессий.
+    """
+    previous = {r['name']: r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result['name'])
+        if not before or not before['ops_per_sec']:
+            continue
+        change = result['ops_per_sec'] / before['ops_per_sec'] - 1
+        if change < -threshold:
+            regressions.append(
+                f"{result['name']}: {before['ops_per_sec']:.1f} -> {result['ops_per_sec']:.1f} ops/s "
+                f"({change:+.0%})"
+            )
+    return regressions
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class CacheStats:
+    """Счетчики кэша (потокобезопасные)"""
+
+    def __init__(self):
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.lock = threading.Lock()
+
+    def add(self, **counters):
+        with self.lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self):
+        return (
+            f'Кэш: попаданий {self.hits}, подтверждено 304 {self.revalidated}, '
+            f'промахов {self.misses}, сэкономлено {self.bytes_saved / 1024:.0f} КБ'
+        )
+
+
+class HttpCache:
+    """
+    Дисковый кэш HTTP-ответов.
+    Тела хранятся по sha256 содержимого (одинаковые страницы - один файл),
+    индекс url -> (хэш, ETag, Last-Modified, время) лежит в SQLite.
+    Свежие записи (моложе ttl) отдаются без запроса, устаревшие перепроверяются
+    условным запросом. При превышении max_bytes удаляются давно использованные записи.
+    """
+
+    def __init__(self, directory, ttl=86400, max_bytes=500 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(directory, 'bodies'), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), check_same_thread=False)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'url TEXT PRIMARY KEY, digest TEXT, etag TEXT, last_modified TEXT, '
+            'encoding TEXT, size INTEGER, stored_at REAL, accessed_at REAL)'
+        )
+        self.db.commit()
+
+    def body_path(self, digest):
+        return os.path.join(self.directory, 'bodies', digest[:2], digest)
+
+    def lookup(self, url):
+        """Возвращает запись кэша как словарь или None"""
+        with self.lock:
+            row = self.db.execute(
+                'SELECT digest, etag, last_modified, encoding, size, stored_at FROM entries WHERE url = ?',
+                (url,)
+            ).fetchone()
+        if row is None or not os.path.exists(self.body_path(row[0])):
+            return None
+        digest, etag, last_modified, encoding, size, stored_at = row
+        return {
+            'digest': digest, 'etag': etag, 'last_modified': last_modified,
+            'encoding': encoding, 'size': size, 'fresh': time.time() - stored_at < self.ttl,
+        }
+
+    def conditional_headers(self, entry):
+        """Заголовки для условного запроса (ETag / Last-Modified)"""
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read(self, url, entry, revalidated=False):
+        """Читает тело из кэша, отмечает использование записи и возвращает текст"""
+        with open(self.body_path(entry['digest']), 'rb') as f:
+            body = f.read()
+        now = time.time()
+        with self.lock:
+            if revalidated:
+                self.db.execute(
+                    'UPDATE entries SET stored_at = ?, accessed_at = ? WHERE url = ?', (now, now, url)
+                )
+            else:
+                self.db.execute('UPDATE entries SET accessed_at = ? WHERE url = ?', (now, url))
+            self.db.commit()
+        self.stats.add(bytes_saved=len(body), **{'revalidated' if revalidated else 'hits': 1})
+        return body.decode(entry['encoding'] or 'utf-8', errors='replace')
+
+    def store(self, url, response):
+        """Сохраняет успешный ответ в кэш"""
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.body_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, digest, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 response.encoding, len(body), now, now)
+            )
+            self.db.commit()
+            self.evict()
+        self.stats.add(misses=1)
+
+    def evict(self):
+        """LRU-вытеснение по суммарному размеру (вызывается под self.lock)"""
+        # Считаем по уникальным телам: одинаковые страницы лежат в одном файле
+        total = self.db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)'
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.db.execute('SELECT url, digest, size FROM entries ORDER BY accessed_at').fetchall()
+        for url, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.db.execute('DELETE FROM entries WHERE url = ?', (url,))
+            still_used = self.db.execute(
+                'SELECT 1 FROM entries WHERE digest = ? LIMIT 1', (digest,)
+            ).fetchone()
+            if not still_used:
+                total -= size
+                try:
+                    os.remove(self.body_path(digest))
+                except FileNotFoundError:
+                    pass
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,123 @@
+"""
+Потоковое чтение выгрузок IMDb (https://datasets.imdbws.com/).
+Файлы title.basics, title.ratings и title.principals отсортированы по номеру в tconst
+(tt9999999 идет раньше tt10000000, хотя строкой он больше), поэтому их можно
+объединять слиянием, держа в памяти по одной строке из каждого файла.
+"""
+import gzip
+import io
+
+from django.db import connection
+
+NULL = '\\N'  # Так в выгрузках IMDb обозначается пустое значение
+
+
+def read_tsv(path, offset=0):
+    """
+    Генератор (смещение после строки, словарь колонок) для .tsv / .tsv.gz.
+    Смещение считается в байтах распакованного текста, по нему можно продолжить чтение.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    # GzipFile сам распаковывает файл блоками, в память попадает только текущий блок
+    with opener(path, 'rb') as f:
+        header = f.readline()
+        columns = header.decode('utf-8').rstrip('\n').split('\t')
+        position = len(header)
+        if offset > position:
+            f.seek(offset)
+            position = offset
+        for line in f:
+            position += len(line)
+            values = line.decode('utf-8').rstrip('\n').split('\t')
+            yield position, dict(zip(columns, values))
+
+
+def tconst_number(tconst):
+    """Номер фильма из tconst: tt0111161 -> 111161. По нему упорядочены выгрузки"""
+    return int(tconst[2:])
+
+
+def group_by_tconst(rows):
+    """Склеивает подряд идущие строки одного фильма: (tconst, [строки])"""
+    current, group = None, []
+    for _, row in rows:
+        if row['tconst'] != current:
+            if group:
+                yield current, group
+            current, group = row['tconst'], []
+        group.append(row)
+    if group:
+        yield current, group
+
+
+class SortedLookup:
+    """
+    Поиск по отсортированному по номеру tconst потоку, когда запросы тоже идут по возрастанию.
+    Поток только продвигается вперед, поэтому память не растет.
+    """
+
+    def __init__(self, groups):
+        self.groups = iter(groups)
+        self.current = None
+        self.advance()
+
+    def advance(self):
+        group = next(self.groups, None)
+        self.current = None if group is None else (tconst_number(group[0]), group[1])
+
+    def get(self, tconst):
+        number = tconst_number(tconst)
+        while self.current is not None and self.current[0] < number:
+            self.advance()
+        if self.current is not None and self.current[0] == number:
+            return self.current[1]
+        return []
+
+
+class NameStaging:
+    """
+    Временная таблица nconst -> имя из name.basics.
+    В PostgreSQL заполняется через COPY, в остальных базах - пакетными INSERT.
+    """
+    table = 'imdb_name_staging'
+
+    def __init__(self):
+        self.is_postgres = connection.vendor == 'postgresql'
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {self.table} (nconst varchar(16) PRIMARY KEY, name varchar(255))'
+            )
+
+    def load(self, rows):
+        """rows - список пар (nconst, имя)"""
+        with connection.cursor() as cursor:
+            if self.is_postgres:
+                self.copy(cursor, rows)
+            else:
+                cursor.executemany(f'INSERT OR REPLACE INTO {self.table} VALUES (%s, %s)', rows)
+
+    def copy(self, cursor, rows):
+        buffer = io.StringIO()
+        for nconst, name in rows:
+            name = NULL if name is None else name.replace('\\', '\\\\')
+            buffer.write(f'{nconst}\t{name}\n')
+        buffer.seek(0)
+        sql = f'COPY {self.table} (nconst, name) FROM STDIN'
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):  # psycopg2
+            raw.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+    def resolve(self, nconsts):
+        """Словарь nconst -> имя для переданных идентификаторов"""
+        if not nconsts:
+            return {}
+        placeholders = ', '.join(['%s'] * len(nconsts))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT nconst, name FROM {self.table} WHERE nconst IN ({placeholders})', list(nconsts)
+            )
+            return {nconst: name for nconst, name in cursor.fetchall() if name}
@@ -0,0 +1,228 @@
+"""
+Быстрое извлечение данных со страниц IMDb.
+Сначала ищем встроенные JSON-блоки (__NEXT_DATA__ и application/ld+json) регулярным
+выражением, не строя DOM. Если их нет или в них не хватает полей - разбираем страницу
+через lxml (XPath). Контракт тот же, что у movies.imdb.parsers: (результат, предупреждения).
+Строки во встроенном JSON IMDb хранит с HTML-сущностями ("Schindler&apos;s List"),
+поэтому каждая взятая оттуда строка проходит через text().
+"""
+import html as html_entities
+import json
+import re
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:  # lxml не обязателен - тогда используем BeautifulSoup
+    lxml = None
+
+from movies.imdb import parsers
+from movies.imdb.parsers import IMDB_URL, imdb_id_from_url
+
+NEXT_DATA_RE = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S)
+LD_JSON_RE = re.compile(r'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>', re.S)
+
+
+def has_class(name):
+    """XPath-условие "у элемента есть CSS-класс name" (аналог .name в селекторе)"""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+def dig(data, *path):
+    """Безопасно достает вложенное значение: dig(d, 'a', 0, 'b') -> d['a'][0]['b'] или None"""
+    for key in path:
+        try:
+            data = data[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return data
+
+
+def text(value):
+    """Строка из встроенного JSON с раскрытыми HTML-сущностями, как у BeautifulSoup"""
+    return html_entities.unescape(value) if isinstance(value, str) else value
+
+
+def find_next_data(html):
+    match = NEXT_DATA_RE.search(html)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+def find_ld_json(html):
+    """Все JSON-LD блоки страницы"""
+    blocks = []
+    for match in LD_JSON_RE.finditer(html):
+        try:
+            blocks.append(json.loads(match.group(1)))
+        except ValueError:
+            continue
+    return blocks
+
+
+def lxml_document(html):
+    """DOM страницы или None: на пустом теле ответа lxml падает, а BeautifulSoup его разбирает"""
+    try:
+        return lxml.html.fromstring(html)
+    except (lxml.etree.ParserError, ValueError):
+        return None
+
+
+def extract_top_movies(html, count):
+    """Список топ-N фильмов: __NEXT_DATA__ -> lxml -> BeautifulSoup"""
+    edges = dig(find_next_data(html), 'props', 'pageProps', 'pageData', 'chartTitles', 'edges')
+    if edges:
+        movies, warnings = [], []
+        for edge in edges[:count]:
+            try:
+                node = edge.get('node') or {}
+                movies.append({
+                    'title': text(node['titleText']['text']),
+                    'year': int(node['releaseYear']['year']),
+                    'rating': float(node['ratingsSummary']['aggregateRating']),
+                    'url': f"{IMDB_URL}/title/{text(node['id'])}/",
+                    'imdb_id': text(node['id'])
+                })
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                warnings.append(f'Пропускаем фильм из-за ошибки: {e!r}')
+        return movies, warnings
+
+    if lxml is None:
+        return parsers.extract_top_movies(html, count)
+    return lxml_top_movies(html, count)
+
+
+def lxml_top_movies(html, count):
+    doc = lxml_document(html)
+    if doc is None:
+        return parsers.extract_top_movies(html, count)
+    movies, warnings = [], []
+
+    for item in doc.xpath(f'//li[{has_class("ipc-metadata-list-summary-item")}]')[:count]:
+        try:
+            raw_title = item.xpath(f'.//h3[{has_class("ipc-title__text")}]')[0].text_content()
+            title = raw_title.split('. ')[1]
+            year = int(item.xpath(f'.//span[{has_class("cli-title-metadata-item")}]')[0].text_content())
+            rating_text = item.xpath(f'.//span[{has_class("ipc-rating-star")}]')[0].text_content()
+            rating = float(rating_text.split()[0])
+            href = item.xpath(f'.//a[{has_class("ipc-title-link-wrapper")}]/@href')[0]
+            movies.append({
+                'title': title,
+                'year': year,
+                'rating': rating,
+                'url': IMDB_URL + href.split('?')[0],
+                'imdb_id': imdb_id_from_url(href)
+            })
+        except Exception as e:
+            warnings.append(f'Пропускаем фильм из-за ошибки: {e}')
+
+    return movies, warnings
+
+
+def next_data_details(data):
+    """Детали фильма из __NEXT_DATA__ страницы фильма"""
+    above = dig(data, 'props', 'pageProps', 'aboveTheFoldData')
+    if not above:
+        return None
+    main = dig(data, 'props', 'pageProps', 'mainColumnData') or {}
+
+    details = {
+        'description': text(dig(above, 'plot', 'plotText', 'plainText')) or "Нет описания",
+        'genres': [text(g['text']) for g in dig(above, 'genres', 'genres') or []][:3] or ['Unknown'],
+        'poster_url': text(dig(above, 'primaryImage', 'url')) or "",
+    }
+    director = (
+        dig(above, 'directorsPageTitle', 0, 'credits', 0, 'name')
+        or dig(main, 'directors', 0, 'credits', 0, 'name')
+    )
+    if dig(director, 'nameText', 'text'):
+        details['director'] = text(director['nameText']['text'])
+        details['director_id'] = text(director.get('id'))
+    edges = dig(main, 'cast', 'edges') or dig(above, 'castPageTitle', 'edges') or []
+    people = [dig(edge, 'node', 'name') for edge in edges[:5]]
+    people = [p for p in people if dig(p, 'nameText', 'text')]
+    details['actors'] = [text(p['nameText']['text']) for p in people] or ['Unknown']
+    details['actor_ids'] = [text(p.get('id')) for p in people]
+    return details
+
+
+def ld_json_details(blocks):
+    """Детали фильма из JSON-LD (schema.org Movie)"""
+    movie = next((b for b in blocks if isinstance(b, dict) and b.get('@type') == 'Movie'), None)
+    if not movie:
+        return None
+
+    genres = movie.get('genre') or []
+    if isinstance(genres, str):
+        genres = [g.strip() for g in genres.split(',')]
+    genres = [text(g) for g in genres]
+
+    def people(key):
+        return [p for p in movie.get(key) or [] if isinstance(p, dict) and p.get('name')]
+
+    actors = people('actor')[:5]
+    details = {
+        'description': text(movie.get('description')) or "Нет описания",
+        'genres': genres[:3] or ['Unknown'],
+        'actors': [text(p['name']) for p in actors] or ['Unknown'],
+        'actor_ids': [imdb_id_from_url(p.get('url')) for p in actors],
+        'poster_url': text(movie.get('image')) or "",
+    }
+    directors = people('director')
+    if directors:
+        details['director'] = text(directors[0]['name'])
+        details['director_id'] = imdb_id_from_url(directors[0].get('url'))
+    return details
+
+
+def extract_movie_details(html):
+    """Детали фильма: __NEXT_DATA__ -> JSON-LD -> lxml -> BeautifulSoup"""
+    try:
+        details = next_data_details(find_next_data(html)) or ld_json_details(find_ld_json(html))
+    except Exception as e:
+        # Неожиданная структура JSON на одной странице не должна останавливать весь разбор
+        return {}, [f'Ошибка парсинга деталей: {e!r}']
+    if details:
+        return details, []
+
+    if lxml is None:
+        return parsers.extract_movie_details(html)
+    return lxml_movie_details(html)
+
+
+def lxml_movie_details(html):
+    doc = lxml_document(html)
+    if doc is None:
+        return parsers.extract_movie_details(html)
+    details, warnings = {}, []
+
+    try:
+        desc = doc.xpath(f'//span[{has_class("sc-16ede01-0")}]')
+        details['description'] = desc[0].text_content() if desc else "Нет описания"
+
+        genres = [g.text_content() for g in doc.xpath(f'//a[{has_class("ipc-chip--on-baseAlt")}]')]
+        details['genres'] = genres[:3] if genres else ['Unknown']
+
+        director = doc.xpath(
+            '//div[@data-testid="title-pc-wide-screen"]'
+            '//span[text()="Director" or text()="Directors"][1]/following::a[1]'
+        )
+        if director:
+            details['director'] = director[0].text_content()
+            details['director_id'] = imdb_id_from_url(director[0].get('href'))
+
+        actor_links = doc.xpath('//a[@data-testid="title-cast-item__actor"]')[:5]
+        details['actors'] = [a.text_content() for a in actor_links] or ['Unknown']
+        details['actor_ids'] = [imdb_id_from_url(a.get('href')) for a in actor_links]
+
+        poster = doc.xpath(f'//img[{has_class("ipc-image")}]/@src')
+        details['poster_url'] = poster[0] if poster else ""
+
+    except Exception as e:
+        warnings.append(f'Ошибка парсинга деталей: {e}')
+
+    return details, warnings
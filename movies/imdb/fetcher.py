@@ -0,0 +1,156 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Статусы, при которых имеет смысл повторить запрос
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов по алгоритму token bucket.
+    rate - сколько токенов пополняется в секунду, capacity - размер "всплеска".
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Блокирует поток, пока не появится свободный токен"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Держит отдельный TokenBucket на каждый хост"""
+
+    def __init__(self, delay, burst=1):
+        # delay <= 0 означает "без ограничений"
+        self.rate = 1.0 / delay if delay > 0 else None
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        if self.rate is None:
+            return
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
+
+
+class FetchStats:
+    """Счетчики загрузки страниц (потокобезопасные)"""
+
+    def __init__(self):
+        self.pages = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes = 0
+        self.started_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, **counters):
+        with self.lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started_at
+        rate = self.pages / elapsed if elapsed else 0.0
+        return (
+            f'Страниц: {self.pages}, ошибок: {self.errors}, повторов: {self.retries}, '
+            f'{self.bytes / 1024:.0f} КБ за {elapsed:.1f} с ({rate:.2f} стр/с)'
+        )
+
+
+class Fetcher:
+    """
+    Загрузчик страниц с общим пулом соединений.
+    Можно безопасно вызывать из нескольких потоков.
+    """
+
+    def __init__(self, delay=2.0, workers=1, retries=3, backoff=1.0, timeout=10, cache=None):
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = HostRateLimiter(delay)
+        self.stats = FetchStats()
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(workers, 1))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def retry_delay(self, response, attempt):
+        """Пауза перед повтором: Retry-After от сервера или экспоненциальный backoff"""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * (2 ** attempt)
+
+    def get(self, url):
+        """
+        Загружает страницу и возвращает ее текст.
+        При 429/5xx и сетевых ошибках повторяет запрос, в конце пробрасывает исключение.
+        Если задан кэш, свежие страницы берутся из него, устаревшие перепроверяются через 304.
+        """
+        entry = self.cache.lookup(url) if self.cache else None
+        if entry and entry['fresh']:
+            return self.cache.read(url, entry)
+        headers = self.cache.conditional_headers(entry) if self.cache else {}
+
+        for attempt in range(self.retries + 1):
+            self.limiter.wait(url)
+            response = None
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+                if response.status_code == 304 and entry:
+                    return self.cache.read(url, entry, revalidated=True)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    self.stats.add(pages=1, bytes=len(response.content))
+                    if self.cache:
+                        self.cache.store(url, response)
+                    return response.text
+                error = requests.HTTPError(f'{response.status_code} для {url}', response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except requests.RequestException:
+                self.stats.add(errors=1)
+                raise
+
+            if attempt == self.retries:
+                self.stats.add(errors=1)
+                raise error
+            self.stats.add(retries=1)
+            time.sleep(self.retry_delay(response, attempt))
+
+    def close(self):
+        self.session.close()
+        if self.cache:
+            self.cache.close()
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+
+
+def content_hash(movie_data, details):
+    """Хэш извлеченных полей фильма - по нему определяем, что данные не изменились"""
+    payload = json.dumps({'movie': movie_data, 'details': details}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CheckpointJournal:
+    """
+    Журнал обработанных страниц в формате JSONL.
+    Каждый запуск начинается строкой {"run": ...}, затем по строке на фильм:
+    {"run": ..., "url": ..., "hash": ..., "status": "saved" | "unchanged"}.
+    Фильм записывается в журнал только после успешного сохранения его пачки,
+    поэтому после падения --resume продолжает с первого несохраненного фильма.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.hashes = {}  # url -> последний сохраненный хэш (по всем запускам)
+        self.done = set()  # url, обработанные в текущем запуске
+        last_run = None
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Недописанная строка после падения
+                    if 'url' not in record:
+                        last_run = record['run']
+                        run_done = set()
+                        continue
+                    self.hashes[record['url']] = record['hash']
+                    if record['run'] == last_run:
+                        run_done.add(record['url'])
+
+        self.file = open(path, 'a', encoding='utf-8')
+        if self.file.tell() and not self.ends_with_newline():
+            self.file.write('\n')
+        if resume and last_run is not None:
+            self.run = last_run
+            self.done = run_done
+        else:
+            self.run = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+            self.write({'run': self.run})
+
+    def ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def is_done(self, url):
+        return url in self.done
+
+    def is_unchanged(self, url, digest):
+        return self.hashes.get(url) == digest
+
+    def record(self, url, digest, status):
+        self.hashes[url] = digest
+        self.done.add(url)
+        self.write({'run': self.run, 'url': url, 'hash': digest, 'status': status})
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def flush(self):
+        """Сбрасывает журнал на диск (вызывается после каждой сохраненной пачки)"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.flush()
+        self.file.close()
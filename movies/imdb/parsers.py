@@ -0,0 +1,105 @@
+"""
+Извлечение данных из HTML-страниц IMDb.
+Функции не зависят от Django и сети, поэтому их можно запускать в отдельных процессах.
+Каждая возвращает пару (результат, список предупреждений).
+"""
+import re
+
+from bs4 import BeautifulSoup
+
+IMDB_URL = "https://www.imdb.com"
+
+IMDB_ID_RE = re.compile(r'/(?:title|name)/((?:tt|nm)\d+)')
+
+
+def imdb_id_from_url(url):
+    """
+    Идентификатор IMDb из ссылки:
+    /title/tt0111161/?ref_=... -> tt0111161, /name/nm0000209/ -> nm0000209
+    """
+    match = IMDB_ID_RE.search(url or '')
+    return match.group(1) if match else None
+
+
+def extract_top_movies(html, count):
+    """
+    Разбирает страницу топа IMDb
+    Возвращает список словарей с базовой информацией о фильмах
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    movies, warnings = [], []
+
+    # Ищем все элементы с фильмами в таблице
+    for item in soup.select('li.ipc-metadata-list-summary-item')[:count]:
+        try:
+            # Извлекаем номер, название и год (формат: "1. Название (2023)")
+            raw_title = item.select_one('h3.ipc-title__text').text
+            title = raw_title.split('. ')[1]  # Убираем номер из начала
+
+            # Год выпуска (первый элемент в metadata)
+            year = int(item.select('span.cli-title-metadata-item')[0].text)
+
+            # Рейтинг (формат: "8.7 (1.2M)")
+            rating_text = item.select_one('span.ipc-rating-star').text
+            rating = float(rating_text.split()[0])  # Берем только число
+
+            # Ссылка на страницу фильма
+            movie_url = IMDB_URL + item.select_one('a.ipc-title-link-wrapper')['href'].split('?')[0]
+
+            movies.append({
+                'title': title,
+                'year': year,
+                'rating': rating,
+                'url': movie_url,
+                'imdb_id': imdb_id_from_url(movie_url)
+            })
+        except Exception as e:
+            warnings.append(f'Пропускаем фильм из-за ошибки: {e}')
+
+    return movies, warnings
+
+
+def extract_movie_details(html):
+    """
+    Разбирает страницу фильма
+    Возвращает словарь с доп. данными (описание, жанры, актеры)
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    details, warnings = {}, []
+
+    try:
+        # Описание фильма
+        desc_tag = soup.select_one('span.sc-16ede01-0')
+        details['description'] = desc_tag.text if desc_tag else "Нет описания"
+
+        # Жанры (первые 3)
+        genres = [g.text for g in soup.select('a.ipc-chip--on-baseAlt')]
+        details['genres'] = genres[:3] if genres else ['Unknown']
+
+        # Режиссер (может быть несколько, берем первого)
+        director_section = soup.find('div', {'data-testid': 'title-pc-wide-screen'})
+        if director_section:
+            director_label = director_section.find('span', string='Director') or \
+                             director_section.find('span', string='Directors')
+            if director_label:
+                director_link = director_label.find_next('a')
+                details['director'] = director_link.text
+                details['director_id'] = imdb_id_from_url(director_link.get('href'))
+
+        # Актеры (первые 5 в списке)
+        actors, actor_ids = [], []
+        actor_blocks = soup.select('a[data-testid="title-cast-item__actor"]')[:5]
+        for actor in actor_blocks:
+            actors.append(actor.text)
+            actor_ids.append(imdb_id_from_url(actor.get('href')))
+        details['actors'] = actors if actors else ['Unknown']
+        details['actor_ids'] = actor_ids
+
+        # Ссылка на постер
+        poster_img = soup.select_one('img.ipc-image')
+        details['poster_url'] = poster_img['src'] if poster_img else ""
+
+    except Exception as e:
+        warnings.append(f'Ошибка парсинга деталей: {e}')
+
+    return details, warnings
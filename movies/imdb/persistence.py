@@ -0,0 +1,288 @@
+from datetime import date
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from movies.models import Movie, Director, Actor, Tag
+from movies.people import index_names
+from movies.signals import movies_bulk_saved
+from movies.text import fold
+
+
+class QueryCounter:
+    """Считает SQL-запросы через execute_wrapper (работает и без DEBUG)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class NameCache:
+    """
+    Кэш name -> id для моделей с полем name (Director, Actor, Tag).
+    Неизвестные имена добираются одним запросом и одним bulk_create на пачку.
+    max_size ограничивает размер кэша при загрузке больших выгрузок.
+    """
+
+    def __init__(self, model, max_size=None):
+        self.model = model
+        self.max_size = max_size
+        self.ids = {}
+
+    def resolve(self, names):
+        """Возвращает словарь name -> id для всех переданных имен"""
+        missing = {name for name in names if name not in self.ids}
+        if missing and self.max_size and len(self.ids) + len(missing) > self.max_size:
+            self.ids = {name: self.ids[name] for name in names if name in self.ids}
+        if missing:
+            self.load(missing)
+            still_missing = missing - self.ids.keys()
+            if still_missing:
+                self.model.objects.bulk_create(
+                    [self.create(name) for name in still_missing],
+                    ignore_conflicts=True
+                )
+                self.load(still_missing)
+                self.created([self.ids[name] for name in still_missing])
+        return {name: self.ids[name] for name in names}
+
+    def create(self, name, **fields):
+        return self.model(name=name, **fields)
+
+    def created(self, ids):
+        """Записи ids только что вставлены bulk_create (save() и сигналы не вызывались)"""
+
+    def load(self, names):
+        # Имена актеров и режиссеров не уникальны - берем самую раннюю запись
+        rows = self.model.objects.filter(name__in=names).order_by('-id').values_list('name', 'id')
+        self.ids.update(rows)
+
+
+class PersonCache(NameCache):
+    """
+    Кэш для актеров и режиссеров: если известен IMDb ID (nm...), персона
+    сохраняется upsert'ом по нему, иначе ищется по имени как раньше.
+    """
+
+    def __init__(self, model, max_size=None):
+        super().__init__(model, max_size)
+        self.by_imdb_id = {}
+
+    def resolve_people(self, people):
+        """people - множество пар (imdb_id или None, имя). Возвращает словарь пара -> id"""
+        keyed = {imdb_id: name for imdb_id, name in people if imdb_id}
+        missing = {imdb_id for imdb_id in keyed if imdb_id not in self.by_imdb_id}
+        if missing and self.max_size and len(self.by_imdb_id) + len(missing) > self.max_size:
+            self.by_imdb_id = {i: self.by_imdb_id[i] for i in keyed if i in self.by_imdb_id}
+        if missing:
+            self.adopt_legacy_rows({imdb_id: keyed[imdb_id] for imdb_id in missing})
+            # INSERT ... ON CONFLICT (imdb_id) DO UPDATE SET name = EXCLUDED.name
+            self.model.objects.bulk_create(
+                [self.create(keyed[imdb_id], imdb_id=imdb_id) for imdb_id in missing],
+                update_conflicts=True,
+                unique_fields=['imdb_id'],
+                update_fields=['name', 'search_name']
+            )
+            self.by_imdb_id.update(
+                self.model.objects.filter(imdb_id__in=missing).values_list('imdb_id', 'id')
+            )
+            # Upsert мог и переименовать существующих людей - ключи пересобираются для всех
+            self.created([self.by_imdb_id[imdb_id] for imdb_id in missing])
+
+        by_name = self.resolve({name for imdb_id, name in people if not imdb_id})
+        return {
+            (imdb_id, name): self.by_imdb_id[imdb_id] if imdb_id else by_name[name]
+            for imdb_id, name in people
+        }
+
+    def create(self, name, **fields):
+        # bulk_create не вызывает save() - нормализованное имя и ключи поиска заполняем сами
+        return self.model(name=name, search_name=fold(name), **fields)
+
+    def created(self, ids):
+        index_names(self.model, ids)
+
+    def adopt_legacy_rows(self, names):
+        """Персонам, сохраненным раньше без imdb_id, проставляем ключ по совпадению имени"""
+        taken = set(self.model.objects.filter(imdb_id__in=names).values_list('imdb_id', flat=True))
+        wanted = {}
+        for imdb_id, name in names.items():
+            if imdb_id not in taken:
+                wanted.setdefault(name, imdb_id)
+        adopted = []
+        for person in self.model.objects.filter(imdb_id__isnull=True, name__in=wanted).order_by('id'):
+            imdb_id = wanted.pop(person.name, None)
+            if imdb_id:
+                person.imdb_id = imdb_id
+                adopted.append(person)
+        if adopted:
+            self.model.objects.bulk_update(adopted, ['imdb_id'])
+
+
+def people_of(details):
+    """Актеры фильма парами (imdb_id, имя), не больше 5"""
+    actors = details.get('actors', [])[:5]
+    actor_ids = details.get('actor_ids') or []
+    return [(actor_ids[i] if i < len(actor_ids) else None, name) for i, name in enumerate(actors)]
+
+
+class BulkMovieWriter:
+    """
+    Пакетное сохранение фильмов вместо get_or_create на каждую строку.
+    Фильмы с IMDb ID сохраняются upsert'ом по ключу (ON CONFLICT DO UPDATE),
+    каждая пачка пишется в одной транзакции, связи M2M - через bulk_create.
+    """
+    # Поля, которые есть не у всех источников (в выгрузках IMDb нет описаний и постеров,
+    # режиссер находится не всегда) - если значения нет, сохраненное не затираем
+    optional_fields = ('description', 'poster_url', 'director_id')
+
+    def __init__(self, cache_size=None):
+        self.directors = PersonCache(Director, cache_size)
+        self.actors = PersonCache(Actor, cache_size)
+        self.tags = NameCache(Tag, cache_size)
+
+    def write_batch(self, records):
+        """
+        records - список пар (movie_data, details) из parse_top_movies/parse_movie_details.
+        Возвращает словарь со счетчиками created/updated/queries.
+        """
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter), transaction.atomic():
+            result = self._write(records)
+        result['queries'] = counter.count
+        return result
+
+    def _write(self, records):
+        director_ids = self.directors.resolve_people(
+            {(d.get('director_id'), d['director']) for _, d in records if d.get('director')}
+        )
+        actor_ids = self.actors.resolve_people(
+            {person for _, d in records for person in people_of(d)}
+        )
+        tag_ids = self.tags.resolve(
+            {name for _, d in records for name in d.get('genres', [])[:3]}
+        )
+
+        now = timezone.now()
+        movies = {}  # ключ записи -> Movie (дубликаты внутри пачки схлопываются)
+        for movie_data, details in records:
+            movie = movies.setdefault(self.key(movie_data), Movie(imdb_id=movie_data.get('imdb_id')))
+            movie.title = movie_data['title']
+            movie.release_date = date(movie_data['year'], 1, 1)
+            movie.rating = movie_data['rating']
+            movie.updated_at = now
+            for field in ('description', 'poster_url'):
+                if field in details:
+                    setattr(movie, field, details[field])
+            if details.get('director'):
+                movie.director_id = director_ids[(details.get('director_id'), details['director'])]
+
+        keyed = [m for m in movies.values() if m.imdb_id]
+        legacy = [m for m in movies.values() if not m.imdb_id]
+        self.adopt_legacy_rows(keyed)
+        existing = set(
+            Movie.objects.filter(imdb_id__in=[m.imdb_id for m in keyed]).values_list('imdb_id', flat=True)
+        )
+        self.upsert(keyed)
+        created, updated = self.save_legacy(legacy)
+        created += len(keyed) - len(existing)
+        updated += len(existing)
+
+        actor_links, tag_links = [], []
+        for movie_data, details in records:
+            movie = movies[self.key(movie_data)]
+            for person in people_of(details):
+                actor_links.append(Movie.actors.through(movie_id=movie.pk, actor_id=actor_ids[person]))
+            for name in details.get('genres', [])[:3]:
+                tag_links.append(Movie.tags.through(movie_id=movie.pk, tag_id=tag_ids[name]))
+        Movie.actors.through.objects.bulk_create(actor_links, ignore_conflicts=True)
+        Movie.tags.through.objects.bulk_create(tag_links, ignore_conflicts=True)
+        # bulk-операции не вызывают сигналы - поисковые индексы обновляются пачкой
+        movies_bulk_saved.send(sender=type(self), movie_ids=[movie.pk for movie in movies.values()])
+
+        return {'created': created, 'updated': updated}
+
+    def key(self, movie_data):
+        return movie_data.get('imdb_id') or (movie_data['title'], movie_data['year'])
+
+    def adopt_legacy_rows(self, movies):
+        """
+        Фильмы, сохраненные до появления imdb_id, ищем по названию и году
+        и проставляем им ключ, чтобы upsert обновил их, а не создал дубликаты.
+        """
+        wanted = {(m.title, m.release_date): m.imdb_id for m in movies}
+        if not wanted:
+            return
+        orphans = Movie.objects.filter(imdb_id__isnull=True, title__in={title for title, _ in wanted})
+        adopted = []
+        for movie in orphans:
+            imdb_id = wanted.pop((movie.title, movie.release_date), None)
+            if imdb_id:
+                movie.imdb_id = imdb_id
+                adopted.append(movie)
+        if adopted:
+            # Ключ мог уже занять другой фильм - тогда оставляем старую запись как есть
+            taken = set(Movie.objects.filter(
+                imdb_id__in=[m.imdb_id for m in adopted]
+            ).values_list('imdb_id', flat=True))
+            Movie.objects.bulk_update([m for m in adopted if m.imdb_id not in taken], ['imdb_id'])
+
+    def provided_fields(self, movie):
+        return tuple(f for f in self.optional_fields if getattr(movie, f) not in (None, ''))
+
+    def upsert(self, movies):
+        """INSERT ... ON CONFLICT (imdb_id) DO UPDATE одним запросом на набор полей"""
+        groups = {}
+        for movie in movies:
+            groups.setdefault(self.provided_fields(movie), []).append(movie)
+
+        for fields, group in groups.items():
+            Movie.objects.bulk_create(
+                group,
+                update_conflicts=True,
+                unique_fields=['imdb_id'],
+                update_fields=['title', 'release_date', 'rating', 'updated_at', *fields]
+            )
+        if any(m.pk is None for m in movies):
+            # Бэкенд не вернул id - дочитываем их по ключу
+            ids = dict(Movie.objects.filter(
+                imdb_id__in=[m.imdb_id for m in movies]
+            ).values_list('imdb_id', 'id'))
+            for movie in movies:
+                movie.pk = ids[movie.imdb_id]
+
+    def save_legacy(self, movies):
+        """Фильмы без IMDb ID: поиск по названию и году, затем bulk_create/bulk_update"""
+        if not movies:
+            return 0, 0
+        existing = {
+            (m.title, m.release_date): m
+            for m in Movie.objects.filter(imdb_id__isnull=True, title__in={m.title for m in movies})
+        }
+        to_create, to_update = [], []
+        for movie in movies:
+            current = existing.get((movie.title, movie.release_date))
+            if current:
+                movie.pk = current.pk
+                for field in set(self.optional_fields) - set(self.provided_fields(movie)):
+                    setattr(movie, field, getattr(current, field))
+                to_update.append(movie)
+            else:
+                to_create.append(movie)
+
+        Movie.objects.bulk_create(to_create)
+        if to_create and to_create[0].pk is None:
+            ids = {
+                (m.title, m.release_date): m.pk
+                for m in Movie.objects.filter(title__in={m.title for m in to_create})
+            }
+            for movie in to_create:
+                movie.pk = ids[(movie.title, movie.release_date)]
+        if to_update:
+            Movie.objects.bulk_update(
+                to_update, ['rating', 'description', 'poster_url', 'director', 'updated_at']
+            )
+        return len(to_create), len(to_update)
@@ -0,0 +1,142 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+# Маркер конца потока данных между стадиями
+DONE = object()
+
+
+def timed_call(func, arg):
+    """Вызывает func(arg) и возвращает (результат, время работы) - для статистики стадии"""
+    started = time.perf_counter()
+    result = func(arg)
+    return result, time.perf_counter() - started
+
+
+class StageStats:
+    """Статистика одной стадии: число элементов, время работы и глубина входной очереди"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.depth_sum = 0
+        self.depth_samples = 0
+        self.depth_max = 0
+        self.lock = threading.Lock()
+
+    def add(self, items, seconds):
+        with self.lock:
+            self.items += items
+            self.busy += seconds
+
+    def sample_depth(self, depth):
+        with self.lock:
+            self.depth_sum += depth
+            self.depth_samples += 1
+            self.depth_max = max(self.depth_max, depth)
+
+    def summary(self, elapsed):
+        rate = self.items / elapsed if elapsed else 0.0
+        # Сколько элементов в секунду успевает один исполнитель стадии
+        capacity = self.items / self.busy if self.busy else 0.0
+        avg_depth = self.depth_sum / self.depth_samples if self.depth_samples else 0.0
+        return (
+            f'{self.name}: {self.items} шт., {rate:.2f} шт/с, '
+            f'{capacity:.2f} шт/с на исполнителя (работа {self.busy:.1f} с), '
+            f'очередь перед стадией сред. {avg_depth:.1f} / макс. {self.depth_max}'
+        )
+
+
+class IngestPipeline:
+    """
+    Потоковый конвейер fetch -> parse -> persist.
+    Загрузка идет в пуле потоков, разбор HTML - в пуле процессов,
+    сохранение выполняет вызывающий поток, забирая результаты из run().
+    Стадии связаны ограниченными очередями, поэтому быстрая стадия ждет медленную
+    и в памяти одновременно лежит не больше queue_size страниц на очередь.
+    """
+
+    def __init__(self, fetch, parse, fetch_workers=1, parse_workers=1, queue_size=16):
+        self.fetch = fetch
+        self.parse = parse
+        self.fetch_workers = max(fetch_workers, 1)
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.stats = {name: StageStats(name) for name in ('fetch', 'parse', 'persist')}
+        self.started_at = None
+
+    def run(self, items):
+        """
+        Генератор пар (элемент, результат разбора) в порядке завершения загрузки.
+        Если страницу загрузить не удалось, результат - None.
+        """
+        self.started_at = time.monotonic()
+        todo = queue.Queue()
+        for item in items:
+            todo.put(item)
+        pages = queue.Queue(maxsize=self.queue_size)
+        parsed = queue.Queue(maxsize=self.queue_size)
+
+        fetchers = [
+            threading.Thread(target=self.fetch_worker, args=(todo, pages), daemon=True)
+            for _ in range(self.fetch_workers)
+        ]
+        pool = ProcessPoolExecutor(self.parse_workers) if self.parse_workers > 0 else None
+        dispatcher = threading.Thread(target=self.parse_dispatcher, args=(pages, parsed, pool), daemon=True)
+        for thread in fetchers + [dispatcher]:
+            thread.start()
+
+        try:
+            while True:
+                self.stats['persist'].sample_depth(parsed.qsize())
+                entry = parsed.get()
+                if entry is DONE:
+                    break
+                item, future = entry
+                if future is None:
+                    yield item, None
+                    continue
+                result, seconds = future.result()
+                self.stats['parse'].add(1, seconds)
+                yield item, result
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+    def fetch_worker(self, todo, pages):
+        while True:
+            self.stats['fetch'].sample_depth(todo.qsize())
+            try:
+                item = todo.get_nowait()
+            except queue.Empty:
+                pages.put(DONE)
+                return
+            html, seconds = timed_call(self.fetch, item)
+            self.stats['fetch'].add(1, seconds)
+            pages.put((item, html))
+
+    def parse_dispatcher(self, pages, parsed, pool):
+        """Отправляет страницы на разбор; в очередь результатов кладет future"""
+        finished = 0
+        while finished < self.fetch_workers:
+            self.stats['parse'].sample_depth(pages.qsize())
+            entry = pages.get()
+            if entry is DONE:
+                finished += 1
+                continue
+            item, html = entry
+            if html is None:
+                parsed.put((item, None))
+            elif pool:
+                parsed.put((item, pool.submit(timed_call, self.parse, html)))
+            else:
+                future = Future()
+                future.set_result(timed_call(self.parse, html))
+                parsed.put((item, future))
+        parsed.put(DONE)
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return [stats.summary(elapsed) for stats in self.stats.values()]
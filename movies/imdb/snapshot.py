@@ -0,0 +1,85 @@
+import gzip
+import os
+from urllib.parse import urlsplit
+
+from movies.imdb.fetcher import FetchStats
+
+
+def snapshot_name(url):
+    """
+    Имя файла снимка для URL.
+    https://www.imdb.com/title/tt0111161/ -> title_tt0111161.html
+    """
+    path = urlsplit(url).path.strip('/') or 'index'
+    return path.replace('/', '_') + '.html'
+
+
+def read_page(path):
+    """Читает HTML из файла, .gz распаковывается автоматически"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+class SnapshotSource:
+    """
+    Источник страниц из локального снимка вместо сети.
+    Ищет <имя>.html или <имя>.html.gz в каталоге,
+    страницу чарта можно подменить отдельным файлом (chart_file).
+    """
+
+    def __init__(self, directory=None, chart_file=None, chart_url=None):
+        self.directory = directory
+        self.chart_file = chart_file
+        self.chart_url = chart_url
+        self.stats = FetchStats()
+
+    def find(self, url):
+        if self.chart_file and url == self.chart_url:
+            return self.chart_file
+        if self.directory:
+            name = os.path.join(self.directory, snapshot_name(url))
+            for path in (name, name + '.gz'):
+                if os.path.exists(path):
+                    return path
+        raise FileNotFoundError(f'Нет страницы в снимке: {url}')
+
+    def get(self, url):
+        try:
+            html = read_page(self.find(url))
+        except FileNotFoundError:
+            self.stats.add(errors=1)
+            raise
+        self.stats.add(pages=1, bytes=len(html))
+        return html
+
+    def close(self):
+        pass
+
+
+class SnapshotWriter:
+    """Обертка над загрузчиком, сохраняющая каждую полученную страницу в каталог снимка"""
+
+    def __init__(self, fetcher, directory, compress=False):
+        self.fetcher = fetcher
+        self.directory = directory
+        self.compress = compress
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def stats(self):
+        return self.fetcher.stats
+
+    def get(self, url):
+        html = self.fetcher.get(url)
+        path = os.path.join(self.directory, snapshot_name(url))
+        if self.compress:
+            with gzip.open(path + '.gz', 'wt', encoding='utf-8') as f:
+                f.write(html)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(html)
+        return html
+
+    def close(self):
+        self.fetcher.close()
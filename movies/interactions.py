@@ -0,0 +1,81 @@
+"""
+Матрица взаимодействий пользователь x фильм для коллаборативной фильтрации.
+Источники и веса: избранное (User.favorite_movies и Movie.liked_by), отзывы
+(оценка / 10) и история просмотров (UserActivity). Если у пары пользователь-фильм
+несколько источников, берется наибольший вес.
+Матрица хранится в формате COO на массивах NumPy; by_movie() и by_user()
+дают ее построчные (CSR) представления.
+"""
+import numpy as np
+
+from movies.models import Movie, Review, UserActivity
+
+FAVORITE_WEIGHT = 1.0
+VIEW_WEIGHT = 0.3
+
+
+def csr(rows, cols, values, size):
+    """Сортировка COO по строкам: (indptr, cols, values)"""
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    return indptr, cols[order], values[order]
+
+
+class Interactions:
+    """user_ids и movie_ids - id строк и столбцов; users, movies, values - ненулевые элементы"""
+
+    def __init__(self, user_ids, movie_ids, users, movies, values):
+        self.user_ids = user_ids
+        self.movie_ids = movie_ids
+        self.users = users
+        self.movies = movies
+        self.values = values
+
+    @classmethod
+    def load(cls):
+        sources = [
+            (Movie.liked_by.through.objects.values_list('user_id', 'movie_id'), FAVORITE_WEIGHT),
+            (Movie.favorited_by.through.objects.values_list('user_id', 'movie_id'), FAVORITE_WEIGHT),
+            (UserActivity.objects.values_list('user_id', 'movie_id').distinct(), VIEW_WEIGHT),
+        ]
+        triples = [
+            np.array([(user_id, movie_id, weight) for user_id, movie_id in rows.iterator()], dtype=np.float64)
+            for rows, weight in sources
+        ]
+        triples.append(np.array(
+            [(user_id, movie_id, rating / 10) for user_id, movie_id, rating in
+             Review.objects.filter(rating__gt=0).values_list('user_id', 'movie_id', 'rating').iterator()],
+            dtype=np.float64
+        ))
+        triples = np.concatenate([t.reshape(-1, 3) for t in triples])
+        return cls.from_triples(triples[:, 0].astype(np.int64), triples[:, 1].astype(np.int64), triples[:, 2])
+
+    @classmethod
+    def from_triples(cls, user_ids, movie_ids, weights):
+        """Из параллельных массивов (id пользователя, id фильма, вес); повторы пар - по максимуму"""
+        user_index, users = np.unique(user_ids, return_inverse=True)
+        movie_index, movies = np.unique(movie_ids, return_inverse=True)
+        keys = users.astype(np.int64) * len(movie_index) + movies
+        order = np.lexsort((-weights, keys))
+        keys, weights = keys[order], weights[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        keys = keys[first]
+        return cls(
+            user_index, movie_index,
+            keys // max(len(movie_index), 1), keys % max(len(movie_index), 1),
+            weights[first].astype(np.float32)
+        )
+
+    @property
+    def shape(self):
+        return len(self.user_ids), len(self.movie_ids)
+
+    def by_movie(self):
+        """Для каждого фильма - его пользователи: (indptr, users, values)"""
+        return csr(self.movies, self.users, self.values, len(self.movie_ids))
+
+    def by_user(self):
+        """Для каждого пользователя - его фильмы: (indptr, movies, values)"""
+        return csr(self.users, self.movies, self.values, len(self.user_ids))
@@ -0,0 +1,164 @@
+import json
+import os
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from movies.imdb.benchmarks import (
+    actor_filter_cases, ann_cases, autocomplete_case, find_regressions, fuzzy_cases, parse_cases, persist_case,
+    recommendation_cases, tag_filter_cases
+)
+from movies.imdb.snapshot import read_page
+
+
+class Command(BaseCommand):
+    """
+    Набор замеров разбора и сохранения данных IMDb, поиска с опечатками, подсказок,
+    фильтров по тегам и актерам, рекомендаций и похожих фильмов (ANN, с recall@k).
+    Результаты пишутся в JSON, чтобы сравнивать их между коммитами;
+    с --baseline команда падает, если какой-то замер стал медленнее порога.
+    """
+    help = 'Benchmark IMDb parsing, persistence, search and filtering'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default=os.path.join(settings.BASE_DIR, 'imdb_backup.html'),
+            help='Сохраненная страница топа (по умолчанию imdb_backup.html)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Сколько раз повторять каждый замер (по умолчанию 5)'
+        )
+        parser.add_argument(
+            '--chart-sizes',
+            default='250,1000,10000',
+            help='Размеры синтетических страниц топа через запятую'
+        )
+        parser.add_argument(
+            '--records',
+            type=int,
+            default=1000,
+            help='Сколько записей сохранять в замере базы (по умолчанию 1000)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Размер пачки в замере базы (по умолчанию 200)'
+        )
+        parser.add_argument(
+            '--catalog-size',
+            type=int,
+            default=500000,
+            help='Размер синтетического каталога для замеров поиска с опечатками и подсказок (0 - пропустить)'
+        )
+        parser.add_argument(
+            '--tag-movies',
+            type=int,
+            default=10000,
+            help='Сколько фильмов создавать для замера фильтра по тегам (0 - пропустить)'
+        )
+        parser.add_argument(
+            '--actors',
+            type=int,
+            default=1000000,
+            help='Сколько актеров создавать для замера фильтра по актерам (0 - пропустить)'
+        )
+        parser.add_argument(
+            '--recommendation-movies',
+            type=int,
+            default=10000,
+            help='Сколько фильмов создавать для замера рекомендаций (0 - пропустить)'
+        )
+        parser.add_argument(
+            '--ann-movies',
+            type=int,
+            default=500000,
+            help='Размер синтетического каталога векторов для замера ANN (0 - пропустить)'
+        )
+        parser.add_argument(
+            '--only',
+            help='Запускать только замеры, в имени которых есть эта строка'
+        )
+        parser.add_argument(
+            '--output',
+            help='Куда записать результаты в JSON'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON с прошлыми результатами для сравнения'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Допустимое падение ops/sec относительно --baseline (по умолчанию 0.2 = 20%%)'
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['chart_sizes'].split(',') if size.strip()]
+        cases = parse_cases(read_page(options['file']), sizes)
+        cases.append(persist_case(options['records'], options['batch_size']))
+        if options['catalog_size'] and (not options['only'] or 'fuzzy' in options['only']):
+            cases += fuzzy_cases(options['catalog_size'])
+        if options['catalog_size'] and (not options['only'] or 'autocomplete' in options['only']):
+            cases.append(autocomplete_case(options['catalog_size']))
+        if options['tag_movies'] and (not options['only'] or 'tags' in options['only']):
+            cases += tag_filter_cases(options['tag_movies'])
+        if options['actors'] and (not options['only'] or 'actors' in options['only']):
+            cases += actor_filter_cases(options['actors'])
+        if options['recommendation_movies'] and (not options['only'] or 'recommend' in options['only']):
+            cases += recommendation_cases(options['recommendation_movies'])
+        if options['ann_movies'] and (not options['only'] or 'ann' in options['only']):
+            cases += ann_cases(options['ann_movies'])
+        if options['only']:
+            cases = [case for case in cases if options['only'] in case.name]
+
+        results = []
+        for case in cases:
+            result = case.run(options['repeat'])
+            results.append(result)
+            self.stdout.write(
+                f"{result['name']:<32} {result['ops_per_sec']:>12.1f} ops/s "
+                f"{result['seconds_per_call'] * 1000:>10.2f} мс/вызов "
+                f"{result['queries_per_call']:>8.1f} SQL/вызов "
+                f"peak RSS {result['peak_rss_mb']:.0f} МБ"
+                + ''.join(f' {key}={result[key]:.3f}' for key in result if key.startswith('recall'))
+            )
+
+        report = {
+            'commit': self.git_commit(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Результаты сохранены в {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+            regressions = find_regressions(results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError('Регрессия производительности:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS(
+                f"Регрессий нет относительно {baseline.get('commit') or options['baseline']}"
+            ))
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+import re
+import resource
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.imdb import fast_parsers, parsers
+from movies.imdb.snapshot import read_page
+
+# Способы разбора страницы топа: BeautifulSoup (как раньше), встроенный JSON, lxml
+CHART_PARSERS = {
+    'soup': parsers.extract_top_movies,
+    'fast': fast_parsers.extract_top_movies,
+    'lxml': fast_parsers.lxml_top_movies,
+}
+DETAIL_PARSERS = {
+    'soup': parsers.extract_movie_details,
+    'fast': fast_parsers.extract_movie_details,
+    'lxml': fast_parsers.lxml_movie_details,
+}
+
+
+ENTITY_RE = re.compile(r'&(?:#\d+|#x[0-9a-f]+|[a-z]+);', re.I)
+
+
+def entity_problems(rows):
+    """Строки с нераскрытыми HTML-сущностями ("Schindler&apos;s List")"""
+    return [
+        value for row in rows for value in row.values()
+        for value in (value if isinstance(value, list) else [value])
+        if isinstance(value, str) and ENTITY_RE.search(value)
+    ]
+
+
+def comparable(details):
+    """
+    Детали для сравнения: постер в JSON - исходное изображение, а в HTML - уменьшенная
+    копия (суффикс ._V1_...), поэтому сравнивается только его наличие.
+    """
+    return {**details, 'poster_url': bool(details.get('poster_url'))}
+
+
+def measure_memory(func, args, conn):
+    """Выполняется в дочернем процессе: прирост RSS и пик памяти Python-объектов за один разбор"""
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn.send((peak, (rss_after - rss_before) * 1024))  # ru_maxrss в КБ
+    conn.close()
+
+
+class Command(BaseCommand):
+    """
+    Микробенчмарк разбора страниц IMDb: BeautifulSoup против встроенного JSON и lxml.
+    Заодно проверяет, что быстрые способы дают те же данные, что и BeautifulSoup.
+    """
+    help = 'Compare IMDb page parsers on saved pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default=os.path.join(settings.BASE_DIR, 'imdb_backup.html'),
+            help='Сохраненная страница топа (по умолчанию imdb_backup.html)'
+        )
+        parser.add_argument(
+            '--from-dir',
+            help='Каталог снимка со страницами фильмов для сравнения разбора деталей'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Сколько раз разбирать каждую страницу (по умолчанию 20)'
+        )
+
+    def handle(self, *args, **options):
+        chart_html = read_page(options['file'])
+        mismatches = self.check_chart_parity(chart_html)
+        self.bench('Страница топа', CHART_PARSERS, [(chart_html, 250)], options['repeat'])
+
+        if options['from_dir']:
+            pages = [
+                (read_page(os.path.join(options['from_dir'], name)),)
+                for name in sorted(os.listdir(options['from_dir']))
+                if name.startswith('title_')
+            ]
+            if pages:
+                mismatches += self.check_details_parity(pages)
+                self.bench('Страницы фильмов', DETAIL_PARSERS, pages, options['repeat'])
+
+        if mismatches:
+            raise CommandError(f'Результаты разбора расходятся: {mismatches}')
+        self.stdout.write(self.style.SUCCESS('Результаты разбора совпадают'))
+
+    def check_chart_parity(self, html):
+        """
+        Полное сравнение с BeautifulSoup. В HTML IMDb отрисованы только первые строки топа,
+        остальные есть лишь во встроенном JSON, поэтому для основного пути (fast) строки,
+        видимые BeautifulSoup, должны совпасть целиком, а длина - с числом строк в JSON.
+        Во всех строках не должно остаться HTML-сущностей.
+        """
+        expected, _ = parsers.extract_top_movies(html, 250)
+        edges = fast_parsers.dig(
+            fast_parsers.find_next_data(html), 'props', 'pageProps', 'pageData', 'chartTitles', 'edges'
+        )
+        mismatches = 0
+        for name in ('fast', 'lxml'):
+            result, warnings = CHART_PARSERS[name](html, 250)
+            problems = entity_problems(result)
+            if name == 'fast' and edges:
+                by_id = {movie['imdb_id']: movie for movie in result}
+                problems += [f'{movie} != {by_id.get(movie["imdb_id"])}'
+                             for movie in expected if by_id.get(movie['imdb_id']) != movie]
+                if len(result) != min(len(edges), 250):
+                    problems.append(f'найдено {len(result)} из {min(len(edges), 250)} строк JSON: {warnings}')
+            elif result != expected:
+                problems.append(f'{len(result)} фильмов против {len(expected)} у BeautifulSoup')
+            if problems:
+                mismatches += 1
+                self.stdout.write(self.style.ERROR(f'{name}: топ отличается от BeautifulSoup: {problems[:5]}'))
+            else:
+                self.stdout.write(f'{name}: совпадают {len(expected)} фильмов BeautifulSoup, всего {len(result)}')
+        return mismatches
+
+    def check_details_parity(self, pages):
+        """Основной путь (fast: JSON, затем lxml) и lxml против BeautifulSoup по каждой странице"""
+        mismatches = 0
+        for (html,) in pages:
+            expected, _ = parsers.extract_movie_details(html)
+            for name in ('fast', 'lxml'):
+                result, _ = DETAIL_PARSERS[name](html)
+                problems = entity_problems([result])
+                if comparable(result) != comparable(expected):
+                    problems.append(f'{result} != {expected}')
+                if problems:
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(f'{name}: детали отличаются: {problems}'))
+        return mismatches
+
+    def bench(self, title, functions, pages, repeat):
+        self.stdout.write(self.style.SUCCESS(f'\n{title}: {len(pages)} стр. x {repeat}'))
+        for name, func in functions.items():
+            started = time.perf_counter()
+            for _ in range(repeat):
+                for args in pages:
+                    func(*args)
+            per_page = (time.perf_counter() - started) / (repeat * len(pages))
+
+            # Память меряем в отдельном процессе, чтобы замеры не влияли друг на друга
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=measure_memory, args=(func, pages[0], child))
+            process.start()
+            peak, rss = parent.recv()
+            process.join()
+
+            self.stdout.write(
+                f'{name:>5}: {per_page * 1000:8.2f} мс/стр, '
+                f'пик Python-объектов {peak / 1024 / 1024:6.1f} МБ, прирост RSS {rss / 1024 / 1024:6.1f} МБ'
+            )
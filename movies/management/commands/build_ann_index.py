@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import ann
+
+
+class Command(BaseCommand):
+    """
+    Строит IVF-индекс векторов фильмов (movies.ann) и публикует его для веб-процессов.
+    content - векторы по тегам, режиссеру и актерам (похожие фильмы);
+    als - факторы текущей модели ALS (рекомендации, нужен train_als).
+    Перед публикацией печатает recall@k индекса против полного перебора.
+    """
+    help = 'Build the approximate nearest-neighbor index of movie vectors'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            choices=ann.SOURCES,
+            default=ann.CONTENT,
+            help='Источник векторов (по умолчанию content)'
+        )
+        parser.add_argument(
+            '--dim',
+            type=int,
+            default=ann.DEFAULT_DIM,
+            help=f'Размерность content-векторов (по умолчанию {ann.DEFAULT_DIM})'
+        )
+        parser.add_argument(
+            '--nlist',
+            type=int,
+            help='Число списков IVF (по умолчанию sqrt(числа фильмов))'
+        )
+        parser.add_argument(
+            '--nprobe',
+            type=int,
+            default=ann.DEFAULT_NPROBE,
+            help=f'Сколько ближайших списков просматривать при запросе (по умолчанию {ann.DEFAULT_NPROBE})'
+        )
+        parser.add_argument(
+            '--recall-sample',
+            type=int,
+            default=200,
+            help='Сколько фильмов-запросов для оценки recall@10 (0 - не оценивать)'
+        )
+        parser.add_argument(
+            '--output-dir',
+            help='Каталог моделей (по умолчанию settings.RECOMMENDATIONS_DIR)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        meta = {'nprobe': options['nprobe'], 'built_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        if options['source'] == ann.ALS:
+            loaded = ann.als_vectors()
+            if loaded is None:
+                raise CommandError('Модель ALS не обучена - сначала запустите train_als')
+            movie_ids, vectors, meta['als_version'] = loaded
+        else:
+            movie_ids, vectors = ann.content_vectors(options['dim'])
+        if not len(movie_ids):
+            raise CommandError('Нет фильмов для индекса')
+
+        arrays = ann.build(movie_ids, vectors, options['nlist'])
+        index = ann.IvfIndex(arrays, meta)
+        self.stdout.write(
+            f"Векторов: {len(movie_ids)} x {vectors.shape[1]}, списков: {len(arrays['centroids'])}, "
+            f"построено за {time.perf_counter() - started:.1f} с"
+        )
+        if options['recall_sample']:
+            queries = np.random.default_rng(0).choice(
+                len(movie_ids), min(options['recall_sample'], len(movie_ids)), replace=False
+            )
+            recall = ann.recall_at_k(index, movie_ids, vectors, queries, 10)
+            self.stdout.write(f"recall@10 при nprobe={options['nprobe']}: {recall:.3f}")
+
+        path = ann.publish(options['source'], arrays, meta, options['output_dir'])
+        self.stdout.write(self.style.SUCCESS(f'Индекс сохранен в {path}'))
@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies import similarities
+from movies.interactions import Interactions
+from movies.models import MovieNeighbor
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает похожие фильмы по избранному, отзывам и просмотрам
+    (movies.similarities) и заменяет содержимое таблицы MovieNeighbor одной транзакцией.
+    Память ограничена --max-cells, а не размером каталога.
+    """
+    help = 'Build item-item movie neighbors from user interactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=similarities.DEFAULT_K,
+            help=f'Сколько соседей хранить для фильма (по умолчанию {similarities.DEFAULT_K})'
+        )
+        parser.add_argument(
+            '--metric',
+            choices=similarities.METRICS,
+            default=similarities.COSINE,
+            help='Мера сходства (по умолчанию cosine)'
+        )
+        parser.add_argument(
+            '--min-common',
+            type=int,
+            default=similarities.DEFAULT_MIN_COMMON,
+            help=f'Минимум общих пользователей у соседей (по умолчанию {similarities.DEFAULT_MIN_COMMON})'
+        )
+        parser.add_argument(
+            '--max-cells',
+            type=int,
+            default=similarities.DEFAULT_MAX_CELLS,
+            help='Размер блока пачки фильмов в ячейках - ограничивает память'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Размер пачки bulk_create (по умолчанию 5000)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        interactions = Interactions.load()
+        users, movies = interactions.shape
+        self.stdout.write(f'Взаимодействий: {len(interactions.values)} ({users} пользователей, {movies} фильмов)')
+
+        rows, written = [], 0
+        with transaction.atomic():
+            MovieNeighbor.objects.all().delete()
+            for movie_id, found in similarities.neighbors(
+                    interactions, options['k'], options['metric'], options['min_common'], options['max_cells']):
+                rows.extend(
+                    MovieNeighbor(movie_id=movie_id, neighbor_id=neighbor_id, rank=rank, score=score)
+                    for rank, (neighbor_id, score) in enumerate(found, 1)
+                )
+                if len(rows) >= options['batch_size']:
+                    MovieNeighbor.objects.bulk_create(rows)
+                    written += len(rows)
+                    rows = []
+            MovieNeighbor.objects.bulk_create(rows)
+            written += len(rows)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано соседей: {written} за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from movies.query_plans import CHECKS, check_plan, disable_seqscan
+
+
+class Command(BaseCommand):
+    """
+    Проверяет через EXPLAIN, что фильтры MovieFilter по годам, датам, рейтингу
+    и id людей используют индексы (условия sargable, без EXTRACT по колонке).
+    Падает с ошибкой, если в плане нет ожидаемого индекса - удобно запускать в CI.
+    В PostgreSQL последовательное сканирование на время проверки выключается:
+    на маленькой базе планировщик и так выберет seq scan, а проверяем мы
+    возможность использовать индекс.
+    """
+    help = 'Verify that MovieFilter filters use indexes (EXPLAIN)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Печатать планы запросов целиком'
+        )
+
+    def handle(self, *args, **options):
+        failures = []
+        with transaction.atomic():
+            disable_seqscan()
+            for params, table, column in CHECKS:
+                used, plan = check_plan(params, table, column)
+                label = '&'.join(f'{key}={value}' for key, value in params.items()) or '(без фильтров)'
+                if used:
+                    self.stdout.write(f'OK   {label}: {", ".join(used)}')
+                else:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(f'FAIL {label}: нет индекса по {table}.{column}'))
+                if options['verbose_plans'] or not used:
+                    self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'Фильтры без индекса: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Все фильтры используют индексы'))
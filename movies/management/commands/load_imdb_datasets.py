@@ -0,0 +1,177 @@
+import json
+import os
+import time
+from datetime import date
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.imdb.datasets import NULL, NameStaging, SortedLookup, group_by_tconst, read_tsv
+from movies.imdb.parsers import IMDB_URL
+from movies.imdb.persistence import BulkMovieWriter
+
+
+class Command(BaseCommand):
+    """
+    Загрузка каталога из выгрузок IMDb (title.basics, title.ratings, title.principals, name.basics).
+    Файлы читаются потоком, поэтому расход памяти не зависит от их размера.
+    """
+    help = 'Load movies from IMDb TSV datasets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--basics', required=True, help='Путь к title.basics.tsv(.gz)')
+        parser.add_argument('--ratings', help='Путь к title.ratings.tsv(.gz)')
+        parser.add_argument('--principals', help='Путь к title.principals.tsv(.gz)')
+        parser.add_argument('--names', help='Путь к name.basics.tsv(.gz), нужен для имен актеров и режиссеров')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Сколько фильмов сохранять в одной транзакции (по умолчанию 2000)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Остановиться после указанного числа фильмов'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с позицией в title.basics, по которой можно продолжить загрузку'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Продолжить с позиции из --checkpoint'
+        )
+
+    def handle(self, *args, **options):
+        if options['principals'] and not options['names']:
+            raise CommandError('Для --principals нужен --names (имена актеров и режиссеров)')
+
+        offset = 0
+        if options['resume']:
+            if not options['checkpoint']:
+                raise CommandError('--resume работает только вместе с --checkpoint')
+            offset = self.read_checkpoint(options['checkpoint'], options['basics'])
+            self.stdout.write(f'Продолжаем с позиции {offset} в {options["basics"]}')
+
+        staging = None
+        if options['names']:
+            staging = NameStaging()
+            self.load_names(staging, options['names'])
+
+        ratings = SortedLookup(group_by_tconst(read_tsv(options['ratings']))) if options['ratings'] else None
+        principals = (
+            SortedLookup(group_by_tconst(read_tsv(options['principals']))) if options['principals'] else None
+        )
+
+        writer = BulkMovieWriter(cache_size=100_000)
+        movies = self.read_movies(options['basics'], offset, ratings, principals)
+        if options['limit']:
+            movies = islice(movies, options['limit'])
+
+        started = time.monotonic()
+        total = 0
+        while True:
+            chunk = list(islice(movies, options['batch_size']))
+            if not chunk:
+                break
+            batch = self.with_names(chunk, staging)
+            result = writer.write_batch(batch)
+            total += len(batch)
+            if options['checkpoint']:
+                self.write_checkpoint(options['checkpoint'], options['basics'], chunk[-1][0])
+
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"Сохранено {total} фильмов (новых {result['created']}, обновлено {result['updated']}, "
+                f"SQL-запросов {result['queries']}), {total / elapsed:.0f} фильмов/с"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Готово! Загружено {total} фильмов'))
+
+    def load_names(self, staging, path):
+        """Заливает name.basics во временную таблицу пачками"""
+        started = time.monotonic()
+        rows = ((row['nconst'], None if row['primaryName'] == NULL else row['primaryName'][:255])
+                for _, row in read_tsv(path))
+        total = 0
+        while True:
+            chunk = list(islice(rows, 50_000))
+            if not chunk:
+                break
+            staging.load(chunk)
+            total += len(chunk)
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'Имена: {total} строк за {elapsed:.1f} с ({total / elapsed:.0f} строк/с)')
+
+    def read_movies(self, path, offset, ratings, principals):
+        """
+        Генератор (смещение, данные фильма, nconst режиссера, nconst актеров).
+        Берем только полнометражные фильмы с известным годом.
+        """
+        for position, row in read_tsv(path, offset):
+            if row['titleType'] != 'movie' or row['startYear'] == NULL:
+                continue
+            tconst = row['tconst']
+
+            rating = 0.0
+            if ratings:
+                for rating_row in ratings.get(tconst):
+                    rating = float(rating_row['averageRating'])
+
+            director, actors = None, []
+            if principals:
+                credits = sorted(principals.get(tconst), key=lambda r: int(r['ordering']))
+                for credit in credits:
+                    if credit['category'] == 'director' and director is None:
+                        director = credit['nconst']
+                    elif credit['category'] in ('actor', 'actress') and len(actors) < 5:
+                        actors.append(credit['nconst'])
+
+            movie_data = {
+                'title': row['primaryTitle'][:255],
+                'year': int(row['startYear']),
+                'rating': rating,
+                'url': f'{IMDB_URL}/title/{tconst}/',
+                'imdb_id': tconst
+            }
+            genres = [] if row['genres'] == NULL else row['genres'].split(',')[:3]
+            yield position, movie_data, genres, director, actors
+
+    def with_names(self, chunk, staging):
+        """Подставляет имена вместо nconst одним запросом на пачку"""
+        names = {}
+        if staging:
+            nconsts = {n for _, _, _, director, actors in chunk for n in [director, *actors] if n}
+            names = staging.resolve(nconsts)
+
+        batch = []
+        for _, movie_data, genres, director, actors in chunk:
+            actors = [n for n in actors if n in names]
+            details = {
+                'genres': genres,
+                'actors': [names[n] for n in actors],
+                'actor_ids': actors,
+            }
+            if director in names:
+                details['director'] = names[director]
+                details['director_id'] = director
+            batch.append((movie_data, details))
+        return batch
+
+    def read_checkpoint(self, path, basics):
+        if not os.path.exists(path):
+            return 0
+        with open(path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('file') != os.path.abspath(basics):
+            raise CommandError(f'Позиция в {path} сохранена для другого файла: {checkpoint.get("file")}')
+        return checkpoint['offset']
+
+    def write_checkpoint(self, path, basics, offset):
+        """Позиция пишется после коммита пачки, атомарно через временный файл"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'file': os.path.abspath(basics), 'offset': offset}, f)
+        os.replace(tmp_path, path)
@@ -1,15 +1,22 @@
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime
+import os
 import time
 from django.core.management.base import BaseCommand
-from movies.models import Movie, Director, Actor, Tag
+from movies.imdb.cache import HttpCache
+from movies.imdb.fetcher import Fetcher
+from movies.imdb.journal import CheckpointJournal, content_hash
+from movies.imdb import fast_parsers, parsers
+from movies.imdb.persistence import BulkMovieWriter
+from movies.imdb.pipeline import IngestPipeline
+from movies.imdb.snapshot import SnapshotSource, SnapshotWriter
 
 
 class Command(BaseCommand):
     """Команда для парсинга топовых фильмов с IMDb и сохранения в базу данных"""
     help = 'Parse top movies from IMDb'
 
+    chart_url = "https://www.imdb.com/chart/top/"
+    extractors = fast_parsers
+
     def add_arguments(self, parser):
         """Добавляем кастомные аргументы команды"""
         parser.add_argument(
@@ -22,21 +29,116 @@ class Command(BaseCommand):
             '--delay',
             type=float,
             default=2.0,
-            help='Задержка между запросами в секундах (чтобы не забанили)'
+            help='Минимальный интервал между запросами к одному хосту в секундах (чтобы не забанили)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Сколько страниц фильмов загружать параллельно (по умолчанию 1)'
+        )
+        parser.add_argument(
+            '--parser',
+            choices=['fast', 'soup'],
+            default='fast',
+            help='fast - встроенный JSON и lxml, soup - разбор через BeautifulSoup (по умолчанию fast)'
+        )
+        parser.add_argument(
+            '--parse-workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Сколько процессов разбирают HTML (по умолчанию по числу ядер, 0 - в основном процессе)'
+        )
+        parser.add_argument(
+            '--queue-size',
+            type=int,
+            default=32,
+            help='Размер очередей между стадиями загрузки, разбора и сохранения'
+        )
+        parser.add_argument(
+            '--retries',
+            type=int,
+            default=3,
+            help='Сколько раз повторять запрос при 429/5xx (по умолчанию 3)'
+        )
+        parser.add_argument(
+            '--cache-dir',
+            help='Каталог дискового HTTP-кэша (по умолчанию кэш выключен)'
+        )
+        parser.add_argument(
+            '--cache-ttl',
+            type=int,
+            default=86400,
+            help='Сколько секунд страница в кэше считается свежей (по умолчанию сутки)'
+        )
+        parser.add_argument(
+            '--cache-max-mb',
+            type=int,
+            default=500,
+            help='Максимальный размер кэша в МБ (по умолчанию 500)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Сколько фильмов сохранять в одной транзакции (по умолчанию 50)'
+        )
+        parser.add_argument(
+            '--journal',
+            help='JSONL-журнал обработанных фильмов: неизменившиеся фильмы не пишутся в базу'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Продолжить прерванный запуск по журналу, пропуская уже обработанные фильмы'
+        )
+        parser.add_argument(
+            '--from-dir',
+            help='Брать страницы из локального снимка (каталог с .html/.html.gz) вместо сети'
+        )
+        parser.add_argument(
+            '--from-file',
+            help='Файл со страницей топа (например imdb_backup.html), можно .gz'
+        )
+        parser.add_argument(
+            '--save-snapshot',
+            help='Сохранять все загруженные страницы в указанный каталог'
+        )
+        parser.add_argument(
+            '--compress-snapshot',
+            action='store_true',
+            help='Сжимать сохраняемые страницы gzip'
         )
 
+    def build_fetcher(self, options):
+        """Источник страниц: локальный снимок или сеть (с сохранением снимка при необходимости)"""
+        self.cache = None
+        if options['from_dir'] or options['from_file']:
+            return SnapshotSource(options['from_dir'], options['from_file'], self.chart_url)
+
+        if options['cache_dir']:
+            self.cache = HttpCache(
+                options['cache_dir'],
+                ttl=options['cache_ttl'],
+                max_bytes=options['cache_max_mb'] * 1024 * 1024
+            )
+        fetcher = Fetcher(
+            delay=options['delay'],
+            workers=max(options['workers'], 1),
+            retries=options['retries'],
+            cache=self.cache
+        )
+        if options['save_snapshot']:
+            fetcher = SnapshotWriter(fetcher, options['save_snapshot'], options['compress_snapshot'])
+        return fetcher
+
     def get_page(self, url):
         """
         Выполняет HTTP-запрос к указанному URL
         Возвращает HTML-страницу или None при ошибке
         """
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()  # Проверяем статус ответа
-            return response.text
+            return self.fetcher.get(url)
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Ошибка запроса: {e}'))
             return None
@@ -46,40 +148,12 @@ class Command(BaseCommand):
         Парсит список топ-N фильмов с главной страницы IMDb
         Возвращает список словарей с базовой информацией о фильмах
         """
-        url = "https://www.imdb.com/chart/top/"
-        html = self.get_page(url)
+        html = self.get_page(self.chart_url)
         if not html:
             return []
 
-        soup = BeautifulSoup(html, 'html.parser')
-        movies = []
-
-        # Ищем все элементы с фильмами в таблице
-        for item in soup.select('li.ipc-metadata-list-summary-item')[:count]:
-            try:
-                # Извлекаем номер, название и год (формат: "1. Название (2023)")
-                raw_title = item.select_one('h3.ipc-title__text').text
-                title = raw_title.split('. ')[1]  # Убираем номер из начала
-
-                # Год выпуска (первый элемент в metadata)
-                year = int(item.select('span.cli-title-metadata-item')[0].text)
-
-                # Рейтинг (формат: "8.7 (1.2M)")
-                rating_text = item.select_one('span.ipc-rating-star').text
-                rating = float(rating_text.split()[0])  # Берем только число
-
-                # Ссылка на страницу фильма
-                movie_url = "https://www.imdb.com" + item.select_one('a.ipc-title-link-wrapper')['href'].split('?')[0]
-
-                movies.append({
-                    'title': title,
-                    'year': year,
-                    'rating': rating,
-                    'url': movie_url
-                })
-            except Exception as e:
-                self.stdout.write(self.style.WARNING(f'Пропускаем фильм из-за ошибки: {e}'))
-
+        movies, warnings = self.extractors.extract_top_movies(html, count)
+        self.write_warnings(warnings)
         return movies
 
     def parse_movie_details(self, url):
@@ -91,108 +165,108 @@ class Command(BaseCommand):
         if not html:
             return {}
 
-        soup = BeautifulSoup(html, 'html.parser')
-        details = {}
-
-        try:
-            # Описание фильма
-            desc_tag = soup.select_one('span.sc-16ede01-0')
-            details['description'] = desc_tag.text if desc_tag else "Нет описания"
-
-            # Жанры (первые 3)
-            genres = [g.text for g in soup.select('a.ipc-chip--on-baseAlt')]
-            details['genres'] = genres[:3] if genres else ['Unknown']
-
-            # Режиссер (может быть несколько, берем первого)
-            director_section = soup.find('div', {'data-testid': 'title-pc-wide-screen'})
-            if director_section:
-                director_label = director_section.find('span', string='Director') or \
-                                 director_section.find('span', string='Directors')
-                if director_label:
-                    details['director'] = director_label.find_next('a').text
-
-            # Актеры (первые 5 в списке)
-            actors = []
-            actor_blocks = soup.select('a[data-testid="title-cast-item__actor"]')[:5]
-            for actor in actor_blocks:
-                actors.append(actor.text)
-            details['actors'] = actors if actors else ['Unknown']
-
-            # Ссылка на постер
-            poster_img = soup.select_one('img.ipc-image')
-            details['poster_url'] = poster_img['src'] if poster_img else ""
-
-        except Exception as e:
-            self.stdout.write(self.style.WARNING(f'Ошибка парсинга деталей: {e}'))
-
+        details, warnings = self.extractors.extract_movie_details(html)
+        self.write_warnings(warnings)
         return details
 
+    def write_warnings(self, warnings):
+        for warning in warnings:
+            self.stdout.write(self.style.WARNING(warning))
+
     def handle(self, *args, **options):
         """
         Основной метод, который выполняется при вызове команды
         Последовательность работы:
         1. Парсим список топовых фильмов
-        2. Для каждого фильма парсим детали
-        3. Сохраняем в базу данных
+        2. Загружаем страницы фильмов в потоках (--workers)
+           и разбираем их в пуле процессов (--parse-workers)
+        3. Сохраняем в базу данных пачками (--batch-size)
         """
         count = options['count']
-        delay = options['delay']
+        workers = max(options['workers'], 1)
+        self.fetcher = self.build_fetcher(options)
+        self.extractors = fast_parsers if options['parser'] == 'fast' else parsers
 
         self.stdout.write(self.style.SUCCESS(f'Начинаем парсинг {count} фильмов...'))
 
-        # Получаем список топовых фильмов
-        movies = self.parse_top_movies(count)
-        if not movies:
-            self.stdout.write(self.style.ERROR('Не найдено ни одного фильма'))
+        try:
+            # Получаем список топовых фильмов
+            movies = self.parse_top_movies(count)
+            if not movies:
+                self.stdout.write(self.style.ERROR('Не найдено ни одного фильма'))
+                return
+
+            journal = None
+            if options['journal']:
+                journal = CheckpointJournal(options['journal'], resume=options['resume'])
+                if options['resume']:
+                    total = len(movies)
+                    movies = [m for m in movies if not journal.is_done(m['url'])]
+                    self.stdout.write(f'Продолжаем по журналу: пропущено {total - len(movies)} фильмов')
+            elif options['resume']:
+                self.stdout.write(self.style.WARNING('--resume без --journal ничего не делает'))
+
+            # Конвейер: загрузка в потоках -> разбор в процессах -> сохранение пачками здесь
+            pipeline = IngestPipeline(
+                fetch=lambda movie_data: self.get_page(movie_data['url']),
+                parse=self.extractors.extract_movie_details,
+                fetch_workers=workers,
+                parse_workers=options['parse_workers'],
+                queue_size=max(options['queue_size'], 2 * options['parse_workers'])
+            )
+            writer = BulkMovieWriter()
+            batch, hashes = [], []
+            unchanged = 0
+            try:
+                for i, (movie_data, result) in enumerate(pipeline.run(movies), 1):
+                    self.stdout.write(f"Обрабатываем {i}/{len(movies)}: {movie_data['title']}")
+                    if not result:
+                        continue
+                    details, warnings = result
+                    self.write_warnings(warnings)
+                    if not details:
+                        continue
+                    digest = content_hash(movie_data, details)
+                    if journal and journal.is_unchanged(movie_data['url'], digest):
+                        journal.record(movie_data['url'], digest, 'unchanged')
+                        unchanged += 1
+                        continue
+                    batch.append((movie_data, details))
+                    hashes.append(digest)
+                    if len(batch) >= options['batch_size']:
+                        self.save_batch(pipeline, writer, batch, hashes, journal)
+                        batch, hashes = [], []
+                if batch:
+                    self.save_batch(pipeline, writer, batch, hashes, journal)
+            finally:
+                if journal:
+                    journal.close()
+                    self.stdout.write(f'Без изменений (пропущено без записи в базу): {unchanged}')
+                for line in pipeline.summary():
+                    self.stdout.write(line)
+        finally:
+            self.fetcher.close()
+
+        self.stdout.write(self.style.SUCCESS('\nГотово! Все фильмы обработаны'))
+        self.stdout.write(self.fetcher.stats.summary())
+        if self.cache:
+            self.stdout.write(self.cache.stats.summary())
+
+    def save_batch(self, pipeline, writer, batch, hashes, journal=None):
+        """Сохраняет пачку фильмов одной транзакцией и отмечает ее в журнале"""
+        started = time.perf_counter()
+        try:
+            result = writer.write_batch(batch)
+            pipeline.stats['persist'].add(len(batch), time.perf_counter() - started)
+            self.stdout.write(self.style.SUCCESS(
+                f"Сохранено {len(batch)} фильмов: новых {result['created']}, "
+                f"обновлено {result['updated']}, SQL-запросов {result['queries']}"
+            ))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Ошибка сохранения пачки: {e}'))
             return
 
-        # Обрабатываем каждый фильм
-        for i, movie_data in enumerate(movies, 1):
-            self.stdout.write(f"\nОбрабатываем {i}/{len(movies)}: {movie_data['title']}")
-
-            # Парсим детальную информацию
-            details = self.parse_movie_details(movie_data['url'])
-            if not details:
-                continue
-
-            try:
-                # Создаем или обновляем фильм в базе
-                movie, created = Movie.objects.get_or_create(
-                    title=movie_data['title'],
-                    release_date=datetime(movie_data['year'], 1, 1),  # Дата без месяца/дня
-                    defaults={
-                        'rating': movie_data['rating'],
-                        'description': details.get('description', ''),
-                        'poster_url': details.get('poster_url', '')
-                    }
-                )
-
-                # Добавляем режиссера (если нашли)
-                if 'director' in details:
-                    director, _ = Director.objects.get_or_create(name=details['director'])
-                    movie.director = director
-
-                # Добавляем актеров (не больше 5)
-                for actor_name in details.get('actors', [])[:5]:
-                    actor, _ = Actor.objects.get_or_create(name=actor_name)
-                    movie.actors.add(actor)
-
-                # Добавляем жанры (не больше 3)
-                for genre in details.get('genres', [])[:3]:
-                    tag, _ = Tag.objects.get_or_create(name=genre)
-                    movie.tags.add(tag)
-
-                movie.save()
-
-                if created:
-                    self.stdout.write(self.style.SUCCESS('Создан новый фильм'))
-                else:
-                    self.stdout.write(self.style.WARNING('Фильм уже существует'))
-
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'Ошибка сохранения: {e}'))
-
-            # Делаем паузу между запросами
-            time.sleep(delay)
-
-        self.stdout.write(self.style.SUCCESS('\nГотово! Все фильмы обработаны'))
\ No newline at end of file
+        if journal:
+            for (movie_data, _), digest in zip(batch, hashes):
+                journal.record(movie_data['url'], digest, 'saved')
+            journal.flush()
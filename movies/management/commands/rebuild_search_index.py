@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from movies.search import backend, refresh_search_index
+
+
+class Command(BaseCommand):
+    """Полностью пересобирает полнотекстовый индекс фильмов (например, после ручной правки базы)"""
+    help = 'Rebuild the movie full-text search index'
+
+    def handle(self, *args, **options):
+        if backend() is None:
+            self.stdout.write(self.style.WARNING('Полнотекстовый индекс для этой базы не поддерживается'))
+            return
+        refresh_search_index()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс пересобран'))
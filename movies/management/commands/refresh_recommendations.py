@@ -0,0 +1,204 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min
+
+from movies import ann, user_recommendations
+from movies.als import factor_model
+from movies.models import User
+from movies.recommendations import tag_matrix
+
+
+def refresh_task(start, end, stale_only, batch_size):
+    """Диапазон id в процессе пула: (начало, пользователей, секунды)"""
+    started = time.perf_counter()
+    written = user_recommendations.refresh_range(start, end, stale_only, batch_size)
+    return start, written, time.perf_counter() - started
+
+
+class Checkpoint:
+    """Начала готовых диапазонов шарда в файле: повторный запуск с тем же --run их пропускает"""
+
+    def __init__(self, path, options):
+        self.path = path
+        self.options = options
+        self.done = set()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        if state['options'] != self.options:
+            raise CommandError(
+                f'Прогон {self.path} начат с другими параметрами {state["options"]} - '
+                'укажите другой --run или --restart'
+            )
+        self.done = set(state['done'])
+
+    def add(self, start):
+        self.done.add(start)
+        directory = os.path.dirname(self.path)
+        with tempfile.NamedTemporaryFile('w', dir=directory, delete=False, suffix='.tmp') as f:
+            json.dump({'options': self.options, 'done': sorted(self.done)}, f)
+        os.replace(f.name, self.path)
+
+
+class Command(BaseCommand):
+    """
+    Заполняет таблицу готовых рекомендаций (movies.user_recommendations)
+    для всех активных пользователей или только для записей, помеченных stale.
+
+    Пользователи делятся на диапазоны id по --range-size; --shard i/n берет каждый
+    n-й диапазон, начиная с i-го, - несколько машин делят работу без координации.
+    Диапазоны шарда считаются в --workers процессах: модели ALS и ANN процессы
+    открывают через mmap (общие страницы), матрица тегов строится до запуска пула
+    и достается процессам копией при записи. Каждый процесс пишет свои записи сам
+    (INSERT ... ON CONFLICT пачками).
+
+    Готовые диапазоны полного прогона отмечаются в файле прогона (RECOMMENDATIONS_DIR/refresh):
+    прерванный запуск с тем же --run продолжает с неготовых диапазонов.
+
+    Полный прогон в конце пересчитывает записи stale диапазонов шарда: помеченные
+    во время прогона или оставшиеся от воркеров, чья очередь потерялась при перезапуске.
+    С --stale пересчитываются только такие записи - это запуск по расписанию; файла
+    прогона у него нет: каждый запуск проходит все диапазоны шарда заново.
+    """
+    help = 'Precompute stored recommendations for users'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale',
+            action='store_true',
+            help='Только пользователи с устаревшими записями'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Пользователей в одной пачке записи (по умолчанию 500)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Число процессов (по умолчанию 1 - без пула)'
+        )
+        parser.add_argument(
+            '--range-size',
+            type=int,
+            default=10000,
+            help='Ширина диапазона id пользователей (по умолчанию 10000)'
+        )
+        parser.add_argument(
+            '--shard',
+            default='1/1',
+            help='Часть работы этой машины i/n, 1 <= i <= n (по умолчанию 1/1)'
+        )
+        parser.add_argument(
+            '--run',
+            default=None,
+            help='Имя полного прогона для продолжения после сбоя (по умолчанию текущая дата)'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Не пропускать диапазоны, уже готовые в этом прогоне'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            shard, shards = (int(part) for part in options['shard'].split('/'))
+        except ValueError:
+            raise CommandError('--shard должен иметь вид i/n')
+        if not 1 <= shard <= shards:
+            raise CommandError('--shard: нужно 1 <= i <= n')
+        size = options['range_size']
+        if size < 1 or options['workers'] < 1:
+            raise CommandError('--range-size и --workers должны быть положительными')
+        if options['stale'] and (options['run'] or options['restart']):
+            raise CommandError('--run и --restart относятся к полному прогону, с --stale они не нужны')
+
+        started = time.perf_counter()
+        bounds = User.objects.filter(is_active=True).aggregate(low=Min('pk'), high=Max('pk'))
+        ranges = []
+        if bounds['low'] is not None:
+            ranges = [
+                (number * size, (number + 1) * size)
+                for number in range(bounds['low'] // size, bounds['high'] // size + 1)
+                if number % shards == shard - 1
+            ]
+
+        if options['stale']:
+            checkpoint, run = None, 'stale'
+            pending = ranges
+        else:
+            run = options['run'] or date.today().isoformat()
+            directory = os.path.join(str(settings.RECOMMENDATIONS_DIR), 'refresh')
+            os.makedirs(directory, exist_ok=True)
+            checkpoint = Checkpoint(
+                os.path.join(directory, f'{run}-shard-{shard}-of-{shards}.json'),
+                {'range_size': size}
+            )
+            if not options['restart']:
+                checkpoint.load()
+            pending = [(start, end) for start, end in ranges if start not in checkpoint.done]
+        self.stdout.write(
+            f'Шард {shard}/{shards}, прогон {run}: диапазонов {len(ranges)}, '
+            f'уже готово {len(ranges) - len(pending)}'
+        )
+
+        written = 0
+        for start, count, elapsed in self.refresh(pending, options):
+            if checkpoint is not None:
+                checkpoint.add(start)
+            written += count
+            self.stdout.write(
+                f'  id [{start}, {start + size}): {count} пользователей за {elapsed:.2f} с'
+                f' ({count / max(elapsed, 1e-9):.0f} в секунду)'
+            )
+
+        if not options['stale']:
+            # Записи, помеченные stale уже после пересчета своего диапазона
+            swept = sum(
+                user_recommendations.refresh_stale(start, end, options['batch_size'])
+                for start, end in ranges
+            )
+            written += swept
+            self.stdout.write(f'Пересчитано записей stale после прогона: {swept}')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Шард {shard}/{shards}: пересчитано пользователей {written} за {elapsed:.1f} с '
+            f'({written / max(elapsed, 1e-9):.0f} в секунду)'
+        ))
+
+    def refresh(self, ranges, options):
+        """Генератор (начало диапазона, пользователей, секунды) по мере готовности"""
+        args = (options['stale'], options['batch_size'])
+        if options['workers'] == 1 or len(ranges) < 2:
+            for start, end in ranges:
+                yield refresh_task(start, end, *args)
+            return
+
+        # Модели открываются до fork: страницы mmap и матрица тегов общие для процессов
+        factor_model()
+        ann.ann_index(ann.ALS)
+        tag_matrix.load()
+        # Соединения с базой не должны достаться процессам пула
+        connections.close_all()
+        # fork явно: процессы наследуют настроенный Django и загруженные модели
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(options['workers'], mp_context=context) as pool:
+            futures = [pool.submit(refresh_task, start, end, *args) for start, end in ranges]
+            for future in as_completed(futures):
+                yield future.result()
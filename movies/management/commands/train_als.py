@@ -0,0 +1,84 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import als
+from movies.interactions import Interactions
+
+
+class Command(BaseCommand):
+    """
+    Обучает ALS по неявной обратной связи (избранное, отзывы, просмотры) и сохраняет
+    факторы пользователей и фильмов в .npy (settings.RECOMMENDATIONS_DIR).
+    Веб-процессы подхватывают новую версию при следующем запросе рекомендаций.
+    """
+    help = 'Train implicit-feedback ALS factors for recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--factors',
+            type=int,
+            default=als.DEFAULT_FACTORS,
+            help=f'Размерность факторов (по умолчанию {als.DEFAULT_FACTORS})'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=als.DEFAULT_ITERATIONS,
+            help=f'Число итераций (по умолчанию {als.DEFAULT_ITERATIONS})'
+        )
+        parser.add_argument(
+            '--regularization',
+            type=float,
+            default=als.DEFAULT_REGULARIZATION,
+            help=f'Регуляризация lambda (по умолчанию {als.DEFAULT_REGULARIZATION})'
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=als.DEFAULT_ALPHA,
+            help=f'Масштаб уверенности c = 1 + alpha * вес (по умолчанию {als.DEFAULT_ALPHA:g})'
+        )
+        parser.add_argument(
+            '--cg-steps',
+            type=int,
+            default=als.DEFAULT_CG_STEPS,
+            help=f'Шагов сопряженных градиентов на итерацию (по умолчанию {als.DEFAULT_CG_STEPS})'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Процессов для решения систем (по умолчанию 1 - все ядра через BLAS в одном процессе)'
+        )
+        parser.add_argument(
+            '--output-dir',
+            help='Каталог моделей (по умолчанию settings.RECOMMENDATIONS_DIR)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        interactions = Interactions.load()
+        users, movies = interactions.shape
+        if not len(interactions.values):
+            raise CommandError('Нет взаимодействий для обучения')
+        self.stdout.write(f'Взаимодействий: {len(interactions.values)} ({users} пользователей, {movies} фильмов)')
+
+        trainer = als.Trainer(
+            options['factors'], options['iterations'], options['regularization'], options['alpha'],
+            options['workers'], options['cg_steps']
+        )
+        user_factors, item_factors = trainer.fit(
+            interactions, log=lambda iteration, seconds: self.stdout.write(f'Итерация {iteration}: {seconds:.2f} с')
+        )
+        path = als.save_model(interactions, user_factors, item_factors, {
+            'factors': options['factors'],
+            'iterations': options['iterations'],
+            'regularization': options['regularization'],
+            'alpha': options['alpha'],
+            'cg_steps': options['cg_steps'],
+            'users': users,
+            'movies': movies,
+            'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }, options['output_dir'])
+        self.stdout.write(self.style.SUCCESS(f'Модель сохранена в {path} за {time.perf_counter() - started:.1f} с'))
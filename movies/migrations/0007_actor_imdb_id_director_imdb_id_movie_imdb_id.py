@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_alter_director_options_alter_movie_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actor',
+            name='imdb_id',
+            field=models.CharField(blank=True, help_text='Идентификатор персоны на IMDb (nm...)', max_length=16, null=True, unique=True, verbose_name='IMDb ID'),
+        ),
+        migrations.AddField(
+            model_name='director',
+            name='imdb_id',
+            field=models.CharField(blank=True, help_text='Идентификатор персоны на IMDb (nm...)', max_length=16, null=True, unique=True, verbose_name='IMDb ID'),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='imdb_id',
+            field=models.CharField(blank=True, help_text='Идентификатор фильма на IMDb (tt...), ключ для обновления при импорте', max_length=16, null=True, unique=True, verbose_name='IMDb ID'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:28
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# SQL скопирован из movies.search на момент миграции: миграция не должна зависеть от кода приложения
+PG_VECTOR_SQL = """
+    setweight(to_tsvector('english', coalesce(m.title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT d.name FROM movies_director d WHERE d.id = m.director_id
+    ), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(a.name, ' ') FROM movies_actor a
+        JOIN movies_movie_actors ma ON ma.actor_id = a.id WHERE ma.movie_id = m.id
+    ), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(t.name, ' ') FROM movies_tag t
+        JOIN movies_movie_tags mt ON mt.tag_id = t.id WHERE mt.movie_id = m.id
+    ), '')), 'C') ||
+    setweight(to_tsvector('english', coalesce(m.description, '')), 'D')
+"""
+
+SQLITE_FILL_SQL = """
+    INSERT INTO movies_movie_fts (rowid, title, director, actors, tags, description)
+    SELECT m.id, m.title, d.name,
+        (SELECT group_concat(a.name, ' ') FROM movies_actor a
+         JOIN movies_movie_actors ma ON ma.actor_id = a.id WHERE ma.movie_id = m.id),
+        (SELECT group_concat(t.name, ' ') FROM movies_tag t
+         JOIN movies_movie_tags mt ON mt.tag_id = t.id WHERE mt.movie_id = m.id),
+        m.description
+    FROM movies_movie m LEFT JOIN movies_director d ON d.id = m.director_id
+"""
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS movies_movie_search_gin ON movies_movie USING gin (search_vector)'
+        )
+        schema_editor.execute(f'UPDATE movies_movie AS m SET search_vector = {PG_VECTOR_SQL}')
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS movies_movie_fts USING fts5("
+            "title, director, actors, tags, description, tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(SQLITE_FILL_SQL)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS movies_movie_search_gin')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS movies_movie_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_actor_imdb_id_director_imdb_id_movie_imdb_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='tsvector по названию, описанию, режиссеру, актерам и тегам (PostgreSQL)', null=True, verbose_name='Поисковый индекс'),
+        ),
+        # GIN-индекс в PostgreSQL и таблица FTS5 в SQLite зависят от базы, поэтому не в Meta.indexes
+        migrations.RunPython(create_index, drop_index),
+    ]
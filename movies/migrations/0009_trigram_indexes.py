@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# (таблица, колонка) с GIN-индексом gin_trgm_ops для операторов % и <%
+TRIGRAM_COLUMNS = (
+    ('movies_movie', 'title'),
+    ('movies_actor', 'name'),
+    ('movies_director', 'name'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    # Расширение создается здесь, а не TrigramExtension: та при откате обращается к pg_extension
+    # и на SQLite падает. При откате расширение не удаляется - им могут пользоваться другие.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column in TRIGRAM_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_movie_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
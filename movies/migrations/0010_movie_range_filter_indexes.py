@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0009_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='movie',
+            name='movies_movi_release_b7ac7d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='movie',
+            name='movies_movi_rating_8fd49a_idx',
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-rating', 'title'], name='movie_rating_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['release_date', '-rating'], name='movie_released_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:41
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def fold(text):
+    """Копия movies.text.fold на момент миграции"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch if ch.isalnum() else ' ' for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.casefold().split())
+
+
+def fill_search_names(apps, schema_editor):
+    for model_name in ('Actor', 'Director'):
+        model = apps.get_model('movies', model_name)
+        batch = []
+        for person in model.objects.only('pk', 'name').iterator(chunk_size=2000):
+            person.search_name = fold(person.name)
+            batch.append(person)
+            if len(batch) == 2000:
+                model.objects.bulk_update(batch, ['search_name'])
+                batch = []
+        model.objects.bulk_update(batch, ['search_name'])
+
+
+def create_indexes(apps, schema_editor):
+    """GIN-индексы для поиска подстроки в search_name (только PostgreSQL)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in ('movies_actor', 'movies_director'):
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_search_name_trgm ON {table} USING gin (search_name gin_trgm_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in ('movies_actor', 'movies_director'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_search_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0010_movie_range_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actor',
+            name='search_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Имя в нижнем регистре без диакритики, заполняется автоматически', max_length=255, verbose_name='Имя для поиска'),
+        ),
+        migrations.AddField(
+            model_name='director',
+            name='search_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Имя в нижнем регистре без диакритики, заполняется автоматически', max_length=255, verbose_name='Имя для поиска'),
+        ),
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authorization', '0004_alter_user_avatar_alter_user_created_at_and_more'),
+        ('movies', '0012_movieneighbor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRecommendation',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recommendation', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('source', models.CharField(help_text='als, tags или popular', max_length=20, verbose_name='Источник')),
+                ('items', models.JSONField(default=list, verbose_name='Рекомендации')),
+                ('stale', models.BooleanField(db_index=True, default=False, verbose_name='Требует пересчета')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата пересчета')),
+            ],
+            options={
+                'verbose_name': 'Рекомендации пользователя',
+                'verbose_name_plural': 'Рекомендации пользователей',
+            },
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_name_keys(apps, schema_editor):
+    """Ключи по уже заполненному search_name: имя начиная с каждого слова"""
+    for model_name in ('Actor', 'Director'):
+        model = apps.get_model('movies', model_name)
+        key_model = apps.get_model('movies', f'{model_name}NameKey')
+        batch = []
+        for person_id, search_name in model.objects.values_list('pk', 'search_name').iterator(chunk_size=2000):
+            words = search_name.split()
+            batch.extend(
+                key_model(person_id=person_id, key=key)
+                for key in {' '.join(words[i:]) for i in range(len(words))}
+            )
+            if len(batch) >= 5000:
+                key_model.objects.bulk_create(batch)
+                batch = []
+        key_model.objects.bulk_create(batch)
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    """GIN-индексы из 0011 больше не нужны: поиск идет по ключам"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in ('movies_actor', 'movies_director'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_search_name_trgm')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in ('movies_actor', 'movies_director'):
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_search_name_trgm ON {table} USING gin (search_name gin_trgm_ops)'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0013_userrecommendation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='actor',
+            name='search_name',
+            field=models.CharField(blank=True, editable=False, help_text='Имя в нижнем регистре без диакритики, заполняется автоматически', max_length=255, verbose_name='Имя для поиска'),
+        ),
+        migrations.AlterField(
+            model_name='director',
+            name='search_name',
+            field=models.CharField(blank=True, editable=False, help_text='Имя в нижнем регистре без диакритики, заполняется автоматически', max_length=255, verbose_name='Имя для поиска'),
+        ),
+        migrations.CreateModel(
+            name='ActorNameKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, verbose_name='Ключ')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='name_keys', to='movies.actor', verbose_name='Актер')),
+            ],
+            options={
+                'verbose_name': 'Ключ поиска актера',
+                'verbose_name_plural': 'Ключи поиска актеров',
+                'indexes': [models.Index(fields=['key', 'person'], name='actor_name_key_idx', opclasses=['varchar_pattern_ops', 'int8_ops'])],
+            },
+        ),
+        migrations.CreateModel(
+            name='DirectorNameKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, verbose_name='Ключ')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='name_keys', to='movies.director', verbose_name='Режиссер')),
+            ],
+            options={
+                'verbose_name': 'Ключ поиска режиссера',
+                'verbose_name_plural': 'Ключи поиска режиссеров',
+                'indexes': [models.Index(fields=['key', 'person'], name='director_name_key_idx', opclasses=['varchar_pattern_ops', 'int8_ops'])],
+            },
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+        migrations.RunPython(drop_trigram_indexes, create_trigram_indexes),
+    ]
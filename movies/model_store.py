@@ -0,0 +1,78 @@
+"""
+Хранилище обученных моделей рекомендаций в settings.RECOMMENDATIONS_DIR.
+Каждая публикация - новый каталог <name>-<время>-<суффикс> с массивами .npy;
+на текущую версию указывает <name>.json, который меняется атомарно (os.replace).
+Читатели открывают массивы через np.load(mmap_mode='r'): страницы общие для
+всех процессов, а процесс, открывший старую версию, дочитает ее без ошибок.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+KEEP_PREVIOUS = 1  # сколько прошлых версий оставлять (их еще могут читать старые процессы)
+
+
+def model_dir(directory=None):
+    return str(directory or settings.RECOMMENDATIONS_DIR)
+
+
+def publish(name, arrays, meta, directory=None):
+    """Записать arrays (имя -> ndarray) новой версией модели name; возвращает путь версии"""
+    directory = model_dir(directory)
+    os.makedirs(directory, exist_ok=True)
+    path = tempfile.mkdtemp(prefix=time.strftime(f'{name}-%Y%m%d-%H%M%S-'), dir=directory)
+    version = os.path.basename(path)
+    for key, array in arrays.items():
+        np.save(os.path.join(path, f'{key}.npy'), array)
+
+    with tempfile.NamedTemporaryFile('w', dir=directory, delete=False, suffix='.tmp') as f:
+        json.dump({'version': version, **meta}, f)
+    os.replace(f.name, os.path.join(directory, f'{name}.json'))
+
+    previous = sorted(
+        (entry for entry in os.listdir(directory)
+         if entry.startswith(f'{name}-') and entry != version and os.path.isdir(os.path.join(directory, entry))),
+        key=lambda entry: os.path.getmtime(os.path.join(directory, entry))
+    )
+    for old in previous[:max(len(previous) - KEEP_PREVIOUS, 0)]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+    return path
+
+
+def load_arrays(path, names):
+    """Словарь имя -> массив версии path, открытый через mmap только для чтения"""
+    return {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in names}
+
+
+class Current:
+    """
+    Текущая версия модели name для процесса: factory(path, meta) вызывается,
+    только когда указатель <name>.json поменялся; None, если модель не опубликована.
+    """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.lock = threading.Lock()
+        self.stamp = None
+        self.model = None
+
+    def get(self, directory=None):
+        pointer = os.path.join(model_dir(directory), f'{self.name}.json')
+        try:
+            stamp = (pointer, os.stat(pointer).st_mtime_ns)
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            if self.stamp != stamp:
+                with open(pointer, encoding='utf-8') as f:
+                    meta = json.load(f)
+                self.model = self.factory(os.path.join(os.path.dirname(pointer), meta['version']), meta)
+                self.stamp = stamp
+            return self.model
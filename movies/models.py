@@ -1,7 +1,10 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.conf import settings
 
+from movies.text import fold
+
 User = get_user_model()
 
 
@@ -15,11 +18,33 @@ class Director(models.Model):
         verbose_name="Полное имя",
         help_text="Введите полное имя режиссера"
     )
+    imdb_id = models.CharField(
+        max_length=16,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="IMDb ID",
+        help_text="Идентификатор персоны на IMDb (nm...)"
+    )
+    search_name = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name="Имя для поиска",
+        help_text="Имя в нижнем регистре без диакритики, заполняется автоматически"
+    )
 
     def __str__(self):
         """ представление  админки и API"""
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.search_name = fold(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'search_name'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Режиссер"
         verbose_name_plural = "Режиссеры"
@@ -36,10 +61,32 @@ class Actor(models.Model):
         verbose_name="Полное имя",
         help_text="Введите полное имя актера"
     )
+    imdb_id = models.CharField(
+        max_length=16,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="IMDb ID",
+        help_text="Идентификатор персоны на IMDb (nm...)"
+    )
+    search_name = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name="Имя для поиска",
+        help_text="Имя в нижнем регистре без диакритики, заполняется автоматически"
+    )
 
     def __str__(self):
         return f"Актер: {self.name}"
 
+    def save(self, *args, **kwargs):
+        self.search_name = fold(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'search_name'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Актер"
         verbose_name_plural = "Актеры"
@@ -79,6 +126,14 @@ class Movie(models.Model):
         verbose_name="Название фильма",
         help_text="Полное официальное название"
     )
+    imdb_id = models.CharField(
+        max_length=16,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="IMDb ID",
+        help_text="Идентификатор фильма на IMDb (tt...), ключ для обновления при импорте"
+    )
     release_date = models.DateField(
         verbose_name="Дата премьеры",
         help_text="Дата первого показа"
@@ -135,6 +190,12 @@ class Movie(models.Model):
     )
 
     # Технические поля
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name="Поисковый индекс",
+        help_text="tsvector по названию, описанию, режиссеру, актерам и тегам (PostgreSQL)"
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Дата добавления в систему"
@@ -153,8 +214,11 @@ class Movie(models.Model):
         ordering = ['-rating', 'title']  # Сортировка по рейтингу и названию
         indexes = [
             models.Index(fields=['title']),
-            models.Index(fields=['release_date']),
-            models.Index(fields=['rating']),
+            # Совпадает с ordering: первая страница списка читается по индексу без сортировки,
+            # он же обслуживает фильтр rating_min/rating_max
+            models.Index(fields=['-rating', 'title'], name='movie_rating_title_idx'),
+            # Фильтры по годам, десятилетиям и датам (заменяет индекс только по release_date)
+            models.Index(fields=['release_date', '-rating'], name='movie_released_rating_idx'),
         ]
         constraints = [
             models.CheckConstraint(
@@ -246,4 +310,112 @@ class UserActivity(models.Model):
         ordering = ['-viewed_at']
         indexes = [
             models.Index(fields=['user', 'activity_type']),
-        ]
\ No newline at end of file
+        ]
+
+
+class MovieNeighbor(models.Model):
+    """
+    Похожий фильм по поведению пользователей ("кто смотрел этот, смотрел и...").
+    Таблица заполняется командой build_similarities; rank - место соседа (с 1).
+    """
+    movie = models.ForeignKey(
+        Movie,
+        on_delete=models.CASCADE,
+        related_name='neighbors',
+        verbose_name="Фильм"
+    )
+    neighbor = models.ForeignKey(
+        Movie,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="Похожий фильм"
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name="Место")
+    score = models.FloatField(verbose_name="Сходство")
+
+    def __str__(self):
+        return f"{self.movie_id} -> {self.neighbor_id} ({self.score:.3f})"
+
+    class Meta:
+        verbose_name = 'Похожий фильм'
+        verbose_name_plural = 'Похожие фильмы'
+        unique_together = ('movie', 'rank')  # индекс (movie_id, rank) - соседи фильма одним range scan
+        ordering = ['movie', 'rank']
+
+
+class UserRecommendation(models.Model):
+    """
+    Готовые рекомендации пользователя: items - [[id фильма, оценка], ...] по убыванию.
+    Заполняются пакетно (refresh_recommendations) и пересчитываются для одного пользователя
+    после его действий (movies.user_recommendations); stale - ждет пересчета.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recommendation',
+        verbose_name="Пользователь"
+    )
+    source = models.CharField(
+        max_length=20,
+        verbose_name="Источник",
+        help_text="als, tags или popular"
+    )
+    items = models.JSONField(
+        default=list,
+        verbose_name="Рекомендации"
+    )
+    stale = models.BooleanField(
+        default=False,
+        db_index=True,
+        verbose_name="Требует пересчета"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата пересчета"
+    )
+
+    def __str__(self):
+        return f"Рекомендации {self.user_id} ({self.source}, {len(self.items)})"
+
+    class Meta:
+        verbose_name = 'Рекомендации пользователя'
+        verbose_name_plural = 'Рекомендации пользователей'
+
+
+class NameKey(models.Model):
+    """
+    Ключ поиска человека по началу слова: search_name начиная с каждого слова
+    ('al pacino', 'pacino'). Поиск "pac" - диапазон по индексу (key, person_id),
+    а не LIKE '%pac%' по всей таблице (см. movies.people).
+    """
+    key = models.CharField(max_length=255, verbose_name="Ключ")
+
+    def __str__(self):
+        return f"{self.key} -> {self.person_id}"
+
+    class Meta:
+        abstract = True
+
+
+class ActorNameKey(NameKey):
+    person = models.ForeignKey(Actor, on_delete=models.CASCADE, related_name='name_keys', verbose_name="Актер")
+
+    class Meta:
+        verbose_name = 'Ключ поиска актера'
+        verbose_name_plural = 'Ключи поиска актеров'
+        indexes = [
+            # varchar_pattern_ops: в PostgreSQL LIKE 'pac%' использует индекс при любой локали базы
+            models.Index(fields=['key', 'person'], name='actor_name_key_idx', opclasses=['varchar_pattern_ops', 'int8_ops']),
+        ]
+
+
+class DirectorNameKey(NameKey):
+    person = models.ForeignKey(Director, on_delete=models.CASCADE, related_name='name_keys', verbose_name="Режиссер")
+
+    class Meta:
+        verbose_name = 'Ключ поиска режиссера'
+        verbose_name_plural = 'Ключи поиска режиссеров'
+        indexes = [
+            models.Index(fields=['key', 'person'], name='director_name_key_idx', opclasses=['varchar_pattern_ops', 'int8_ops']),
+        ]
@@ -0,0 +1,99 @@
+"""
+Фильтры фильмов по актерам и режиссерам.
+Имя из запроса нормализуется (movies.text.fold) и ищется с начала любого слова
+имени ("pac" находит "Al Pacino") по таблице ключей ActorNameKey/DirectorNameKey:
+это диапазон по индексу (key, person_id), а не LIKE '%pac%' по всей таблице людей.
+Найденные id кэшируются по версии каталога, поэтому повторные запросы
+фильтруют фильмы только по индексу actor_id/director_id (IN).
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+from movies.catalog import catalog_version
+from movies.models import Actor, ActorNameKey, Director, DirectorNameKey, Movie
+from movies.text import fold
+
+CACHE_TIMEOUT = 60 * 10
+
+# Если под имя подходит больше людей, фильтруем подзапросом по ключам, а не списком id
+MAX_RESOLVED = 5000
+
+NAME_KEYS = {Actor: ActorNameKey, Director: DirectorNameKey}
+
+
+def name_keys(search_name):
+    """Ключи для поиска с начала любого слова: 'al pacino', 'pacino'"""
+    words = search_name.split()
+    return {' '.join(words[i:]) for i in range(len(words))}
+
+
+def index_names(model, ids):
+    """Пересобрать ключи людей model с id из ids (после save() и пакетной записи)"""
+    key_model = NAME_KEYS[model]
+    ids = list(ids)
+    key_model.objects.filter(person_id__in=ids).delete()
+    key_model.objects.bulk_create([
+        key_model(person_id=person_id, key=key)
+        for person_id, search_name in model.objects.filter(pk__in=ids).values_list('pk', 'search_name')
+        for key in name_keys(search_name)
+    ])
+
+
+def starts_with(term):
+    """
+    Условие "ключ начинается с term", которое обслуживает индекс:
+    в PostgreSQL - LIKE 'term%' (индекс varchar_pattern_ops), в SQLite LIKE c ESCAPE
+    индекс не использует - диапазон [term, следующая строка) в двоичном порядке.
+    """
+    if connection.vendor == 'postgresql':
+        return Q(key__startswith=term)
+    return Q(key__gte=term, key__lt=term[:-1] + chr(ord(term[-1]) + 1))
+
+
+def matching_people(model, term):
+    """Подзапрос id людей model, у которых слово имени начинается с term"""
+    return NAME_KEYS[model].objects.filter(starts_with(term)).values('person_id')
+
+
+def resolve(model, term):
+    """
+    id людей model, у которых с term (уже нормализованного) начинается одно из слов имени.
+    None - если совпадений больше MAX_RESOLVED.
+    """
+    digest = hashlib.sha1(term.encode()).hexdigest()
+    key = f'movies:people:{catalog_version()}:{model._meta.model_name}:{digest}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(matching_people(model, term).distinct().values_list('person_id', flat=True)[:MAX_RESOLVED + 1])
+        cache.set(key, ids, CACHE_TIMEOUT)
+    return None if len(ids) > MAX_RESOLVED else ids
+
+
+def people_condition(model, names=(), ids=(), prefix=''):
+    """
+    Q для поля-ссылки на model (prefix - путь к нему, например 'actor' в промежуточной таблице):
+    любое из имен names или любой из ids.
+    """
+    found, condition = set(ids), Q()
+    for term in filter(None, map(fold, names)):
+        resolved = resolve(model, term)
+        if resolved is None:
+            condition |= Q(**{f'{prefix}_id__in': matching_people(model, term)})
+        else:
+            found.update(resolved)
+    return condition | Q(**{f'{prefix}_id__in': found})
+
+
+def movies_with_actors(names=(), ids=()):
+    """Подзапрос id фильмов с любым из актеров (полусоединение без DISTINCT)"""
+    return Movie.actors.through.objects.filter(
+        people_condition(Actor, names, ids, prefix='actor')
+    ).values('movie_id')
+
+
+def director_condition(names=(), ids=()):
+    return people_condition(Director, names, ids, prefix='director')
+
@@ -0,0 +1,46 @@
+"""
+Проверки планов запросов MovieFilter: какие индексы должны попадать в EXPLAIN.
+Общие для команды check_query_plans и тестов.
+"""
+from django.db import connection
+
+from movies.filters import MovieFilter
+from movies.models import Movie
+
+MOVIES = Movie._meta.db_table
+MOVIE_ACTORS = Movie.actors.through._meta.db_table
+
+# Параметры фильтра -> таблица и колонка, индекс по которой должен попасть в план
+CHECKS = [
+    ({}, MOVIES, 'rating'),  # список по умолчанию: ordering ['-rating', 'title'] без сортировки
+    ({'year': '1994'}, MOVIES, 'release_date'),
+    ({'year_min': '1990', 'year_max': '1999'}, MOVIES, 'release_date'),
+    ({'decade': '1970'}, MOVIES, 'release_date'),
+    ({'released_after': '2000-01-01', 'released_before': '2005-06-30'}, MOVIES, 'release_date'),
+    ({'rating_min': '8.5', 'rating_max': '9.5'}, MOVIES, 'rating'),
+    ({'actor_id': '1,2'}, MOVIE_ACTORS, 'actor_id'),
+    ({'director_id': '1'}, MOVIES, 'director_id'),
+]
+
+
+def indexes_on(table, column):
+    """Имена индексов таблицы, начинающихся с колонки column (по данным самой базы)"""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [
+        name for name, info in constraints.items()
+        if info['index'] and info['columns'] and info['columns'][0] == column
+    ]
+
+
+def disable_seqscan():
+    """Внутри транзакции: в PostgreSQL выключить seq scan до ее конца"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+
+def check_plan(params, table, column):
+    """(использованные индексы по table.column, план) для MovieFilter с параметрами params"""
+    plan = MovieFilter(params, queryset=Movie.objects.all()).qs.explain()
+    return [name for name in indexes_on(table, column) if name in plan], plan
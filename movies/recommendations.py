@@ -0,0 +1,238 @@
+"""
+Рекомендации по тегам (/api/recommendations/).
+Каталог в памяти процесса - разреженная матрица фильм x тег в формате COO
+на массивах NumPy: строка - фильм, вес тега - idf, строки нормированы,
+поэтому оценка фильма - косинус между ним и профилем пользователя.
+
+Профиль - вектор по тегам: предпочитаемые теги, теги избранных фильмов и фильмов
+с высокой оценкой в отзывах. Оценка всего каталога - одно векторное умножение
+(np.bincount по ненулевым элементам), лучшие k - np.argpartition.
+Избранное, фильмы с отзывами и просмотренные в выдачу не попадают.
+Если обучена модель ALS (movies.als), сначала используется она
+(через ANN-индекс movies.ann, если он построен по ее факторам).
+
+Матрица строится при первом запросе. Изменения из сигналов копятся в pending
+и учитываются поверх матрицы; когда их становится больше MAX_PENDING
+или меняется версия каталога (изменения в других процессах),
+матрица пересобирается из базы.
+"""
+import math
+
+import numpy as np
+from django.db.models import F
+
+from movies import ann
+from movies.als import factor_model
+from movies.catalog import CatalogIndex
+from movies.models import Movie, Review, UserActivity
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Веса источников профиля
+PREFERRED_WEIGHT = 1.0
+FAVORITE_WEIGHT = 1.0
+# Отзывы с оценкой от HIGH_RATING; вес растет с оценкой: 7 -> 0.4, 10 -> 1.0
+HIGH_RATING = 7
+
+# Рейтинг фильма разводит равные оценки, не перебивая совпадение тегов
+RATING_BIAS = 1e-4
+MAX_BIAS = 10 * RATING_BIAS
+
+MAX_PENDING = 1000
+
+
+class TagMatrix(CatalogIndex):
+    """Матрица фильм x тег процесса; строится лениво, меняется под блокировкой"""
+
+    def __init__(self):
+        super().__init__()
+        self.loaded = False
+        self.pending = {}  # movie_id -> (id тегов, рейтинг) или None, если фильм удален
+
+    def load(self):
+        with self.lock:
+            if len(self.pending) > MAX_PENDING:
+                super().invalidate()
+            self.ensure()
+            return self
+
+    def build(self):
+        movies = np.array(list(Movie.objects.order_by('pk').values_list('pk', 'rating')), dtype=np.float64)
+        movies = movies.reshape(-1, 2)
+        pairs = np.array(
+            list(Movie.tags.through.objects.order_by('movie_id').values_list('movie_id', 'tag_id').iterator()),
+            dtype=np.int64
+        ).reshape(-1, 2)
+        self.movie_ids = movies[:, 0].astype(np.int64)
+        self.bias = (movies[:, 1] * RATING_BIAS).astype(np.float32)
+        self.tag_ids, cols = np.unique(pairs[:, 1], return_inverse=True)
+        self.rows = np.searchsorted(self.movie_ids, pairs[:, 0])
+        self.cols = cols.astype(np.int64)
+        # idf: редкий тег говорит о вкусе больше, чем "Drama"
+        frequency = np.bincount(self.cols, minlength=len(self.tag_ids))
+        self.idf = np.log((len(self.movie_ids) + 1) / (frequency + 1)).astype(np.float32) + 1
+        weights = self.idf[self.cols]
+        norms = np.sqrt(np.bincount(self.rows, weights=weights ** 2, minlength=len(self.movie_ids)))
+        self.values = (weights / norms[self.rows]).astype(np.float32)
+        self.indptr = np.searchsorted(self.rows, np.arange(len(self.movie_ids) + 1))
+        self.pending = {}
+        self.loaded = True
+
+    def invalidate(self):
+        with self.lock:
+            super().invalidate()
+            self.loaded = False
+            self.pending = {}
+
+    def movies_changed(self, movie_ids):
+        """Фильмы сохранены или поменялись их теги (из сигналов)"""
+        with self.lock:
+            if not self.loaded:
+                return
+            movie_ids = set(movie_ids)
+            entries = {
+                pk: ([], rating) for pk, rating in Movie.objects.filter(pk__in=movie_ids).values_list('pk', 'rating')
+            }
+            for movie_id, tag_id in Movie.tags.through.objects.filter(
+                    movie_id__in=entries).values_list('movie_id', 'tag_id'):
+                entries[movie_id][0].append(tag_id)
+            for movie_id in movie_ids:
+                self.pending[movie_id] = entries.get(movie_id)
+
+    def movie_deleted(self, movie_id):
+        with self.lock:
+            if self.loaded:
+                self.pending[movie_id] = None
+
+    def position(self, movie_ids):
+        """Номера строк матрицы для id фильмов (отсутствующие отбрасываются)"""
+        movie_ids = np.asarray(list(movie_ids), dtype=np.int64)
+        positions = np.searchsorted(self.movie_ids, movie_ids)
+        positions = np.minimum(positions, max(len(self.movie_ids) - 1, 0))
+        return positions[self.movie_ids[positions] == movie_ids] if len(self.movie_ids) else positions[:0]
+
+    def columns(self, tag_ids):
+        """Номера столбцов для id тегов (теги, появившиеся после построения, отбрасываются)"""
+        tag_ids = np.asarray(list(tag_ids), dtype=np.int64)
+        if not len(self.tag_ids):
+            return tag_ids[:0]
+        cols = np.minimum(np.searchsorted(self.tag_ids, tag_ids), len(self.tag_ids) - 1)
+        return cols[self.tag_ids[cols] == tag_ids]
+
+    def row(self, movie_id):
+        """Строка фильма с учетом pending: (номера столбцов, веса)"""
+        if movie_id in self.pending:
+            entry = self.pending[movie_id]
+            cols = self.columns(entry[0] if entry else ())
+            weights = self.idf[cols]
+            return cols, weights / (math.sqrt(float(weights @ weights)) or 1.0)
+        positions = self.position([movie_id])
+        if not len(positions):
+            return self.cols[:0], self.values[:0]
+        start, end = self.indptr[positions[0]], self.indptr[positions[0] + 1]
+        return self.cols[start:end], self.values[start:end]
+
+    def profile(self, tag_ids=(), movie_weights=None):
+        """Единичный вектор профиля: предпочитаемые теги плюс строки понравившихся фильмов"""
+        with self.lock:
+            profile = np.zeros(len(self.tag_ids), dtype=np.float32)
+            profile[self.columns(tag_ids)] += PREFERRED_WEIGHT
+            for movie_id, weight in (movie_weights or {}).items():
+                cols, values = self.row(movie_id)
+                profile[cols] += weight * values
+        norm = float(np.linalg.norm(profile))
+        return profile / norm if norm else profile
+
+    def recommend(self, profile, exclude=(), limit=DEFAULT_LIMIT):
+        """Список (movie_id, оценка) лучших limit фильмов, кроме exclude"""
+        with self.lock:
+            scores = np.bincount(self.rows, weights=profile[self.cols] * self.values, minlength=len(self.movie_ids))
+            scores = scores.astype(np.float32) + self.bias
+            ids = self.movie_ids
+            # Фильмы, измененные после построения: старая строка выключается, новая считается отдельно
+            if self.pending:
+                scores[self.position(self.pending)] = -np.inf
+                extra_ids, extra_scores = [], []
+                for movie_id, entry in self.pending.items():
+                    if entry is not None:
+                        cols, values = self.row(movie_id)
+                        extra_ids.append(movie_id)
+                        extra_scores.append(float(profile[cols] @ values) + entry[1] * RATING_BIAS)
+                ids = np.concatenate([ids, np.array(extra_ids, dtype=np.int64)])
+                scores = np.concatenate([scores, np.array(extra_scores, dtype=np.float32)])
+            exclude = np.asarray(list(exclude), dtype=np.int64)
+            if len(exclude):
+                scores[np.isin(ids, exclude)] = -np.inf
+            # Без совпадающих тегов фильм не рекомендуем - остается только рейтинг
+            scores[scores <= MAX_BIAS] = -np.inf
+
+            limit = min(limit, len(scores))
+            if not limit:
+                return []
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            return [(int(ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+tag_matrix = TagMatrix()
+
+
+def seen_movie_ids(user):
+    """Избранное, фильмы с отзывами и история просмотров пользователя"""
+    seen = set(user.favorite_movies.values_list('pk', flat=True))
+    seen.update(Review.objects.filter(user=user).values_list('movie_id', flat=True))
+    seen.update(UserActivity.objects.filter(user=user).values_list('movie_id', flat=True))
+    return seen
+
+
+def liked_movie_weights(user):
+    """Фильм -> вес в профиле: избранное и отзывы с высокой оценкой"""
+    weights = dict.fromkeys(user.favorite_movies.values_list('pk', flat=True), FAVORITE_WEIGHT)
+    for movie_id, rating in Review.objects.filter(user=user, rating__gte=HIGH_RATING).values_list('movie_id', 'rating'):
+        weights[movie_id] = max(weights.get(movie_id, 0.0), (rating - 5) / 5)
+    return weights
+
+
+def popular_movie_ids(exclude=(), limit=DEFAULT_LIMIT):
+    """Запасной вариант без профиля: лучшие по рейтингу (индекс movie_rating_title_idx)"""
+    return list(
+        Movie.objects.exclude(pk__in=exclude).order_by(F('rating').desc(), 'title')
+        .values_list('pk', flat=True)[:limit]
+    )
+
+
+def recommend_for(user, limit=DEFAULT_LIMIT):
+    """
+    Рекомендации пользователю: (источник, список (movie_id, оценка)).
+    Источник 'als' - факторная модель (команда train_als), если пользователь в ней есть;
+    'tags' - профиль тегов; 'popular' - ни то ни другое ничего не дало.
+    Недостающие места дополняются следующим источником, в конце - лучшими по рейтингу.
+    """
+    seen = seen_movie_ids(user)
+    ranked, source = [], 'popular'
+    model = factor_model()
+    if model is not None:
+        # ANN-индекс по факторам этой же версии модели (build_ann_index --source als)
+        index = ann.ann_index(ann.ALS)
+        if index is not None and index.meta.get('als_version') != model.version:
+            index = None
+        ranked = model.recommend(user.pk, seen, limit, index)
+        source = 'als' if ranked else source
+    if len(ranked) < limit:
+        tag_ids = list(user.preferred_tags.values_list('pk', flat=True))
+        weights = liked_movie_weights(user)
+        chosen = seen | {movie_id for movie_id, _ in ranked}
+        # Профиль и оценки - по одному состоянию матрицы: между двумя отдельными
+        # блокировками сигнал мог пересобрать ее с другим набором тегов (столбцов)
+        with tag_matrix.lock:
+            matrix = tag_matrix.load()
+            profile = matrix.profile(tag_ids, weights)
+            by_tags = matrix.recommend(profile, chosen, limit - len(ranked)) if profile.any() else []
+        if by_tags and not ranked:
+            source = 'tags'
+        ranked += by_tags
+    if len(ranked) < limit:
+        chosen = seen | {movie_id for movie_id, _ in ranked}
+        ranked += [(movie_id, 0.0) for movie_id in popular_movie_ids(chosen, limit - len(ranked))]
+    return source, ranked
@@ -0,0 +1,135 @@
+"""
+Кэш результатов списка и поиска фильмов: по каноническому виду параметров
+запроса хранятся только id фильмов (первые MAX_IDS) и общее число найденных.
+Сами карточки сериализуются на каждый запрос, поэтому поля, зависящие
+от пользователя (is_favorite и т.п.), остаются верными.
+
+Два уровня: L1 - кэш процесса ('local', короткий срок жизни), L2 - общий
+кэш ('default'). Ключ включает версию каталога (movies.catalog), поэтому
+любое изменение фильмов, людей, тегов или связей сбрасывает оба уровня.
+"""
+import threading
+from collections.abc import Sequence
+
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from movies.catalog import catalog_version, query_hash
+
+TIMEOUT = 300
+L1_TIMEOUT = 30
+
+# Сколько первых id хранится; страницы дальше берут id из базы
+MAX_IDS = 1000
+
+# Параметры, которые не меняют набор и порядок фильмов
+IGNORED_PARAMS = ('page', 'page_size', 'expand', 'format')
+
+
+class ResultIds(Sequence):
+    """
+    Список id для пагинатора: длина - общее число найденных,
+    срезы в пределах кэша отдаются из него, дальше - запросом к базе
+    (get_queryset вызывается только тогда).
+    """
+
+    def __init__(self, ids, total, get_queryset):
+        self.ids = ids
+        self.total = total
+        self.get_queryset = get_queryset
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            if item.stop is not None and item.stop <= len(self.ids):
+                return self.ids[item]
+            return list(self.get_queryset().values_list('pk', flat=True)[item])
+        return self[item:item + 1][0]
+
+
+class ResultCache:
+    """Двухуровневый кэш id результатов со счетчиками попаданий"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits_l1 = self.hits_l2 = self.misses = 0
+
+    def record(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        """Счетчики текущего процесса и доля попаданий"""
+        with self.lock:
+            total = self.hits_l1 + self.hits_l2 + self.misses
+            hits = self.hits_l1 + self.hits_l2
+            return {
+                'hits_l1': self.hits_l1,
+                'hits_l2': self.hits_l2,
+                'misses': self.misses,
+                'hit_rate': round(hits / total, 4) if total else 0.0,
+            }
+
+    @staticmethod
+    def key(scope, params):
+        return f'movies:results:{catalog_version()}:{scope}:{query_hash(params, IGNORED_PARAMS)}'
+
+    def get(self, scope, params, get_queryset):
+        """
+        ResultIds для параметров params. get_queryset строит отфильтрованный QuerySet
+        и вызывается только при промахе (и для страниц дальше MAX_IDS).
+        """
+        key = self.key(scope, params)
+        local, shared = caches['local'], caches['default']
+        cached = local.get(key)
+        if cached is not None:
+            self.record('hits_l1')
+        else:
+            cached = shared.get(key)
+            if cached is not None:
+                self.record('hits_l2')
+            else:
+                self.record('misses')
+                queryset = get_queryset()
+                ids = list(queryset.values_list('pk', flat=True)[:MAX_IDS])
+                cached = (ids, len(ids) if len(ids) < MAX_IDS else queryset.count())
+                shared.set(key, cached, TIMEOUT)
+            local.set(key, cached, L1_TIMEOUT)
+        ids, total = cached
+        return ResultIds(ids, total, get_queryset)
+
+
+result_cache = ResultCache()
+
+
+class CachedResultsMixin:
+    """
+    list() через кэш id: страница id берется из ResultIds, фильмы страницы -
+    одним запросом get_objects_queryset().in_bulk() в исходном порядке.
+    """
+    result_cache_scope = None
+
+    def get_objects_queryset(self):
+        """QuerySet, из которого берутся фильмы страницы (select_related/prefetch)"""
+        return self.get_queryset()
+
+    def list(self, request, *args, **kwargs):
+        ids = result_cache.get(
+            self.result_cache_scope,
+            request.query_params,
+            lambda: self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(ids)
+        page_ids = list(page) if page is not None else list(ids)
+        movies = self.get_objects_queryset().in_bulk(page_ids)
+        objects = [movies[pk] for pk in page_ids if pk in movies]
+        serializer = self.get_serializer(objects, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
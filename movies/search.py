@@ -0,0 +1,125 @@
+"""
+Полнотекстовый поиск по фильмам.
+PostgreSQL: колонка movies_movie.search_vector (tsvector) с GIN-индексом и ранжированием ts_rank.
+SQLite (разработка и тесты): виртуальная таблица FTS5 movies_movie_fts и ранжирование bm25.
+Остальные базы: запасной вариант через icontains.
+
+Индекс включает название, описание, режиссера, актеров и теги с разными весами
+и обновляется через refresh_search_index (сигналы и пакетная загрузка).
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'movies_movie_fts'
+
+# Веса полей: A - название, B - режиссер и актеры, C - теги, D - описание
+PG_VECTOR_SQL = f"""
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(m.title, '')), 'A') ||
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+        SELECT d.name FROM movies_director d WHERE d.id = m.director_id
+    ), '')), 'B') ||
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+        SELECT string_agg(a.name, ' ') FROM movies_actor a
+        JOIN movies_movie_actors ma ON ma.actor_id = a.id WHERE ma.movie_id = m.id
+    ), '')), 'B') ||
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+        SELECT string_agg(t.name, ' ') FROM movies_tag t
+        JOIN movies_movie_tags mt ON mt.tag_id = t.id WHERE mt.movie_id = m.id
+    ), '')), 'C') ||
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(m.description, '')), 'D')
+"""
+
+# Веса колонок FTS5 в том же порядке, что и колонки таблицы
+FTS_COLUMNS = ('title', 'director', 'actors', 'tags', 'description')
+FTS_WEIGHTS = '10.0, 4.0, 4.0, 2.0, 1.0'
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def backend():
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        return 'sqlite'
+    return None
+
+
+def refresh_search_index(movie_ids=None):
+    """
+    Пересчитывает поисковый индекс для указанных фильмов (None - для всех).
+    Один SQL-запрос на PostgreSQL и два на SQLite независимо от числа фильмов.
+    """
+    kind = backend()
+    if kind is None:
+        return
+    if movie_ids is not None:
+        movie_ids = list(movie_ids)
+        if not movie_ids:
+            return
+        where, params = f"m.id IN ({', '.join(['%s'] * len(movie_ids))})", movie_ids
+    else:
+        where, params = '1 = 1', []
+
+    with connection.cursor() as cursor:
+        if kind == 'postgresql':
+            cursor.execute(f'UPDATE movies_movie AS m SET search_vector = {PG_VECTOR_SQL} WHERE {where}', params)
+        else:
+            if movie_ids is None:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            else:
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(movie_ids))})",
+                               movie_ids)
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+                f"SELECT m.id, m.title, d.name, "
+                f"(SELECT group_concat(a.name, ' ') FROM movies_actor a "
+                f" JOIN movies_movie_actors ma ON ma.actor_id = a.id WHERE ma.movie_id = m.id), "
+                f"(SELECT group_concat(t.name, ' ') FROM movies_tag t "
+                f" JOIN movies_movie_tags mt ON mt.tag_id = t.id WHERE mt.movie_id = m.id), "
+                f"m.description "
+                f"FROM movies_movie m LEFT JOIN movies_director d ON d.id = m.director_id WHERE {where}",
+                params
+            )
+
+
+def fts_query(text):
+    """Запрос пользователя -> выражение FTS5: все слова обязательны, спецсимволы экранированы"""
+    return ' '.join('"%s"' % word.replace('"', '""') for word in WORD_RE.findall(text))
+
+
+def search_movies(queryset, text):
+    """
+    Фильтрует queryset по поисковому запросу и сортирует по релевантности.
+    Результат - обычный QuerySet с аннотацией rank, его можно пагинировать.
+    """
+    text = text.strip()
+    if not text:
+        return queryset
+
+    kind = backend()
+    if kind == 'postgresql':
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-rating', 'title')
+
+    if kind == 'sqlite':
+        match = fts_query(text)
+        if not match:
+            return queryset.none()
+        ids = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        # bm25 тем меньше, чем релевантнее - меняем знак, чтобы сортировать как ts_rank
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {FTS_WEIGHTS}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = movies_movie.id',
+            [match],
+            output_field=FloatField()
+        )
+        return queryset.filter(id__in=ids).annotate(rank=rank).order_by('-rank', '-rating', 'title')
+
+    return queryset.filter(Q(title__icontains=text) | Q(description__icontains=text))
@@ -73,8 +73,28 @@ class MovieTitleSerializer(serializers.ModelSerializer):
         fields = ['id', 'title']
 
 class MovieListSerializer(serializers.ModelSerializer):
+    """
+    Короткая карточка фильма для списков и поиска.
+    Дополнительные поля подключаются через context['expand'] (параметр ?expand=).
+    """
     director = serializers.StringRelatedField()
 
+    # Поля, которые можно запросить через ?expand=; связи view подгружает prefetch_related
+    expandable_fields = {
+        'description': lambda: serializers.CharField(read_only=True),
+        'release_date': lambda: serializers.DateField(read_only=True),
+        'rating': lambda: serializers.FloatField(read_only=True),
+        'poster_url': lambda: serializers.URLField(read_only=True),
+        'actors': lambda: ActorSerializer(many=True, read_only=True),
+        'tags': lambda: TagSerializer(many=True, read_only=True),
+    }
+
     class Meta:
         model = Movie
-        fields = ['id', 'title', 'director']
\ No newline at end of file
+        fields = ['id', 'title', 'director']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in self.context.get('expand', ()):
+            fields[name] = self.expandable_fields[name]()
+        return fields
\ No newline at end of file
@@ -0,0 +1,222 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from movies import autocomplete, fuzzy, people, user_recommendations
+from movies.catalog import bump_catalog_version
+from movies.models import Actor, Director, Movie, Review, Tag, User
+from movies.recommendations import tag_matrix
+from movies.search import refresh_search_index
+from movies.tag_index import tag_index
+
+# Пакетная запись фильмов (BulkMovieWriter): bulk-операции не вызывают post_save
+# и m2m_changed, поэтому производные индексы обновляются по этому сигналу.
+# Аргументы: movie_ids - id записанных фильмов.
+movies_bulk_saved = Signal()
+
+
+@receiver(movies_bulk_saved)
+def movies_bulk_saved_handler(sender, movie_ids, **kwargs):
+    refresh_search_index(movie_ids)
+    fuzzy.invalidate()
+    autocomplete.autocomplete.invalidate()
+    tag_index.invalidate()
+    tag_matrix.invalidate()
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Movie)
+def movie_saved(sender, instance, **kwargs):
+    """Название, описание или режиссер могли измениться - пересчитываем поисковый индекс"""
+    refresh_search_index([instance.pk])
+
+
+@receiver(m2m_changed, sender=Movie.actors.through)
+@receiver(m2m_changed, sender=Movie.tags.through)
+def movie_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Изменился состав актеров или тегов фильма"""
+    if reverse and action == 'pre_clear':
+        # После очистки связей со стороны актера/тега затронутые фильмы уже не найти
+        field = 'actors' if sender is Movie.actors.through else 'tags'
+        instance.cleared_movie_ids = list(Movie.objects.filter(**{field: instance}).values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_search_index([instance.pk])
+    elif action == 'post_clear':
+        refresh_search_index(getattr(instance, 'cleared_movie_ids', []))
+    else:
+        refresh_search_index(pk_set)
+
+    if action != 'post_clear':
+        # Популярность актеров и тегов в подсказках - число их фильмов
+        kind = 'actors' if sender is Movie.actors.through else 'tags'
+        delta = 1 if action == 'post_add' else -1
+        if reverse:
+            autocomplete.relations_changed(kind, [instance.pk], delta * len(pk_set))
+        else:
+            autocomplete.relations_changed(kind, pk_set, delta)
+
+
+@receiver(post_save, sender=Actor)
+@receiver(post_save, sender=Director)
+def person_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is None or 'name' in update_fields:
+        people.index_names(sender, [instance.pk])
+    if not created:
+        refresh_search_index(instance.movies.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_index(instance.movie_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Actor)
+@receiver(post_save, sender=Director)
+def fuzzy_index_saved(sender, instance, **kwargs):
+    """Индекс триграмм в памяти процесса (базы без pg_trgm)"""
+    fuzzy.update_instance(instance)
+
+
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=Actor)
+@receiver(post_delete, sender=Director)
+def fuzzy_index_deleted(sender, instance, **kwargs):
+    fuzzy.remove_instance(instance)
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Actor)
+@receiver(post_save, sender=Director)
+@receiver(post_save, sender=Tag)
+def autocomplete_saved(sender, instance, created, **kwargs):
+    """Подсказки при вводе обновляются на месте, без перестройки"""
+    autocomplete.instance_saved(instance, created)
+
+
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=Actor)
+@receiver(post_delete, sender=Director)
+@receiver(post_delete, sender=Tag)
+def autocomplete_deleted(sender, instance, **kwargs):
+    autocomplete.instance_deleted(instance)
+
+
+@receiver(m2m_changed, sender=Movie.tags.through)
+def tag_index_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Битовые карты тегов: movie.tags.add(...) и tag.movie_set.add(...) с обеих сторон"""
+    if action == 'pre_clear' and not reverse:
+        instance.cleared_tag_ids = list(instance.tags.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        add = action == 'post_add'
+        if reverse:
+            tag_index.change([instance.pk], pk_set, add)
+        else:
+            tag_index.change(pk_set, [instance.pk], add)
+    elif action == 'post_clear':
+        if reverse:
+            tag_index.change([instance.pk], getattr(instance, 'cleared_movie_ids', []), False)
+        else:
+            tag_index.change(getattr(instance, 'cleared_tag_ids', []), [instance.pk], False)
+
+
+@receiver(post_delete, sender=Movie)
+def tag_index_movie_deleted(sender, instance, **kwargs):
+    tag_index.remove_movie(instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+def tag_index_tag_saved(sender, instance, **kwargs):
+    tag_index.tag_saved(instance)
+
+
+@receiver(post_delete, sender=Tag)
+def tag_index_tag_deleted(sender, instance, **kwargs):
+    tag_index.tag_deleted(instance)
+
+
+@receiver(post_save, sender=Movie)
+def tag_matrix_movie_saved(sender, instance, **kwargs):
+    """Матрица рекомендаций: новый фильм или изменился рейтинг"""
+    tag_matrix.movies_changed([instance.pk])
+
+
+@receiver(post_delete, sender=Movie)
+def tag_matrix_movie_deleted(sender, instance, **kwargs):
+    tag_matrix.movie_deleted(instance.pk)
+
+
+@receiver(m2m_changed, sender=Movie.tags.through)
+def tag_matrix_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove'):
+        tag_matrix.movies_changed(pk_set if reverse else [instance.pk])
+    elif action == 'post_clear':
+        tag_matrix.movies_changed(getattr(instance, 'cleared_movie_ids', []) if reverse else [instance.pk])
+
+
+@receiver(post_delete, sender=Tag)
+def tag_matrix_tag_deleted(sender, instance, **kwargs):
+    """Связи удаленного тега уходят каскадом, без m2m_changed - матрица строится заново"""
+    tag_matrix.invalidate()
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Actor)
+@receiver(post_save, sender=Director)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=Actor)
+@receiver(post_delete, sender=Director)
+@receiver(post_delete, sender=Tag)
+def catalog_changed(sender, **kwargs):
+    """Кэши по каталогу (фасеты) сбрасываются сменой версии"""
+    bump_catalog_version()
+
+
+@receiver(m2m_changed, sender=Movie.actors.through)
+@receiver(m2m_changed, sender=Movie.tags.through)
+def catalog_relations_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_catalog_version()
+
+
+@receiver(m2m_changed, sender=User.favorite_movies.through)
+def recommendations_favorites_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Готовые рекомендации: новое избранное убирается из списка сразу, профиль пересчитывается"""
+    if reverse and action == 'pre_clear':
+        instance.cleared_user_ids = list(instance.favorited_by.values_list('pk', flat=True))
+    if action == 'post_add' and not reverse:
+        user_recommendations.mark_seen(instance.pk, pk_set)
+    elif action == 'post_add':
+        for user_id in pk_set:
+            user_recommendations.mark_seen(user_id, [instance.pk])
+    elif action in ('post_remove', 'post_clear'):
+        if not reverse:
+            user_recommendations.mark_stale([instance.pk])
+        else:
+            user_recommendations.mark_stale(pk_set or getattr(instance, 'cleared_user_ids', []))
+
+
+@receiver(m2m_changed, sender=User.preferred_tags.through)
+def recommendations_preferences_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        user_recommendations.mark_stale([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        user_recommendations.mark_stale(pk_set)
+
+
+@receiver(post_save, sender=Review)
+def recommendations_review_saved(sender, instance, created, **kwargs):
+    """Оцененный фильм больше не предлагается; изменение оценки меняет профиль"""
+    if created:
+        user_recommendations.mark_seen(instance.user_id, [instance.movie_id])
+    else:
+        user_recommendations.mark_stale([instance.user_id])
+
+
+@receiver(post_delete, sender=Review)
+def recommendations_review_deleted(sender, instance, **kwargs):
+    """Удаленный отзыв больше не входит в профиль, а фильм снова может попасть в выдачу"""
+    user_recommendations.mark_stale([instance.user_id])
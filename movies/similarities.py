@@ -0,0 +1,95 @@
+"""
+"Кто смотрел этот фильм, смотрел и..." - соседи фильма по матрице взаимодействий
+(movies.interactions), считаются командой build_similarities и хранятся в MovieNeighbor.
+
+Сходство фильмов i и j:
+- cosine: sum(w_ui * w_uj) / (||w_i|| * ||w_j||) по весам взаимодействий;
+- jaccard: |U_i & U_j| / |U_i | U_j| по множествам пользователей.
+Фильмы обрабатываются пачками: для пачки через пользователей собираются
+пары (фильм пачки, другой фильм) и суммируются np.bincount в плотный блок
+пачка x каталог. Размер пачки подбирается так, чтобы блок и список пар
+не выходили за max_cells, поэтому память ограничена независимо от размера каталога.
+"""
+import numpy as np
+
+COSINE = 'cosine'
+JACCARD = 'jaccard'
+METRICS = (COSINE, JACCARD)
+
+DEFAULT_K = 20
+DEFAULT_MIN_COMMON = 2
+DEFAULT_MAX_CELLS = 4_000_000
+
+
+def chunks(pairs_per_movie, n_movies, max_cells):
+    """Границы пачек фильмов: блок пачка x n_movies и число пар пачки не больше max_cells"""
+    start = 0
+    while start < n_movies:
+        rows = max(1, max_cells // max(n_movies, 1))
+        pairs = np.cumsum(pairs_per_movie[start:start + rows])
+        # Хотя бы один фильм, даже если у него одного пар больше лимита
+        end = start + max(1, int(np.searchsorted(pairs, max_cells, side='right')))
+        yield start, end
+        start = end
+
+
+def neighbors(interactions, k=DEFAULT_K, metric=COSINE, min_common=DEFAULT_MIN_COMMON,
+              max_cells=DEFAULT_MAX_CELLS):
+    """
+    Генератор (id фильма, [(id соседа, сходство), ...]) по убыванию сходства,
+    не больше k соседей с хотя бы min_common общими пользователями.
+    """
+    n_movies = len(interactions.movie_ids)
+    movie_indptr, movie_users, movie_values = interactions.by_movie()
+    user_indptr, user_movies, user_values = interactions.by_user()
+    if metric == JACCARD:
+        movie_values = np.ones_like(movie_values)
+        user_values = np.ones_like(user_values)
+    norms = np.sqrt(np.bincount(interactions.movies, weights=interactions.values ** 2, minlength=n_movies))
+    counts = np.diff(movie_indptr)
+    user_degree = np.diff(user_indptr)
+    # Сколько пар (фильм, другой фильм) даст каждый фильм через своих пользователей
+    pairs_per_movie = np.bincount(
+        np.repeat(np.arange(n_movies), counts), weights=user_degree[movie_users], minlength=n_movies
+    ).astype(np.int64)
+
+    for start, end in chunks(pairs_per_movie, n_movies, max_cells):
+        lo, hi = movie_indptr[start], movie_indptr[end]
+        rows = np.repeat(np.arange(end - start), counts[start:end])  # фильм пачки для каждого (фильм, пользователь)
+        users, weights = movie_users[lo:hi], movie_values[lo:hi]
+        # Разворачиваем каждого пользователя в список его фильмов
+        degree = user_degree[users]
+        pair_rows = np.repeat(rows, degree)
+        offsets = np.repeat(user_indptr[users] - np.cumsum(degree) + degree, degree) + np.arange(degree.sum())
+        pair_cols = user_movies[offsets]
+        pair_weights = np.repeat(weights, degree) * user_values[offsets]
+
+        cells = pair_rows * n_movies + pair_cols
+        size = (end - start) * n_movies
+        dot = np.bincount(cells, weights=pair_weights, minlength=size).reshape(end - start, n_movies)
+        common = np.bincount(cells, minlength=size).reshape(end - start, n_movies)
+
+        movie_range = np.arange(start, end)
+        if metric == JACCARD:
+            union = counts[movie_range, None] + counts[None, :] - dot
+            score = np.divide(dot, union, out=np.zeros_like(dot), where=union > 0)
+        else:
+            denominator = norms[movie_range, None] * norms[None, :]
+            score = np.divide(dot, denominator, out=np.zeros_like(dot), where=denominator > 0)
+        score[np.arange(end - start), movie_range] = 0  # сам с собой
+        score[common < min_common] = 0
+
+        top = min(k, n_movies)
+        if not top:
+            return
+        best = np.argpartition(-score, top - 1, axis=1)[:, :top]
+        best_scores = np.take_along_axis(score, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        for row, movie in enumerate(movie_range):
+            found = best_scores[row] > 0
+            yield int(interactions.movie_ids[movie]), [
+                (int(interactions.movie_ids[col]), float(value))
+                for col, value in zip(best[row][found], best_scores[row][found])
+            ]
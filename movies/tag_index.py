@@ -0,0 +1,151 @@
+"""
+Инвертированный индекс тег -> множество id фильмов в памяти процесса.
+Множества хранятся битовыми картами (int: бит n = фильм с id n), поэтому
+"все теги", "любой из тегов" и "без тега" - это &, | и & ~ над целыми числами
+вместо JOIN movie_tags + DISTINCT. Итоговые id передаются в ORM одним параметром,
+сортировка и пагинация остаются за базой.
+Индекс строится при первом запросе и обновляется из сигналов m2m_changed;
+после изменений в других процессах перестраивается по версии каталога.
+"""
+import json
+from functools import reduce
+from operator import and_, or_
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from movies.catalog import CatalogIndex
+from movies.models import Movie, Tag
+
+MODE_ANY = 'any'
+MODE_ALL = 'all'
+
+# Номера установленных битов в каждом возможном байте
+BYTE_BITS = [[bit for bit in range(8) if byte >> bit & 1] for byte in range(256)]
+
+
+def bitmap_ids(bitmap):
+    """Битовая карта -> отсортированный список id"""
+    ids = []
+    for offset, byte in enumerate(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')):
+        if byte:
+            base = offset * 8
+            ids.extend(base + bit for bit in BYTE_BITS[byte])
+    return ids
+
+
+def bitmap_of(ids):
+    """Список id -> битовая карта (через bytearray: сдвиги int на каждый id квадратичны)"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for movie_id in ids:
+        buffer[movie_id >> 3] |= 1 << (movie_id & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def ids_in(ids):
+    """
+    Выражение для pk__in со списком id одним параметром запроса:
+    ANY(массив) в PostgreSQL, json_each в SQLite (нет лимита на число параметров).
+    """
+    if connection.vendor == 'postgresql':
+        return RawSQL('SELECT unnest(%s::bigint[])', [list(ids)])
+    if connection.vendor == 'sqlite':
+        return RawSQL('SELECT value FROM json_each(%s)', [json.dumps(list(ids))])
+    return list(ids)
+
+
+class TagIndex(CatalogIndex):
+    """Битовые карты по тегам; строятся лениво, меняются под блокировкой"""
+
+    def __init__(self):
+        super().__init__()
+        self.bitmaps = None  # tag_id -> битовая карта фильмов
+        self.names = {}  # casefold(имя) -> tag_id
+
+    def load(self):
+        with self.lock:
+            self.ensure()
+            return self.bitmaps
+
+    def build(self):
+        self.names = {name.casefold(): tag_id for tag_id, name in Tag.objects.values_list('id', 'name')}
+        rows = {}
+        for movie_id, tag_id in Movie.tags.through.objects.values_list('movie_id', 'tag_id').iterator():
+            rows.setdefault(tag_id, []).append(movie_id)
+        self.bitmaps = {tag_id: bitmap_of(movie_ids) for tag_id, movie_ids in rows.items()}
+
+    def invalidate(self):
+        with self.lock:
+            super().invalidate()
+            self.bitmaps = None
+
+    def bitmaps_for(self, names):
+        """Битовые карты тегов по именам (без учета регистра); None для неизвестных тегов"""
+        bitmaps = self.load()
+        result = []
+        for name in names:
+            tag_id = self.names.get(name.casefold())
+            result.append(bitmaps.get(tag_id, 0) if tag_id is not None else None)
+        return result
+
+    def select(self, include=(), mode=MODE_ANY, exclude=()):
+        """
+        Битовая карта фильмов для выражения по тегам:
+        include - все (MODE_ALL) или любой (MODE_ANY) из тегов, минус фильмы с тегами exclude.
+        Возвращает (битовая карта, исключенные) - первое None, если include пуст.
+        """
+        excluded = reduce(or_, (b for b in self.bitmaps_for(exclude) if b is not None), 0)
+        if not include:
+            return None, excluded
+        included = self.bitmaps_for(include)
+        if mode == MODE_ALL:
+            selected = 0 if None in included else reduce(and_, included)
+        else:
+            selected = reduce(or_, (b for b in included if b is not None), 0)
+        return selected & ~excluded, excluded
+
+    def filter(self, queryset, include=(), mode=MODE_ANY, exclude=()):
+        selected, excluded = self.select(include, mode, exclude)
+        if selected is not None:
+            return queryset.filter(pk__in=ids_in(bitmap_ids(selected)))
+        if excluded:
+            return queryset.exclude(pk__in=ids_in(bitmap_ids(excluded)))
+        return queryset
+
+    def change(self, tag_ids, movie_ids, add):
+        """Изменились связи фильм-тег (из сигнала m2m_changed)"""
+        with self.lock:
+            if self.bitmaps is None:
+                return
+            movies = bitmap_of(movie_ids)
+            for tag_id in tag_ids:
+                current = self.bitmaps.get(tag_id, 0)
+                self.bitmaps[tag_id] = current | movies if add else current & ~movies
+
+    def remove_movie(self, movie_id):
+        with self.lock:
+            if self.bitmaps is None:
+                return
+            mask = ~(1 << movie_id)
+            for tag_id in self.bitmaps:
+                self.bitmaps[tag_id] &= mask
+
+    def tag_saved(self, tag):
+        with self.lock:
+            if self.bitmaps is None:
+                return
+            self.names = {name: tag_id for name, tag_id in self.names.items() if tag_id != tag.pk}
+            self.names[tag.name.casefold()] = tag.pk
+
+    def tag_deleted(self, tag):
+        with self.lock:
+            if self.bitmaps is None:
+                return
+            self.names = {name: tag_id for name, tag_id in self.names.items() if tag_id != tag.pk}
+            self.bitmaps.pop(tag.pk, None)
+
+
+tag_index = TagIndex()
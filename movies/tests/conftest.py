@@ -0,0 +1,34 @@
+"""
+Настройка pytest для замеров под pytest-benchmark (movies/tests/test_benchmarks.py).
+manage.py test этот файл не читает. Без pytest-benchmark замеры не собираются.
+"""
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from movies.imdb.benchmarks import parse_cases, persist_case  # noqa: E402
+from movies.imdb.snapshot import read_page  # noqa: E402
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    collect_ignore = ['test_benchmarks.py']
+
+CHART_SIZES = (250, 1000, 10000)
+PERSIST = ((1000, 200),)  # (записей, размер пачки)
+
+
+def pytest_generate_tests(metafunc):
+    """Те же замеры, что у bench_imdb, - по одному тесту на замер"""
+    if 'parse_case' in metafunc.fixturenames:
+        backup = read_page(os.path.join(settings.BASE_DIR, 'imdb_backup.html'))
+        cases = parse_cases(backup, CHART_SIZES)
+        metafunc.parametrize('parse_case', cases, ids=[case.name for case in cases])
+    if 'persist_case' in metafunc.fixturenames:
+        cases = [persist_case(count, batch_size) for count, batch_size in PERSIST]
+        metafunc.parametrize('persist_case', cases, ids=[case.name for case in cases])
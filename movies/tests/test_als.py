@@ -0,0 +1,50 @@
+import shutil
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from movies import als
+from movies.interactions import Interactions
+
+
+class FactorModelTests(SimpleTestCase):
+    """ALS на игрушечной матрице: две группы пользователей с непересекающимися вкусами"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        pairs = [(user, movie) for user in (1, 2, 3, 4) for movie in (10, 11, 12)]
+        pairs += [(user, movie) for user in (5, 6, 7, 8) for movie in (20, 21, 22)]
+        pairs.remove((1, 12))  # фильм 12 пользователь 1 еще не видел
+        user_ids, movie_ids = (np.array(column, dtype=np.int64) for column in zip(*pairs))
+        cls.interactions = Interactions.from_triples(user_ids, movie_ids, np.ones(len(pairs)))
+        user_factors, item_factors = als.Trainer(factors=4, iterations=10).fit(cls.interactions)
+        cls.directory = tempfile.mkdtemp()
+        als.save_model(cls.interactions, user_factors, item_factors, {'factors': 4}, cls.directory)
+        cls.model = als.factor_model(cls.directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_factors_are_memory_mapped(self):
+        self.assertIsInstance(self.model.item_factors, np.memmap)
+        self.assertIsInstance(self.model.user_factors, np.memmap)
+        self.assertEqual(self.model.item_factors.shape, (6, 4))
+        self.assertEqual(list(self.model.movie_ids), [10, 11, 12, 20, 21, 22])
+        self.assertIs(als.factor_model(self.directory), self.model)
+
+    def test_recommends_unseen_movie_of_own_group(self):
+        ranked = self.model.recommend(1, exclude=[10, 11], limit=3)
+        self.assertEqual(ranked[0][0], 12)
+        self.assertNotIn(10, [movie_id for movie_id, _ in ranked])
+        self.assertNotIn(11, [movie_id for movie_id, _ in ranked])
+
+    def test_exclude_everything(self):
+        self.assertEqual(self.model.recommend(5, exclude=[10, 11, 12, 20, 21, 22]), [])
+
+    def test_unknown_user(self):
+        self.assertNotIn(999, self.model)
+        self.assertEqual(self.model.recommend(999), [])
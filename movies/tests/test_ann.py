@@ -0,0 +1,63 @@
+import datetime
+import shutil
+import tempfile
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from movies import ann
+from movies.models import Movie, Tag
+
+
+def unit_vectors(count, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class IvfIndexTests(SimpleTestCase):
+    def test_small_catalog(self):
+        movie_ids = np.arange(1, 6, dtype=np.int64)
+        vectors = unit_vectors(5)
+        index = ann.IvfIndex(ann.build(movie_ids, vectors, nlist=2))
+        # Кандидатов меньше limit: возвращаются все, кроме исключенного
+        found = index.search(vectors[0], 10, [1], nprobe=2)
+        self.assertEqual(sorted(movie_id for movie_id, _ in found), [2, 3, 4, 5])
+        self.assertEqual(len(ann.brute_force(movie_ids, vectors, vectors[0], 10, [1])), 4)
+        self.assertEqual(ann.recall_at_k(index, movie_ids, vectors, range(5), k=10, nprobe=2), 1.0)
+
+    def test_search_honours_exclude(self):
+        movie_ids = np.arange(100, 300, dtype=np.int64)
+        vectors = unit_vectors(200)
+        index = ann.IvfIndex(ann.build(movie_ids, vectors, nlist=8))
+        best = [movie_id for movie_id, _ in index.search(vectors[0], 5, nprobe=8)]
+        self.assertEqual(best[0], 100)
+        excluded = [movie_id for movie_id, _ in index.search(vectors[0], 5, best[:2], nprobe=8)]
+        self.assertFalse(set(best[:2]) & set(excluded))
+        self.assertEqual(excluded[:3], best[2:])
+
+    def test_full_probe_is_exact(self):
+        movie_ids = np.arange(200, dtype=np.int64)
+        vectors = unit_vectors(200, seed=1)
+        index = ann.IvfIndex(ann.build(movie_ids, vectors, nlist=10))
+        self.assertEqual(ann.recall_at_k(index, movie_ids, vectors, range(0, 200, 10), k=10, nprobe=10), 1.0)
+
+
+class BuildAnnIndexTests(TestCase):
+    def test_catalog_smaller_than_k(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        tags = [Tag.objects.create(name=name) for name in ('crime', 'drama')]
+        movies = []
+        for i in range(3):
+            movie = Movie.objects.create(title=f'Movie {i}', rating=8.0, release_date=datetime.date(1990 + i, 1, 1))
+            movie.tags.set(tags[:i + 1])
+            movies.append(movie.pk)
+        output = StringIO()
+        call_command('build_ann_index', '--dim', '16', '--output-dir', directory, stdout=output)
+        self.assertIn('recall@10', output.getvalue())
+        index = ann.ann_index(ann.CONTENT, directory)
+        # В базе разработчика (pytest) кроме этих трех фильмов могут быть и другие
+        self.assertEqual(len(index.ids), Movie.objects.count())
+        self.assertTrue(set(movies) <= {int(pk) for pk in index.ids})
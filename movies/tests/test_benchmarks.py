@@ -0,0 +1,36 @@
+"""
+Замеры movies.imdb.benchmarks под pytest-benchmark:
+
+    pytest movies/tests/test_benchmarks.py --benchmark-autosave
+    pytest movies/tests/test_benchmarks.py --benchmark-compare --benchmark-compare-fail=mean:20%
+
+Второй запуск падает, если замер стал медленнее сохраненного больше чем на 20%.
+Замер сохранения пишет в базу из настроек (DJANGO_SETTINGS_MODULE) в транзакции,
+которая откатывается. Параметры задает conftest.py; manage.py test здесь ничего не запускает.
+"""
+from django.db import connection
+
+from movies.imdb.benchmarks import peak_rss_mb
+from movies.imdb.persistence import QueryCounter
+
+
+def run_case(benchmark, case):
+    """Замер case.func; запросы к базе считаются отдельным вызовом после замера"""
+    benchmark(case.func)
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        case.func()
+    benchmark.extra_info.update({
+        'ops_per_call': case.ops,
+        'queries_per_call': counter.count,
+        'peak_rss_mb': peak_rss_mb(),
+    })
+
+
+def test_parse(benchmark, parse_case):
+    run_case(benchmark, parse_case)
+
+
+def test_persist(benchmark, persist_case):
+    benchmark.extra_info['records'] = persist_case.ops
+    run_case(benchmark, persist_case)
@@ -0,0 +1,51 @@
+import time
+from unittest import mock
+
+from django.core import checks
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from movies.catalog import VERSION_KEY, bump_catalog_version, catalog_version, checked_version, new_version
+
+
+class CatalogVersionTests(TestCase):
+    """Версия каталога в общем кэше"""
+
+    def test_bump_is_applied_on_commit(self):
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_catalog_version()
+            # До коммита другие процессы видят старую версию
+            self.assertEqual(catalog_version(), version)
+        self.assertNotEqual(catalog_version(), version)
+
+    def test_version_is_stable_between_bumps(self):
+        self.assertEqual(catalog_version(), catalog_version())
+
+    @override_settings(CATALOG_VERSION_CHECK_INTERVAL=5)
+    def test_shared_cache_is_read_once_per_interval(self):
+        # Заведомо позже прошлых проверок в этом процессе; после теста - снова с реальными часами
+        now = time.monotonic() + 1000
+        self.addCleanup(checked_version.set, None, 0.0)
+        with mock.patch('movies.catalog.time.monotonic', return_value=now):
+            version = catalog_version()
+            cache.set(VERSION_KEY, new_version(), timeout=None)  # смена в другом процессе
+            with self.assertNumQueries(0):
+                self.assertEqual(catalog_version(), version)
+        with mock.patch('movies.catalog.time.monotonic', return_value=now + 6):
+            self.assertNotEqual(catalog_version(), version)
+
+    @override_settings(CATALOG_VERSION_CHECK_INTERVAL=5)
+    def test_own_bump_is_seen_at_once(self):
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_catalog_version()
+        with self.assertNumQueries(0):
+            self.assertNotEqual(catalog_version(), version)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_is_reported(self):
+        self.assertIn('movies.W001', [message.id for message in checks.run_checks(tags=[checks.Tags.caches])])
+
+    def test_shared_cache_passes(self):
+        self.assertNotIn('movies.W001', [message.id for message in checks.run_checks(tags=[checks.Tags.caches])])
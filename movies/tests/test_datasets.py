@@ -0,0 +1,21 @@
+from django.test import SimpleTestCase
+
+from movies.imdb.datasets import SortedLookup
+
+
+class SortedLookupTests(SimpleTestCase):
+    """Слияние с выгрузкой, упорядоченной по номеру tconst"""
+
+    def test_eight_digit_ids_after_seven_digit(self):
+        ratings = SortedLookup([
+            ('tt0111161', ['a']), ('tt9999999', ['b']), ('tt10000000', ['c']), ('tt10000001', ['d']),
+        ])
+        self.assertEqual(ratings.get('tt0111161'), ['a'])
+        self.assertEqual(ratings.get('tt9999999'), ['b'])
+        self.assertEqual(ratings.get('tt10000000'), ['c'])
+        self.assertEqual(ratings.get('tt10000001'), ['d'])
+
+    def test_missing_id_does_not_skip_next(self):
+        ratings = SortedLookup([('tt9999999', ['b']), ('tt10000001', ['d'])])
+        self.assertEqual(ratings.get('tt10000000'), [])
+        self.assertEqual(ratings.get('tt10000001'), ['d'])
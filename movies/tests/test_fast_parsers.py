@@ -0,0 +1,90 @@
+import json
+import os
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from movies.imdb import fast_parsers, parsers
+from movies.imdb.benchmarks import synthetic_chart
+from movies.imdb.snapshot import read_page
+
+DETAILS_PAGE = '''<html><head><script type="application/ld+json">{
+  "@type": "Movie", "name": "O&apos;Brother", "description": "A &apos;great&apos; film",
+  "genre": ["Drama", "Crime"], "image": "https://m.media-amazon.com/images/M/p._V1_.jpg",
+  "actor": [{"@type": "Person", "url": "/name/nm0000001/", "name": "Pat O&apos;Brien"}],
+  "director": [{"@type": "Person", "url": "/name/nm0000002/", "name": "Ann O&apos;Neil"}]
+}</script></head><body>
+<span class="sc-16ede01-0">A 'great' film</span>
+<a class="ipc-chip--on-baseAlt">Drama</a><a class="ipc-chip--on-baseAlt">Crime</a>
+<div data-testid="title-pc-wide-screen"><span>Director</span><a href="/name/nm0000002/">Ann O'Neil</a></div>
+<a data-testid="title-cast-item__actor" href="/name/nm0000001/">Pat O'Brien</a>
+<img class="ipc-image" src="https://m.media-amazon.com/images/M/p._V1_QL75_.jpg">
+</body></html>'''
+
+
+def next_data_page(data):
+    return f'<html><script id="__NEXT_DATA__" type="application/json">{json.dumps(data)}</script></html>'
+
+
+class DetailsParityTests(SimpleTestCase):
+    """Основной путь разбора страницы фильма против BeautifulSoup"""
+
+    def test_ld_json_matches_soup(self):
+        expected, _ = parsers.extract_movie_details(DETAILS_PAGE)
+        details, warnings = fast_parsers.extract_movie_details(DETAILS_PAGE)
+        self.assertEqual(warnings, [])
+        self.assertEqual(details['description'], "A 'great' film")
+        self.assertEqual(details['actors'], ["Pat O'Brien"])
+        self.assertEqual(details['director'], "Ann O'Neil")
+        # Постер в JSON-LD - исходное изображение, в HTML - уменьшенная копия
+        self.assertEqual({**details, 'poster_url': ''}, {**expected, 'poster_url': ''})
+
+    def test_next_data_entities_are_unescaped(self):
+        page = next_data_page({'props': {'pageProps': {'aboveTheFoldData': {
+            'plot': {'plotText': {'plainText': 'Tom &amp; Jerry'}},
+            'genres': {'genres': [{'text': 'Rock &#x27;n&#x27; Roll'}]},
+        }}}})
+        details, _ = fast_parsers.extract_movie_details(page)
+        self.assertEqual(details['description'], 'Tom & Jerry')
+        self.assertEqual(details['genres'], ["Rock 'n' Roll"])
+
+    def test_unexpected_next_data_is_a_warning(self):
+        page = next_data_page({'props': {'pageProps': {'aboveTheFoldData': {
+            'genres': {'genres': [{'name': 'Drama'}]},
+        }}}})
+        details, warnings = fast_parsers.extract_movie_details(page)
+        self.assertEqual(details, {})
+        self.assertEqual(len(warnings), 1)
+
+
+class ChartParityTests(SimpleTestCase):
+    """Разбор страницы топа: полные списки, а не первые строки"""
+
+    def test_synthetic_chart_all_parsers_agree(self):
+        html = synthetic_chart(250)
+        expected, _ = parsers.extract_top_movies(html, 250)
+        self.assertEqual(len(expected), 250)
+        self.assertEqual(fast_parsers.extract_top_movies(html, 250)[0], expected)
+        self.assertEqual(fast_parsers.lxml_top_movies(html, 250)[0], expected)
+
+    def test_backup_page(self):
+        html = read_page(os.path.join(settings.BASE_DIR, 'imdb_backup.html'))
+        expected, _ = parsers.extract_top_movies(html, 250)
+        movies, warnings = fast_parsers.extract_top_movies(html, 250)
+        self.assertEqual(warnings, [])
+        self.assertEqual(len(movies), 250)
+        # BeautifulSoup видит только отрисованные строки - они должны совпасть целиком
+        by_id = {movie['imdb_id']: movie for movie in movies}
+        self.assertEqual([by_id.get(movie['imdb_id']) for movie in expected], expected)
+        self.assertEqual(fast_parsers.lxml_top_movies(html, 250)[0], expected)
+        self.assertFalse([movie['title'] for movie in movies if '&' in movie['title'] and ';' in movie['title']])
+
+
+class EmptyPageTests(SimpleTestCase):
+    """Пустое тело ответа разбирается как у BeautifulSoup, а не роняет загрузку"""
+
+    def test_empty_pages(self):
+        for html in ('', ' \n\t'):
+            with self.subTest(html=html):
+                self.assertEqual(fast_parsers.extract_top_movies(html, 250), parsers.extract_top_movies(html, 250))
+                self.assertEqual(fast_parsers.extract_movie_details(html), parsers.extract_movie_details(html))
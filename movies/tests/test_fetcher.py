@@ -0,0 +1,114 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from movies.imdb.fetcher import Fetcher
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Отвечает по сценарию сервера: для пути - список ответов (статус, заголовки),
+    i-й запрос получает i-й ответ, после конца списка - 200.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            attempt = server.hits.get(self.path, 0)
+            server.hits[self.path] = attempt + 1
+        responses = server.script.get(self.path, [])
+        status, headers = responses[attempt] if attempt < len(responses) else (200, {})
+        body = f'{self.path} {status}'.encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FetcherTests(SimpleTestCase):
+    """Повторы и ограничение частоты Fetcher против локального HTTP-сервера"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.script = {}
+        cls.server.hits = {}
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.script.clear()
+        self.server.hits.clear()
+
+    def fetcher(self, **kwargs):
+        fetcher = Fetcher(**{'delay': 0, 'backoff': 0.5, **kwargs})
+        self.addCleanup(fetcher.close)
+        return fetcher
+
+    def test_retries_5xx_with_exponential_backoff(self):
+        self.server.script['/flaky'] = [(503, {}), (502, {})]
+        fetcher = self.fetcher()
+        with mock.patch('movies.imdb.fetcher.time.sleep') as sleep:
+            text = fetcher.get(f'{self.base}/flaky')
+        self.assertEqual(text, '/flaky 200')
+        self.assertEqual(self.server.hits['/flaky'], 3)
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [0.5, 1.0])
+        self.assertEqual((fetcher.stats.pages, fetcher.stats.retries, fetcher.stats.errors), (1, 2, 0))
+
+    def test_429_honours_retry_after(self):
+        self.server.script['/limited'] = [(429, {'Retry-After': '7'})]
+        fetcher = self.fetcher()
+        with mock.patch('movies.imdb.fetcher.time.sleep') as sleep:
+            text = fetcher.get(f'{self.base}/limited')
+        self.assertEqual(text, '/limited 200')
+        sleep.assert_called_once_with(7.0)
+
+    def test_gives_up_after_retries(self):
+        self.server.script['/down'] = [(500, {})] * 10
+        fetcher = self.fetcher(retries=2)
+        with mock.patch('movies.imdb.fetcher.time.sleep'):
+            with self.assertRaises(requests.HTTPError):
+                fetcher.get(f'{self.base}/down')
+        self.assertEqual(self.server.hits['/down'], 3)
+        self.assertEqual((fetcher.stats.retries, fetcher.stats.errors), (2, 1))
+
+    def test_client_error_is_not_retried(self):
+        self.server.script['/missing'] = [(404, {})]
+        fetcher = self.fetcher()
+        with mock.patch('movies.imdb.fetcher.time.sleep') as sleep:
+            with self.assertRaises(requests.HTTPError):
+                fetcher.get(f'{self.base}/missing')
+        self.assertEqual(self.server.hits['/missing'], 1)
+        sleep.assert_not_called()
+
+    def test_rate_limit_is_shared_between_threads(self):
+        fetcher = self.fetcher(delay=0.1, workers=4)
+        threads = [
+            threading.Thread(target=fetcher.get, args=(f'{self.base}/page{i}',))
+            for i in range(5)
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Первый запрос - из "всплеска", остальные четыре - не чаще раза в 0.1 с
+        self.assertGreaterEqual(time.monotonic() - started, 0.35)
+        self.assertEqual(fetcher.stats.pages, 5)
@@ -0,0 +1,42 @@
+import datetime
+
+from django.test import SimpleTestCase, TestCase
+
+from movies import fuzzy
+from movies.fuzzy import TrigramIndex, fuzzy_search
+from movies.models import Movie
+
+
+class TrigramIndexTests(SimpleTestCase):
+    def test_finds_title_with_typo(self):
+        index = TrigramIndex()
+        for key, title in enumerate(('The Godfather', 'The Shawshank Redemption', 'Pulp Fiction')):
+            index.add(key, title)
+        self.assertEqual([key for key, _ in index.search('Godfater')], [0])
+        self.assertEqual([key for key, _ in index.search('Shawshenk')], [1])
+
+    def test_changed_text_is_rebuilt_into_a_new_index(self):
+        indexes = fuzzy.FuzzyIndexes()
+        index = TrigramIndex()
+        index.add(1, 'The Godfather')
+        indexes.indexes[Movie] = index
+        indexes.change(Movie, 'add', 1, 'Pulp Fiction')
+        rebuilt = indexes.indexes[Movie]
+        self.assertIsNot(rebuilt, index)
+        self.assertFalse(rebuilt.stale)
+        self.assertEqual([key for key, _ in rebuilt.search('Pulp Fiction')], [1])
+        self.assertEqual(rebuilt.search('Godfather'), [])
+
+
+class FuzzySearchTests(TestCase):
+    def setUp(self):
+        fuzzy.invalidate()
+        self.addCleanup(fuzzy.invalidate)
+
+    def test_search_follows_saved_titles(self):
+        movie = Movie.objects.create(title='The Godfather', rating=9.2, release_date=datetime.date(1972, 3, 24))
+        self.assertEqual(list(fuzzy_search(Movie.objects.all(), 'Godfater')), [movie])
+        movie.title = 'Pulp Fiction'
+        movie.save()
+        self.assertEqual(list(fuzzy_search(Movie.objects.all(), 'Godfater')), [])
+        self.assertEqual(list(fuzzy_search(Movie.objects.all(), 'Pulp Fictoin')), [movie])
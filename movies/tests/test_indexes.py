@@ -0,0 +1,77 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from movies import fuzzy
+from movies.autocomplete import autocomplete
+from movies.catalog import VERSION_KEY, new_version
+from movies.models import Movie, Tag
+from movies.recommendations import tag_matrix
+from movies.tag_index import tag_index
+
+
+def other_process_changed_catalog():
+    """Так выглядит для процесса изменение в другом воркере: сигналы не пришли, версия сменилась"""
+    cache.set(VERSION_KEY, new_version(), timeout=None)
+
+
+# Версия перечитывается из кэша при каждом обращении - смена "другим процессом" видна сразу
+@override_settings(CATALOG_VERSION_CHECK_INTERVAL=0)
+class CatalogIndexVersionTests(TestCase):
+    """Индексы процесса перестраиваются, когда версию каталога меняет другой процесс"""
+
+    def setUp(self):
+        self.movie = Movie.objects.create(title='The Godfather', rating=9.2, release_date=datetime.date(1972, 3, 24))
+        self.tag = Tag.objects.create(name='Crime')
+        for index in (tag_index, autocomplete, fuzzy.fuzzy_indexes, tag_matrix):
+            index.invalidate()
+            self.addCleanup(index.invalidate)
+
+    def test_tag_index(self):
+        self.assertEqual(tag_index.select(['Crime'])[0], 0)
+        Movie.tags.through.objects.bulk_create([Movie.tags.through(movie=self.movie, tag=self.tag)])
+        other_process_changed_catalog()
+        self.assertEqual(tag_index.select(['Crime'])[0], 1 << self.movie.pk)
+
+    def test_autocomplete(self):
+        self.assertEqual(autocomplete.search('godf', kinds=['movies'])['movies'][0]['name'], 'The Godfather')
+        Movie.objects.filter(pk=self.movie.pk).update(title='Pulp Fiction')
+        other_process_changed_catalog()
+        self.assertEqual(autocomplete.search('godf', kinds=['movies'])['movies'], [])
+        self.assertEqual(autocomplete.search('pulp', kinds=['movies'])['movies'][0]['id'], self.movie.pk)
+
+    def test_fuzzy_index(self):
+        self.assertEqual([key for key, _ in fuzzy.index_for(Movie).search('Godfater')], [self.movie.pk])
+        Movie.objects.filter(pk=self.movie.pk).update(title='Pulp Fiction')
+        other_process_changed_catalog()
+        self.assertEqual(fuzzy.index_for(Movie).search('Godfater'), [])
+
+    def test_tag_matrix(self):
+        self.assertNotIn(self.tag.pk, tag_matrix.load().tag_ids)
+        Movie.tags.through.objects.bulk_create([Movie.tags.through(movie=self.movie, tag=self.tag)])
+        other_process_changed_catalog()
+        self.assertIn(self.tag.pk, tag_matrix.load().tag_ids)
+
+    def test_same_version_is_not_rebuilt(self):
+        bitmaps = tag_index.load()
+        self.assertIs(tag_index.load(), bitmaps)
+
+    def test_own_change_is_applied_in_place(self):
+        indexes = autocomplete.load()
+        bitmaps = tag_index.load()
+        with self.captureOnCommitCallbacks(execute=True):
+            movie = Movie.objects.create(title='Pulp Fiction', rating=8.9, release_date=datetime.date(1994, 10, 14))
+            movie.tags.add(self.tag)
+        with self.assertNumQueries(1):  # только чтение версии
+            self.assertIs(autocomplete.load(), indexes)
+        self.assertEqual(autocomplete.search('pulp', kinds=['movies'])['movies'][0]['id'], movie.pk)
+        self.assertIs(tag_index.load(), bitmaps)
+        self.assertEqual(tag_index.select(['Crime'])[0], 1 << movie.pk)
+
+    def test_other_process_after_own_change_rebuilds(self):
+        indexes = autocomplete.load()
+        with self.captureOnCommitCallbacks(execute=True):
+            Movie.objects.create(title='Pulp Fiction', rating=8.9, release_date=datetime.date(1994, 10, 14))
+        other_process_changed_catalog()
+        self.assertIsNot(autocomplete.load(), indexes)
@@ -0,0 +1,49 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from movies.filters import MovieFilter
+from movies.models import Actor, ActorNameKey, Director, Movie
+from movies.people import matching_people, resolve
+from movies.query_plans import disable_seqscan, indexes_on
+
+
+class PeopleFilterTests(TestCase):
+    """Фильтр по имени актера или режиссера - с начала любого слова"""
+
+    def setUp(self):
+        cache.clear()
+        self.pacino = Actor.objects.create(name='Al Pacino')
+        self.brando = Actor.objects.create(name='Marlon Brando')
+        self.director = Director.objects.create(name='Francis Ford Coppola')
+        self.movie = Movie.objects.create(
+            title='The Godfather', rating=9.2, release_date=datetime.date(1972, 3, 24), director=self.director
+        )
+        self.movie.actors.add(self.pacino, self.brando)
+
+    def test_matches_start_of_any_word(self):
+        self.assertEqual(resolve(Actor, 'pac'), [self.pacino.pk])
+        self.assertEqual(resolve(Actor, 'al pac'), [self.pacino.pk])
+        self.assertEqual(resolve(Actor, 'acino'), [])
+        self.assertEqual(resolve(Director, 'ford cop'), [self.director.pk])
+
+    def test_filters(self):
+        movies = Movie.objects.filter(pk=self.movie.pk)
+        self.assertEqual(list(MovieFilter({'actor': 'Pacino'}, queryset=movies).qs), [self.movie])
+        self.assertEqual(list(MovieFilter({'director': 'coppola'}, queryset=movies).qs), [self.movie])
+        self.assertEqual(list(MovieFilter({'exclude_actor': 'brando'}, queryset=movies).qs), [])
+
+    def test_rename_rebuilds_keys(self):
+        self.pacino.name = 'Alfredo James Pacino'
+        self.pacino.save(update_fields=['name'])
+        self.assertEqual(
+            set(ActorNameKey.objects.filter(person=self.pacino).values_list('key', flat=True)),
+            {'alfredo james pacino', 'james pacino', 'pacino'}
+        )
+
+    def test_lookup_uses_key_index(self):
+        disable_seqscan()
+        plan = matching_people(Actor, 'pac').explain()
+        used = [name for name in indexes_on(ActorNameKey._meta.db_table, 'key') if name in plan]
+        self.assertTrue(used, plan)
@@ -0,0 +1,15 @@
+from django.test import TestCase
+
+from movies.query_plans import CHECKS, check_plan, disable_seqscan
+
+
+class QueryPlanTests(TestCase):
+    """Фильтры MovieFilter используют индексы (те же проверки, что в check_query_plans)"""
+
+    def test_filters_use_indexes(self):
+        # TestCase уже внутри транзакции - SET LOCAL действует до конца теста
+        disable_seqscan()
+        for params, table, column in CHECKS:
+            with self.subTest(params=params):
+                used, plan = check_plan(params, table, column)
+                self.assertTrue(used, f'нет индекса по {table}.{column}:\n{plan}')
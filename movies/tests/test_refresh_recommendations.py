@@ -0,0 +1,90 @@
+import datetime
+import shutil
+import tempfile
+from collections import Counter
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from movies import user_recommendations
+from movies.models import Movie, User, UserRecommendation
+
+
+class RefreshCommandTests(TestCase):
+    """Команда refresh_recommendations: диапазоны, шарды, файл прогона, записи stale"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings = override_settings(RECOMMENDATIONS_DIR=directory, RECOMMENDATIONS_REFRESH_ASYNC=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        Movie.objects.create(title='The Godfather', rating=9.2, release_date=datetime.date(1972, 3, 24))
+        self.users = [User.objects.create_user(username=f'viewer{i}', password='secret') for i in range(3)]
+
+    def run_command(self, *args):
+        output = StringIO()
+        call_command('refresh_recommendations', *args, '--range-size', '2', stdout=output)
+        return output.getvalue()
+
+    def record_refreshed(self):
+        """Счетчик id пользователей, пересчитанных через refresh_users"""
+        refreshed = Counter()
+        refresh_users = user_recommendations.refresh_users
+
+        def recording(users, *args, **kwargs):
+            users = list(users)
+            refreshed.update(user.pk for user in users)
+            return refresh_users(users, *args, **kwargs)
+
+        patcher = mock.patch('movies.user_recommendations.refresh_users', recording)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return refreshed
+
+    def stale_count(self):
+        return UserRecommendation.objects.filter(stale=True).count()
+
+    def test_stale_runs_after_full_run(self):
+        self.run_command()
+        self.assertEqual(UserRecommendation.objects.count(), 3)
+        for _ in range(2):
+            # Записи, помеченные после прогона, подбирает каждый запуск --stale в тот же день
+            UserRecommendation.objects.update(stale=True)
+            self.run_command('--stale')
+            self.assertEqual(self.stale_count(), 0)
+
+    def test_shards_cover_every_user_once(self):
+        self.users += [User.objects.create_user(username=f'extra{i}', password='secret') for i in range(6)]
+        refreshed = self.record_refreshed()
+        for shard in ('1/3', '2/3', '3/3'):
+            self.run_command('--shard', shard)
+        self.assertEqual(refreshed, Counter(user.pk for user in self.users))
+
+    def test_resume_after_partial_run(self):
+        refreshed = self.record_refreshed()
+        refresh_range = user_recommendations.refresh_range
+        calls = []
+
+        def failing_second_range(start, end, *args):
+            calls.append(start)
+            if len(calls) == 2:
+                raise RuntimeError('процесс прерван')
+            return refresh_range(start, end, *args)
+
+        with mock.patch('movies.user_recommendations.refresh_range', failing_second_range):
+            with self.assertRaises(RuntimeError):
+                self.run_command('--run', 'nightly')
+        done = set(refreshed)
+        self.assertTrue(done)
+
+        output = self.run_command('--run', 'nightly')
+        self.assertIn('уже готово 1', output)
+        # Готовый диапазон не пересчитывается, остальные - ровно по разу
+        self.assertEqual(refreshed, Counter(user.pk for user in self.users))
+
+        refreshed.clear()
+        self.run_command('--run', 'nightly', '--restart')
+        self.assertEqual(refreshed, Counter(user.pk for user in self.users))
@@ -0,0 +1,56 @@
+import datetime
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from movies import user_recommendations
+from movies.models import Movie, Review, User, UserRecommendation
+
+
+@override_settings(RECOMMENDATIONS_REFRESH_ASYNC=False)
+class StaleRecommendationsTests(TestCase):
+    """Записи stale не зависят от очереди процесса"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='viewer', password='secret')
+        self.movie = Movie.objects.create(title='The Godfather', rating=9.2, release_date=datetime.date(1972, 3, 24))
+        user_recommendations.refresh([self.user.pk])
+
+    def stale(self):
+        return UserRecommendation.objects.get(pk=self.user.pk).stale
+
+    def test_deleted_review_marks_stale(self):
+        review = Review.objects.create(user=self.user, movie=self.movie, text='Классика', rating=10)
+        UserRecommendation.objects.filter(pk=self.user.pk).update(stale=False)
+        with self.captureOnCommitCallbacks() as callbacks:
+            review.delete()
+        self.assertTrue(self.stale())
+        self.assertEqual(len(callbacks), 1)
+
+    def test_refresh_stale_picks_up_lost_queue(self):
+        # Воркер пометил запись и перезапустился, не успев пересчитать
+        UserRecommendation.objects.filter(pk=self.user.pk).update(stale=True)
+        self.assertEqual(user_recommendations.refresh_stale(0, self.user.pk + 1), 1)
+        self.assertFalse(self.stale())
+        self.assertEqual(user_recommendations.refresh_stale(0, self.user.pk + 1), 0)
+
+    def test_refresh_stale_respects_range(self):
+        UserRecommendation.objects.filter(pk=self.user.pk).update(stale=True)
+        self.assertEqual(user_recommendations.refresh_stale(self.user.pk + 1, self.user.pk + 100), 0)
+        self.assertTrue(self.stale())
+
+    def test_mark_during_compute_is_not_lost(self):
+        UserRecommendation.objects.filter(pk=self.user.pk).update(stale=True)
+        compute = user_recommendations.compute
+
+        def compute_while_marked(users):
+            entries = compute(users)
+            # Пока шел расчет, пользователь убрал фильм из избранного
+            user_recommendations.mark_stale([self.user.pk])
+            return entries
+
+        with mock.patch('movies.user_recommendations.compute', compute_while_marked):
+            user_recommendations.refresh([self.user.pk])
+        self.assertTrue(self.stale())
+        user_recommendations.refresh([self.user.pk])
+        self.assertFalse(self.stale())
@@ -0,0 +1,23 @@
+import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+
+from movies.models import Movie, MovieNeighbor
+
+
+class SimilarMoviesTests(TestCase):
+    def setUp(self):
+        self.movie = Movie.objects.create(title='The Godfather', rating=9.2, release_date=datetime.date(1972, 3, 24))
+        self.sequel = Movie.objects.create(title='The Godfather Part II', rating=9.0, release_date=datetime.date(1974, 12, 20))
+
+    def test_neighbors(self):
+        MovieNeighbor.objects.create(movie=self.movie, neighbor=self.sequel, rank=1, score=0.9)
+        response = self.client.get(reverse('movie-similar', args=[self.movie.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.json()], [self.sequel.pk])
+
+    def test_unknown_or_invalid_pk_is_404(self):
+        for pk in (self.sequel.pk + 1000, 'abc'):
+            with self.subTest(pk=pk):
+                self.assertEqual(self.client.get(reverse('movie-similar', args=[pk])).status_code, 404)
@@ -0,0 +1,9 @@
+"""Нормализация имен и названий для поиска"""
+import unicodedata
+
+
+def fold(text):
+    """Нормализация для поиска: без диакритики, casefold, только буквы и цифры через пробел"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch if ch.isalnum() else ' ' for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.casefold().split())
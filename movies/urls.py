@@ -2,7 +2,10 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 
-from .views import MovieViewSet, ReviewViewSet, MovieSearchView
+from .views import (
+    MovieViewSet, ReviewViewSet, MovieSearchView, AutocompleteView, SearchCacheStatsView,
+    RecommendationsView
+)
 
 router = DefaultRouter()
 router.register(r'movies', MovieViewSet, basename='movie')
@@ -11,6 +14,9 @@ router.register(r'reviews', ReviewViewSet, basename='reviews')
 urlpatterns = [
     path('', include(router.urls)),
     path('api/search/', MovieSearchView.as_view(), name='movie-search'),
+    path('api/search/cache-stats/', SearchCacheStatsView.as_view(), name='search-cache-stats'),
+    path('autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
+    path('recommendations/', RecommendationsView.as_view(), name='recommendations'),
     path('movies/<int:pk>/reviews/',
          ReviewViewSet.as_view({'post': 'create_review_for_movie'}),
          name='movie-reviews'),
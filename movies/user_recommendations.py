@@ -0,0 +1,212 @@
+"""
+Готовые рекомендации пользователей (таблица UserRecommendation).
+Чтение /api/recommendations/ - одна выборка по первичному ключу; если записи нет,
+отдаются лучшие по рейтингу (список закэширован на версию каталога), а пересчет
+пользователя ставится в очередь.
+
+Заполняет таблицу пакетная команда refresh_recommendations (диапазоны id пользователей
+в пуле процессов). Действия пользователя (избранное, отзыв, предпочитаемые теги -
+см. movies.signals) помечают его запись stale и ставят в очередь пересчет
+только этого пользователя; фильмы, которые
+пользователь только что отметил, сразу убираются из готового списка - до пересчета
+выдача остается разумной. Очередь разбирает фоновый поток процесса после коммита
+транзакции; settings.RECOMMENDATIONS_REFRESH_ASYNC = False - пересчет сразу в on_commit.
+
+Очередь в памяти - только быстрый путь: при перезапуске воркера (max_requests,
+деплой) она теряется. Надежное состояние - флаг stale в базе: такие записи
+подбирает refresh_recommendations (в конце каждого прогона, а с --stale - только их),
+поэтому команду с --stale стоит запускать по расписанию, например раз в несколько минут.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from movies.catalog import catalog_version
+from movies.models import User, UserRecommendation
+from movies.recommendations import MAX_LIMIT, popular_movie_ids, recommend_for
+
+logger = logging.getLogger(__name__)
+
+STORED = MAX_LIMIT  # сколько рекомендаций хранить: столько можно запросить через API
+POPULAR_TIMEOUT = 600
+QUEUE_BATCH = 50  # пользователей за один проход фонового потока
+
+
+def lookup(user, limit):
+    """(источник, список (movie_id, оценка)) из таблицы; без записи - 'popular'"""
+    row = UserRecommendation.objects.filter(pk=user.pk).values_list('source', 'items').first()
+    if row is None:
+        refresh_queue.add_on_commit([user.pk])
+        return 'popular', popular(limit)
+    source, items = row
+    return source, [(movie_id, score) for movie_id, score in items[:limit]]
+
+
+def popular(limit):
+    """Лучшие по рейтингу без учета пользователя, закэшированные на версию каталога"""
+    key = f'movies:popular:{catalog_version()}'
+    movie_ids = cache.get(key)
+    if movie_ids is None:
+        movie_ids = popular_movie_ids(limit=STORED)
+        cache.set(key, movie_ids, POPULAR_TIMEOUT)
+    return [(movie_id, 0.0) for movie_id in movie_ids[:limit]]
+
+
+def compute(users):
+    """Несохраненные записи UserRecommendation для пользователей users"""
+    entries = []
+    for user in users:
+        source, ranked = recommend_for(user, STORED)
+        entries.append(UserRecommendation(
+            user=user, source=source, items=[[movie_id, round(score, 6)] for movie_id, score in ranked]
+        ))
+    return entries
+
+
+def marks(user_ids):
+    """id пользователя -> updated_at его записи: отметка, с которой сравнивается запись после расчета"""
+    return dict(UserRecommendation.objects.filter(pk__in=list(user_ids)).values_list('pk', 'updated_at'))
+
+
+def save(entries, batch_size=None, marked=None):
+    """
+    Вставка или замена записей одним запросом на пачку (INSERT ... ON CONFLICT).
+    marked - marks() до расчета: запись, которую за время расчета снова пометили
+    (mark_stale и mark_seen меняют updated_at), сохраняется, но остается stale -
+    иначе событие потерялось бы.
+    """
+    with transaction.atomic():
+        if marked is not None:
+            current = dict(
+                UserRecommendation.objects.select_for_update()
+                .filter(pk__in=[entry.user_id for entry in entries]).values_list('pk', 'updated_at')
+            )
+            for entry in entries:
+                entry.stale = entry.user_id in current and current[entry.user_id] != marked.get(entry.user_id)
+        UserRecommendation.objects.bulk_create(
+            entries,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['source', 'items', 'stale', 'updated_at'],
+        )
+
+
+def refresh_users(users, batch_size=None):
+    """Пересчитать и сохранить рекомендации пользователей users; возвращает число записей"""
+    users = list(users)
+    marked = marks(user.pk for user in users)
+    entries = compute(users)
+    save(entries, batch_size, marked)
+    return len(entries)
+
+
+def refresh(user_ids):
+    """Пересчитать и сохранить рекомендации пользователей; возвращает число записей"""
+    return refresh_users(User.objects.filter(pk__in=list(user_ids)))
+
+
+def refresh_range(start, end, stale_only=False, batch_size=500):
+    """Пересчитать активных пользователей с id в [start, end) пачками по batch_size; возвращает их число"""
+    if stale_only:
+        return refresh_stale(start, end, batch_size)
+    users = User.objects.filter(is_active=True, pk__gte=start, pk__lt=end).order_by('pk')
+    written, batch = 0, []
+    for user in users.iterator(chunk_size=batch_size):
+        batch.append(user)
+        if len(batch) >= batch_size:
+            written += refresh_users(batch)
+            batch = []
+    return written + refresh_users(batch)
+
+
+def refresh_stale(start, end, batch_size=500):
+    """
+    Пересчитать записи stale активных пользователей с id в [start, end) - по индексу stale,
+    без обхода всех пользователей. Идем по возрастанию id: запись, снова помеченная
+    во время прохода, ждет следующего запуска, а не зацикливает этот.
+    """
+    stale = UserRecommendation.objects.filter(
+        stale=True, user__is_active=True, pk__gte=start, pk__lt=end
+    ).order_by('pk')
+    written, last = 0, start - 1
+    while True:
+        user_ids = list(stale.filter(pk__gt=last).values_list('pk', flat=True)[:batch_size])
+        if not user_ids:
+            return written
+        written += refresh(user_ids)
+        last = user_ids[-1]
+
+
+def mark_stale(user_ids):
+    """
+    Запись устарела (изменился профиль) - пересчитать после коммита.
+    updated_at меняется и у уже помеченных записей: так идущий сейчас пересчет
+    увидит, что его результат не учитывает это событие (см. save).
+    """
+    user_ids = list(user_ids)
+    UserRecommendation.objects.filter(pk__in=user_ids).update(stale=True, updated_at=timezone.now())
+    refresh_queue.add_on_commit(user_ids)
+
+
+def mark_seen(user_id, movie_ids):
+    """
+    Пользователь отметил фильмы: убрать их из готового списка сразу
+    (дешевое частичное обновление) и поставить полный пересчет в очередь.
+    """
+    movie_ids = set(movie_ids)
+    with transaction.atomic():
+        entry = UserRecommendation.objects.select_for_update().filter(pk=user_id).first()
+        if entry is not None:
+            entry.items = [item for item in entry.items if item[0] not in movie_ids]
+            entry.stale = True
+            entry.save(update_fields=['items', 'stale', 'updated_at'])
+    refresh_queue.add_on_commit([user_id])
+
+
+class RefreshQueue:
+    """Пользователи, ждущие пересчета; повторные события для одного пользователя схлопываются"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.pending = set()
+        self.thread = None
+
+    def add_on_commit(self, user_ids):
+        user_ids = list(user_ids)
+        if user_ids:
+            transaction.on_commit(lambda: self.add(user_ids))
+
+    def add(self, user_ids):
+        if not getattr(settings, 'RECOMMENDATIONS_REFRESH_ASYNC', True):
+            refresh(user_ids)
+            return
+        with self.condition:
+            self.pending.update(user_ids)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='recommendations-refresh', daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def take(self):
+        with self.condition:
+            while not self.pending:
+                self.condition.wait()
+            return [self.pending.pop() for _ in range(min(QUEUE_BATCH, len(self.pending)))]
+
+    def run(self):
+        while True:
+            user_ids = self.take()
+            close_old_connections()
+            try:
+                refresh(user_ids)
+            except Exception:
+                # Записи остаются stale - их подберет refresh_recommendations
+                logger.exception('Не удалось пересчитать рекомендации пользователей %s', user_ids)
+
+
+refresh_queue = RefreshQueue()
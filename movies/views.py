@@ -5,15 +5,23 @@ from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
 from rest_framework import serializers, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.generics import  ListAPIView, get_object_or_404
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from authorization.constants import ROLE_ADMIN, ROLE_USER, ROLE_MODERATOR
-from movies.models import Movie, Review
+from movies.models import Movie, MovieNeighbor, Review
 from movies.serializers import MovieSerializer, ReviewSerializer, MovieListSerializer
-from rest_framework import filters
+from movies import autocomplete
+from movies.facets import cached_facets
+from movies.filters import FullTextSearchFilter, MovieFilter
+from movies.ann import ann_index
+from movies.catalog import catalog_version
+from movies.fuzzy import DEFAULT_LIMIT, DEFAULT_THRESHOLD, MAX_LIMIT, fuzzy_search
+from movies import recommendations, user_recommendations
+from movies.result_cache import CachedResultsMixin, result_cache
+from movies.search import search_movies
 
 
 
@@ -183,47 +191,217 @@ class MeApiView(APIView):
         return Response(self.OutputSerializer(request.user).data)
 
 
-class MovieViewSet(ReadOnlyModelViewSet):
+class MovieViewSet(CachedResultsMixin, ReadOnlyModelViewSet):
+    """
+    Фильмы. Список (в том числе ?search=) отдает короткие карточки MovieListSerializer
+    без prefetch; связи подгружаются только для полей из ?expand=actors,tags,...
+    Поиск - полнотекстовый, результаты отсортированы по релевантности и разбиты на страницы.
+    id найденных фильмов кэшируются по параметрам фильтра (movies.result_cache).
+    """
     queryset = Movie.objects.all().prefetch_related('actors', 'tags', 'reviews', 'liked_by').select_related('director')
     serializer_class = MovieSerializer
     permission_classes = [AllowAny]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = ['title']
+    filter_backends = [FullTextSearchFilter, DjangoFilterBackend]
+    filterset_class = MovieFilter
+    result_cache_scope = 'movies'
+
+    def get_queryset(self):
+        if self.action == 'facets':
+            return Movie.objects.all()
+        if self.action != 'list':
+            return super().get_queryset()
+        movies = Movie.objects.select_related('director')
+        relations = [name for name in self.get_expand() if name in ('actors', 'tags')]
+        if relations:
+            movies = movies.prefetch_related(*relations)
+        return movies
+
+    def get_expand(self):
+        """Поля из ?expand= (через запятую), неизвестные - ошибка 400"""
+        if not hasattr(self, '_expand'):
+            names = [name.strip() for name in self.request.query_params.get('expand', '').split(',') if name.strip()]
+            unknown = sorted(set(names) - MovieListSerializer.expandable_fields.keys())
+            if unknown:
+                raise serializers.ValidationError({
+                    'expand': f"Неизвестные поля: {', '.join(unknown)}. "
+                              f"Доступны: {', '.join(MovieListSerializer.expandable_fields)}"
+                })
+            self._expand = list(dict.fromkeys(names))
+        return self._expand
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['user'] = self.request.user  # чтобы is_favorite работал
+        if self.action == 'list':
+            context['expand'] = self.get_expand()
         return context
 
-    def list(self, request, *args, **kwargs):
-        search_query = request.query_params.get('search')
-        if search_query:
-            try:
-                movie = self.get_queryset().get(title__icontains=search_query)
-                serializer = self.get_serializer(movie)
-                return Response(serializer.data)
-            except Movie.DoesNotExist:
-                return Response({'detail': 'Фильм не найден'}, status=404)
-
-        return super().list(request, *args, **kwargs)
     def get_serializer_class(self):
         if self.action == 'list':
-            if self.request.query_params.get('search'):
-                return MovieSerializer
             return MovieListSerializer
         return self.serializer_class
 
-class MovieSearchView(ListAPIView):
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Счетчики по тегам, десятилетиям, режиссерам и рейтингу для тех же
+        параметров фильтра, что и список (search, tags, exclude_tag, year...).
+        """
+        return Response(cached_facets(
+            request.query_params,
+            lambda: self.filter_queryset(self.get_queryset())
+        ))
+
+    class SimilarQuerySerializer(serializers.Serializer):
+        """Параметры похожих фильмов"""
+        limit = serializers.IntegerField(
+            required=False, min_value=1, max_value=100, default=10,
+            help_text="Сколько похожих фильмов вернуть"
+        )
+
+    @extend_schema(parameters=[SimilarQuerySerializer])
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        Похожие фильмы по поведению пользователей из таблицы MovieNeighbor
+        (команда build_similarities): запрос по индексу (movie_id, rank).
+        Если у фильма нет таких соседей (мало оценок), - ближайшие по тегам, режиссеру
+        и актерам из ANN-индекса (команда build_ann_index).
+        """
+        params = self.SimilarQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        limit = params.validated_data['limit']
+        # Сначала сам фильм: нечисловой или несуществующий pk - 404, а не ошибка в запросе соседей
+        movie_id = get_object_or_404(Movie.objects.only('pk'), pk=pk).pk
+        neighbors = [
+            (neighbor.neighbor, neighbor.score) for neighbor in
+            MovieNeighbor.objects.filter(movie_id=movie_id).select_related('neighbor__director').order_by('rank')[:limit]
+        ]
+        index = ann_index() if not neighbors else None
+        if index is not None:
+            ranked = index.similar(movie_id, limit)
+            movies = Movie.objects.select_related('director').in_bulk([key for key, _ in ranked])
+            neighbors = [(movies[key], score) for key, score in ranked if key in movies]
+        context = self.get_serializer_context()
+        return Response([
+            {**MovieListSerializer(movie, context=context).data, 'score': round(score, 4)}
+            for movie, score in neighbors
+        ])
+
+
+class MovieSearchView(CachedResultsMixin, ListAPIView):
     """
-    Поиск фильмов по названию и описанию.
-    Использует встроенный SearchFilter DRF.
+    Поиск фильмов по названию, описанию, режиссеру, актерам и тегам.
+    Полнотекстовый индекс (PostgreSQL tsvector / SQLite FTS5), результаты
+    отсортированы по релевантности и разбиты на страницы.
+    С ?fuzzy=1 ищет с опечатками по триграммам названий и имен (pg_trgm).
+    id найденных фильмов кэшируются по параметрам поиска (movies.result_cache).
     """
     permission_classes = [AllowAny]
-    def get(self, request):
-        query = request.query_params.get('search', '')
-        movies = Movie.objects.filter(title__icontains=query)
-        serializer = MovieListSerializer(movies, many=True)
-        return Response(serializer.data)
+    serializer_class = MovieListSerializer
+    filter_backends = []
+    result_cache_scope = 'search'
+
+    class QuerySerializer(serializers.Serializer):
+        """Параметры поиска"""
+        search = serializers.CharField(required=False, allow_blank=True, default='')
+        fuzzy = serializers.BooleanField(required=False, default=False)
+        threshold = serializers.FloatField(
+            required=False, min_value=0.05, max_value=1.0, default=DEFAULT_THRESHOLD,
+            help_text="Минимальное сходство для поиска с опечатками"
+        )
+        limit = serializers.IntegerField(
+            required=False, min_value=1, max_value=MAX_LIMIT, default=DEFAULT_LIMIT,
+            help_text="Сколько фильмов вернуть при поиске с опечатками"
+        )
+
+    @extend_schema(parameters=[QuerySerializer])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        params = self.QuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        options = params.validated_data
+        movies = Movie.objects.select_related('director')
+        if options['fuzzy']:
+            return fuzzy_search(movies, options['search'], options['threshold'], options['limit'])
+        return search_movies(movies, options['search'])
+
+    def get_objects_queryset(self):
+        return Movie.objects.select_related('director')
+
+
+class SearchCacheStatsView(APIView):
+    """Попадания в кэш результатов поиска и списка фильмов (счетчики текущего процесса)"""
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(tags=['search'])
+    def get(self, request, *args, **kwargs):
+        return Response({**result_cache.stats(), 'catalog_version': catalog_version()})
+
+
+class AutocompleteView(APIView):
+    """
+    Подсказки при вводе: фильмы, актеры, режиссеры и теги, чье имя
+    (без учета регистра и диакритики) начинается с q с начала любого слова.
+    Отвечает из индекса в памяти процесса, без запросов к базе: версия каталога
+    перечитывается не чаще раза в CATALOG_VERSION_CHECK_INTERVAL секунд.
+    """
+    permission_classes = [AllowAny]
+
+    class QuerySerializer(serializers.Serializer):
+        """Параметры подсказок"""
+        q = serializers.CharField(max_length=100, allow_blank=True)
+        limit = serializers.IntegerField(
+            required=False, min_value=1, max_value=autocomplete.MAX_LIMIT, default=autocomplete.DEFAULT_LIMIT,
+            help_text="Сколько подсказок в каждом разделе"
+        )
+        types = serializers.MultipleChoiceField(
+            choices=list(autocomplete.KINDS), required=False,
+            help_text="Разделы ответа (по умолчанию все)"
+        )
+
+    @extend_schema(parameters=[QuerySerializer], tags=['search'])
+    def get(self, request, *args, **kwargs):
+        params = self.QuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        options = params.validated_data
+        kinds = [kind for kind in autocomplete.KINDS if kind in options.get('types', ())]
+        return Response(autocomplete.autocomplete.search(options['q'], options['limit'], kinds))
+
+
+class RecommendationsView(APIView):
+    """
+    Персональные рекомендации из таблицы готовых (movies.user_recommendations):
+    модель ALS (source=als, команда train_als), затем профиль тегов - предпочтения,
+    избранное и отзывы с высокой оценкой против матрицы фильм x тег (source=tags).
+    Уже отмеченные, оцененные и просмотренные фильмы не предлагаются; пока
+    рекомендации пользователя не посчитаны (source=popular) - лучшие по рейтингу.
+    """
+    permission_classes = [IsAuthenticated]
+
+    class QuerySerializer(serializers.Serializer):
+        """Параметры рекомендаций"""
+        limit = serializers.IntegerField(
+            required=False, min_value=1, max_value=recommendations.MAX_LIMIT, default=recommendations.DEFAULT_LIMIT,
+            help_text="Сколько фильмов вернуть"
+        )
+
+    @extend_schema(parameters=[QuerySerializer], tags=['recommendations'])
+    def get(self, request, *args, **kwargs):
+        params = self.QuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        source, ranked = user_recommendations.lookup(request.user, params.validated_data['limit'])
+        movies = Movie.objects.select_related('director').in_bulk([movie_id for movie_id, _ in ranked])
+        context = {'request': request, 'user': request.user}
+        results = [
+            {**MovieListSerializer(movies[movie_id], context=context).data, 'score': round(score, 4)}
+            for movie_id, score in ranked if movie_id in movies
+        ]
+        return Response({'source': source, 'results': results})
+
+
 class TopMoviesAPIView(APIView):
     """
     Возвращает топ-10 фильмов по рейтингу.